@@ -7,7 +7,6 @@ from core.utils import utcnow
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
-from sqlalchemy import select
 
 from core.models import TimeEntry
 from core.services.time_service import TimeService
@@ -36,14 +35,7 @@ async def cmd_time_start(message: Message) -> None:
 
     async with TimeService() as service:
         # Check if there is already a running timer
-        stmt = (
-            select(TimeEntry)
-            .where(TimeEntry.owner_id == message.from_user.id)
-            .where(TimeEntry.end_time.is_(None))
-            .order_by(TimeEntry.start_time.desc())
-        )
-        result = await service.session.execute(stmt)
-        running = result.scalars().first()
+        running = await service.get_running_entry(message.from_user.id)
         if running:
             await message.answer(
                 (
@@ -79,14 +71,7 @@ async def cmd_time_stop(message: Message) -> None:
     async with TimeService() as service:
         if entry_id is None:
             # find latest running
-            stmt = (
-                select(TimeEntry)
-                .where(TimeEntry.owner_id == message.from_user.id)
-                .where(TimeEntry.end_time.is_(None))
-                .order_by(TimeEntry.start_time.desc())
-            )
-            result = await service.session.execute(stmt)
-            running = result.scalars().first()
+            running = await service.get_running_entry(message.from_user.id)
             if not running:
                 await message.answer("Сейчас нет запущенных таймеров.")
                 return
@@ -145,15 +130,7 @@ async def cmd_time_resume(message: Message) -> None:
 
     async with TimeService() as service:
         # Check another timer isn't running
-        from sqlalchemy import select
-        stmt = (
-            select(TimeEntry)
-            .where(TimeEntry.owner_id == message.from_user.id)
-            .where(TimeEntry.end_time.is_(None))
-            .order_by(TimeEntry.start_time.desc())
-        )
-        res = await service.session.execute(stmt)
-        running = res.scalars().first()
+        running = await service.get_running_entry(message.from_user.id)
         if running:
             await message.answer(
                 f"Сначала останови текущий таймер #{running.id} (команда /time_stop)."
@@ -0,0 +1,181 @@
+"""Per-chat ordered, cross-chat parallel update execution.
+
+:class:`ChatLaneMiddleware` is an outer ``update`` middleware. Each
+update joins the lane of its chat (falling back to the sender for
+inline queries etc.); a lane runs its updates one by one in arrival
+order, so FSM steps of one conversation never race. Different lanes run
+in parallel, at most ``max_concurrency`` handlers at a time. A lane
+holding ``lane_size`` updates drops new ones, so a flooding chat cannot
+pile up unbounded work.
+
+With polling (``handle_as_tasks=True``) and in webhook mode every update
+is already its own task; the middleware only orders and limits them.
+Use :func:`install` to register it: it has to run before the FSM
+context is loaded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+
+def lane_key(update: Update) -> Hashable | None:
+    """Chat id of the update (sender id when there is no chat)."""
+
+    try:
+        event = update.event
+    except Exception:  # unknown update type
+        return None
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        chat = getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    return user.id if user is not None else None
+
+
+class LatencyWindow:
+    """Recent samples (seconds) with percentile lookups."""
+
+    def __init__(self, size: int = 1024) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Lane:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()  # FIFO: waiters are woken in order
+        self.depth = 0
+
+
+class ChatLaneMiddleware(BaseMiddleware):
+    """Serial per chat, parallel across chats, bounded everywhere."""
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 32,
+        lane_size: int = 100,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.lane_size = lane_size
+        self._clock = clock
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._lanes: Dict[Hashable, _Lane] = {}
+        self._running = 0
+        self.handler_latency = LatencyWindow()
+        self.wait_latency = LatencyWindow()
+        self.stats = {"processed": 0, "failed": 0, "dropped": 0, "max_lane_depth": 0}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = lane_key(event) if isinstance(event, Update) else None
+        if key is None:
+            return await self._run(handler, event, data, self._clock())
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane()
+        if lane.depth >= self.lane_size:
+            self.stats["dropped"] += 1
+            logger.warning("lane %s full, update %s dropped", key, getattr(event, "update_id", None))
+            return UNHANDLED
+        lane.depth += 1
+        self.stats["max_lane_depth"] = max(self.stats["max_lane_depth"], lane.depth)
+        queued_at = self._clock()
+        try:
+            async with lane.lock:
+                return await self._run(handler, event, data, queued_at)
+        finally:
+            lane.depth -= 1
+            if lane.depth == 0:
+                self._lanes.pop(key, None)
+
+    async def _run(self, handler, event, data, queued_at: float) -> Any:
+        async with self._sem:
+            started = self._clock()
+            self.wait_latency.add(started - queued_at)
+            self._running += 1
+            try:
+                result = await handler(event, data)
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            finally:
+                self._running -= 1
+                self.handler_latency.add(self._clock() - started)
+            self.stats["processed"] += 1
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        depths = [lane.depth for lane in self._lanes.values()]
+        return {
+            **self.stats,
+            "lanes": len(depths),
+            "running": self._running,
+            "queued": max(0, sum(depths) - self._running),
+            "deepest_lane": max(depths, default=0),
+            "handler_p50_ms": round(self.handler_latency.percentile(0.5) * 1000, 2),
+            "handler_p99_ms": round(self.handler_latency.percentile(0.99) * 1000, 2),
+            "wait_p50_ms": round(self.wait_latency.percentile(0.5) * 1000, 2),
+            "wait_p99_ms": round(self.wait_latency.percentile(0.99) * 1000, 2),
+        }
+
+
+def install(dp: Dispatcher, lanes: ChatLaneMiddleware) -> None:
+    """Register ``lanes`` on ``dp`` ahead of its ``FSMContextMiddleware``.
+
+    The FSM middleware reads the chat state when the update enters it; if
+    it ran before the lane lock, the second of two quick messages would
+    see the state from before the first one was handled.
+    """
+
+    manager = dp.update.outer_middleware
+    if dp.fsm in manager:
+        manager.unregister(dp.fsm)
+        manager.register(lanes)
+        manager.register(dp.fsm)
+    else:
+        manager.register(lanes)
+
+
+_lanes: ChatLaneMiddleware | None = None
+
+
+def get_lanes() -> ChatLaneMiddleware:
+    """Process-wide middleware configured from ``BOT_MAX_CONCURRENCY``/``BOT_LANE_SIZE``."""
+
+    global _lanes
+    if _lanes is None:
+        from web.config import S
+
+        _lanes = ChatLaneMiddleware(
+            max_concurrency=S.env.BOT_MAX_CONCURRENCY,
+            lane_size=S.env.BOT_LANE_SIZE,
+        )
+    return _lanes
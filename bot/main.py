@@ -5,16 +5,27 @@ import logging
 from aiogram.exceptions import TelegramNetworkError
 
 from core.db import bot, dp
+from bot.lanes import get_lanes, install as install_lanes
 from bot.handlers.telegram import user_router, group_router, router
 from bot.handlers.note import router as note_router
 from bot.handlers.habit import router as habit_router
 from core.logger import LoggerMiddleware
 from core.models import LogLevel
+from core.services.profile_sync import ProfileSyncMiddleware, profile_sync
 from core.services.telegram_user_service import TelegramUserService
 
 
-async def main() -> None:
-    """Run bot polling with middleware and routers."""
+_configured = False
+
+
+def setup_dispatcher() -> None:
+    """Attach middleware and routers to ``dp`` (once per process)."""
+    global _configured
+    if _configured:
+        return
+    install_lanes(dp, get_lanes())
+    dp.message.outer_middleware(ProfileSyncMiddleware())
+    dp.callback_query.outer_middleware(ProfileSyncMiddleware())
     dp.message.middleware(LoggerMiddleware(bot))
     dp.callback_query.middleware(LoggerMiddleware(bot))
     dp.include_router(user_router)
@@ -22,6 +33,22 @@ async def main() -> None:
     dp.include_router(habit_router)
     dp.include_router(router)
     dp.include_router(note_router)
+    _configured = True
+
+
+async def main() -> None:
+    """Run bot polling with middleware and routers.
+
+    With ``BOT_MODE=webhook`` updates are received by the web app
+    (see :mod:`bot.webhook`) and this process does nothing.
+    """
+    from web.config import S
+
+    if S.BOT_MODE == "webhook":
+        logging.info("BOT_MODE=webhook: updates are served by the web app")
+        return
+
+    setup_dispatcher()
 
     try:
         async with TelegramUserService() as user_service:
@@ -31,10 +58,21 @@ async def main() -> None:
     except Exception as e:
         logging.error(f"Failed to send restart notification: {e}")
 
+    try:
+        # getUpdates is rejected while a webhook is set
+        await bot.delete_webhook()
+    except Exception as e:
+        logging.error(f"Failed to delete webhook: {e}")
+
+    stop_event = asyncio.Event()
+    profile_task = asyncio.create_task(profile_sync.run(stop_event=stop_event))
     try:
         await dp.start_polling(bot)
     except TelegramNetworkError as e:
         logging.error(f"Telegram network error: {e}")
+    finally:
+        stop_event.set()
+        await profile_task
 
 
 if __name__ == "__main__":
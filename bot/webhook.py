@@ -0,0 +1,163 @@
+"""Webhook mode: Telegram updates delivered to the FastAPI app.
+
+The HTTP handler only checks the secret token and puts the raw update
+into a bounded queue, so Telegram gets its 200 right away. A pool of
+workers parses updates and starts ``dp.feed_update`` for each one as a
+task, at most ``max_inflight`` at a time; ordering per chat and the
+handler concurrency limit come from :mod:`bot.lanes`. When the queue is
+full the handler answers 503 and Telegram redelivers the update later.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookUpdateQueue:
+    """Bounded update queue drained by ``workers`` tasks."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        *,
+        workers: int = 4,
+        maxsize: int = 1000,
+        max_inflight: int | None = None,
+    ) -> None:
+        self.dp = dispatcher
+        self.bot = bot
+        self.workers = workers
+        self.maxsize = maxsize
+        self.max_inflight = max_inflight or maxsize
+        self._queue: asyncio.Queue[Dict[str, Any]] | None = None
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore | None = None
+        self.stats = {"received": 0, "processed": 0, "failed": 0, "rejected": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, raw: Dict[str, Any]) -> bool:
+        """Enqueue a raw update; ``False`` when not running or full."""
+
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(raw)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            return False
+        self.stats["received"] += 1
+        return True
+
+    async def _worker(self) -> None:
+        assert self._queue is not None and self._slots is not None
+        while True:
+            raw = await self._queue.get()
+            try:
+                update = Update.model_validate(raw, context={"bot": self.bot})
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception("webhook update %s is malformed", raw.get("update_id"))
+                self._queue.task_done()
+                continue
+            # waiting here (not in the handler) keeps arrival order
+            await self._slots.acquire()
+            task = asyncio.create_task(self._feed(update))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _feed(self, update: Update) -> None:
+        try:
+            await self.dp.feed_update(self.bot, update)
+            self.stats["processed"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("webhook update %s failed", update.update_id)
+        finally:
+            self._slots.release()
+            self._queue.task_done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Bot webhook: старт (workers=%s, queue=%s)", self.workers, self.maxsize)
+
+    async def join(self) -> None:
+        """Wait until every queued update has been handled."""
+
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self, *, timeout: float = 10.0) -> None:
+        """Drain queued updates (up to ``timeout``) and stop workers."""
+
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Bot webhook: %s updates dropped on shutdown", self.qsize())
+        tasks = [*self._tasks, *self._inflight]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        logger.info("Bot webhook: остановка")
+
+
+_queue: WebhookUpdateQueue | None = None
+
+
+def get_update_queue() -> WebhookUpdateQueue:
+    """Process-wide queue bound to :data:`core.db.dp` and ``bot``."""
+
+    global _queue
+    if _queue is None:
+        from core.db import bot, dp
+        from web.config import S
+
+        _queue = WebhookUpdateQueue(
+            dp,
+            bot,
+            workers=S.env.BOT_WEBHOOK_WORKERS,
+            maxsize=S.env.BOT_WEBHOOK_QUEUE_SIZE,
+        )
+    return _queue
+
+
+async def start_webhook() -> WebhookUpdateQueue:
+    """Configure the dispatcher, start workers and register the webhook."""
+
+    from bot.main import setup_dispatcher
+    from web.config import S
+
+    setup_dispatcher()
+    queue = get_update_queue()
+    await queue.start()
+    try:
+        await queue.bot.set_webhook(
+            S.BOT_WEBHOOK_URL,
+            secret_token=S.BOT_WEBHOOK_SECRET,
+            allowed_updates=queue.dp.resolve_used_update_types(),
+        )
+    except Exception:
+        logger.exception("Bot webhook: set_webhook failed")
+    return queue
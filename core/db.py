@@ -1,6 +1,5 @@
 # /sd/leonidpro/core/db.py
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 import logging
 import os
 import builtins
@@ -99,8 +98,11 @@ try:
 except Exception:
     TELEGRAM_BOT_TOKEN = "123456:" + "A" * 35
     bot = Bot(token=TELEGRAM_BOT_TOKEN)
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
+# FSM storage is selected by FSM_STORAGE (memory | lru | redis)
+from core.fsm_storage import create_isolation, create_storage  # noqa: E402
+
+storage = create_storage()
+dp = Dispatcher(storage=storage, events_isolation=create_isolation(storage))
 
 # Make this module accessible as ``db`` to satisfy tests without
 # requiring an explicit import in other modules
@@ -0,0 +1,188 @@
+"""Pluggable aiogram FSM storage.
+
+``FSM_STORAGE`` selects the backend used by :data:`core.db.dp`:
+
+* ``memory`` (default) - aiogram's ``MemoryStorage``;
+* ``lru`` - :class:`LRUMemoryStorage`, in-process but capped by number
+  of chats and payload size, with idle expiry;
+* ``redis`` - :class:`IdleTTLRedisStorage` on ``REDIS_HOST``/``REDIS_PORT``
+  (``FSM_REDIS_DB``), shared by several bot processes; records expire
+  after ``FSM_STATE_TTL`` seconds without activity.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+
+DEFAULT_STATE_TTL = 24 * 3600
+
+
+@dataclass
+class _Record:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    size: int = 0
+    touched: float = 0.0
+
+
+class LRUMemoryStorage(BaseStorage):
+    """In-process storage evicting least recently used chats.
+
+    At most ``max_keys`` records and about ``max_bytes`` of JSON-encoded
+    data are kept; records idle for longer than ``ttl`` seconds are
+    dropped on access. Empty records are not stored at all.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_keys: int = 10_000,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float | None = DEFAULT_STATE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._records: "OrderedDict[StorageKey, _Record]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def close(self) -> None:
+        self._records.clear()
+        self._bytes = 0
+
+    def _get(self, key: StorageKey) -> _Record | None:
+        rec = self._records.get(key)
+        if rec is None:
+            return None
+        now = self._clock()
+        if self.ttl is not None and now - rec.touched > self.ttl:
+            self._drop(key)
+            return None
+        rec.touched = now
+        self._records.move_to_end(key)
+        return rec
+
+    def _drop(self, key: StorageKey) -> None:
+        rec = self._records.pop(key, None)
+        if rec is not None:
+            self._bytes -= rec.size
+
+    def _put(self, key: StorageKey, rec: _Record) -> None:
+        if rec.state is None and not rec.data:
+            self._drop(key)
+            return
+        size = len(json.dumps(rec.data, default=str)) if rec.data else 0
+        self._bytes += size - rec.size
+        rec.size = size
+        rec.touched = self._clock()
+        self._records[key] = rec
+        self._records.move_to_end(key)
+        while self._records and (
+            len(self._records) > self.max_keys or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._records))
+            if oldest == key and len(self._records) == 1:
+                break  # never evict the record just written
+            self._drop(oldest)
+            self.evictions += 1
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        rec = self._get(key) or _Record()
+        rec.state = state.state if isinstance(state, State) else state
+        self._put(key, rec)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        rec = self._get(key)
+        return rec.state if rec else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        rec = self._get(key) or _Record()
+        rec.data = data.copy()
+        self._put(key, rec)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        rec = self._get(key)
+        return rec.data.copy() if rec else {}
+
+
+class IdleTTLRedisStorage(RedisStorage):
+    """Redis storage whose TTL restarts on every read, not only writes.
+
+    ``GETEX`` refreshes the expiry in the same round trip, so a flow
+    expires only after ``state_ttl``/``data_ttl`` seconds of inactivity.
+    """
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        redis_key = self.key_builder.build(key, "state")
+        value = await self._get(redis_key, self.state_ttl)
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return value
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        redis_key = self.key_builder.build(key, "data")
+        value = await self._get(redis_key, self.data_ttl)
+        if value is None:
+            return {}
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return self.json_loads(value)
+
+    async def _get(self, redis_key: str, ttl):
+        if ttl is None:
+            return await self.redis.get(redis_key)
+        return await self.redis.getex(redis_key, ex=ttl)
+
+
+def _ttl_from_env() -> int | None:
+    ttl = int(os.getenv("FSM_STATE_TTL", str(DEFAULT_STATE_TTL)))
+    return ttl if ttl > 0 else None
+
+
+def create_storage(kind: str | None = None) -> BaseStorage:
+    """Build the FSM storage selected by ``FSM_STORAGE``."""
+
+    kind = (kind or os.getenv("FSM_STORAGE") or "memory").lower()
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "lru":
+        return LRUMemoryStorage(
+            max_keys=int(os.getenv("FSM_LRU_MAX_KEYS", "10000")),
+            max_bytes=int(os.getenv("FSM_LRU_MAX_BYTES", str(16 * 1024 * 1024))),
+            ttl=_ttl_from_env(),
+        )
+    if kind == "redis":
+        from redis.asyncio import Redis
+
+        redis = Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            db=int(os.getenv("FSM_REDIS_DB", "0")),
+        )
+        ttl = _ttl_from_env()
+        return IdleTTLRedisStorage(redis, state_ttl=ttl, data_ttl=ttl)
+    raise ValueError(f"unknown FSM_STORAGE: {kind}")
+
+
+def create_isolation(storage: BaseStorage) -> BaseEventIsolation | None:
+    """Cross-process event lock for shared storages (``None`` = default)."""
+
+    if isinstance(storage, RedisStorage):
+        return storage.create_isolation()
+    return None
@@ -23,7 +23,7 @@ from sqlalchemy import (
     UniqueConstraint,
     Index,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 from base import Base
@@ -170,7 +170,8 @@ class UserFavorite(Base):
 class Group(Base):  # Группа
     __tablename__ = "groups"
 
-    id = Column(BigInteger, primary_key=True)
+    # INTEGER on SQLite so the id is assigned like BIGSERIAL on Postgres
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     telegram_id = Column(BigInteger, unique=True, nullable=False)
     title = Column(String(255), nullable=False)
     type = Column(Enum(GroupType), default=GroupType.private)
@@ -280,6 +281,11 @@ class Task(Base):
     exceptions = relationship(
         "ScheduleException", backref="task", cascade="all, delete-orphan"
     )
+    occurrences = relationship(
+        "TaskOccurrence", backref="task", cascade="all, delete-orphan"
+    )
+    # Upper bound (exclusive) up to which ``occurrences`` are materialized
+    occurrences_until = Column(DateTime(timezone=True))
     # Link to time tracking entries (work logs)
     time_entries = relationship(
         "TimeEntry", backref="task", cascade="all, delete-orphan"
@@ -380,6 +386,39 @@ class TimeEntry(Base):
             return None
 
 
+class TimeRollup(Base):
+    """Tracked seconds per owner, UTC day and lineage (finished entries only).
+
+    Maintained by :mod:`core.services.time_rollup`. Missing ids are stored
+    as ``0`` (not NULL) so the key stays usable for ``ON CONFLICT``.
+    """
+
+    __tablename__ = "time_rollups"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    owner_id = Column(BigInteger, ForeignKey("users_tg.telegram_id"), nullable=False)
+    day = Column(Date, nullable=False)
+    area_id = Column(Integer, nullable=False, default=0)
+    project_id = Column(Integer, nullable=False, default=0)
+    task_id = Column(Integer, nullable=False, default=0)
+    activity_type = Column(String(16), nullable=False, default=ActivityType.work.value)
+    billable = Column(Boolean, nullable=False, default=True)
+    seconds = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "owner_id",
+            "day",
+            "area_id",
+            "project_id",
+            "task_id",
+            "activity_type",
+            "billable",
+            name="uq_time_rollups_key",
+        ),
+    )
+
+
 # ---------------------------------------------------------------------------
 # Extended NexusCore-inspired models (сохранены целиком)
 # ---------------------------------------------------------------------------
@@ -525,6 +564,21 @@ class ScheduleException(Base):
     reason = Column(String(255))
 
 
+class TaskOccurrence(Base):
+    """Materialized occurrence of a recurring :class:`Task`."""
+
+    __tablename__ = "task_occurrences"
+    __table_args__ = (
+        UniqueConstraint("task_id", "occurs_at", name="uq_task_occurrences_task_at"),
+        Index("ix_task_occurrences_owner_at", "owner_id", "occurs_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    owner_id = Column(BigInteger, ForeignKey("users_tg.telegram_id"))
+    occurs_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class OKRStatus(PyEnum):
     pending = "pending"
     active = "active"
@@ -701,9 +755,52 @@ class CalendarItem(Base):
     project_id = Column(Integer, ForeignKey("projects.id"))
     area_id = Column(Integer, ForeignKey("areas.id"))
     status = Column(Enum(CalendarItemStatus), default=CalendarItemStatus.planned)
+    # Google Calendar mirror: source link, event id and last seen etag
+    gcal_link_id = Column(Integer, ForeignKey("gcal_links.id", ondelete="CASCADE"))
+    gcal_event_id = Column(String(1024))
+    gcal_etag = Column(String(255))
+    # UID of the VEVENT this item was imported from (.ics import)
+    ics_uid = Column(String(255))
+    # Task this block was planned for (time-blocking planner)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), index=True)
     created_at = Column(DateTime(timezone=True), default=utcnow)
     updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
 
+    __table_args__ = (
+        UniqueConstraint("gcal_link_id", "gcal_event_id", name="uq_calendar_items_gcal_event"),
+        UniqueConstraint("owner_id", "ics_uid", name="uq_calendar_items_ics_uid"),
+    )
+
+
+class CalendarItemChange(Base):
+    """Outbound journal entry: a local change to push to Google Calendar.
+
+    ``etag`` is the remote version the change was made against; ``payload``
+    is the event body snapshot (empty for deletes).
+    """
+
+    __tablename__ = "calendar_item_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_id = Column(Integer)  # no FK: deletes outlive the item
+    link_id = Column(Integer, ForeignKey("gcal_links.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(String(1024), nullable=False)
+    op = Column(String(16), nullable=False)  # insert | update | delete
+    payload = Column(JSON)
+    etag = Column(String(255))
+    status = Column(String(16), nullable=False, default="pending")  # pending | conflict | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), default=utcnow)
+    last_error = Column(Text)
+    # push worker that is sending the row, until its lease runs out
+    claimed_by = Column(String(32))
+    claimed_until = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), default=utcnow)
+
+    __table_args__ = (
+        Index("ix_calendar_item_changes_pending", "status", "next_attempt_at"),
+    )
+
 
 class Alarm(Base):
     """Reminder tied to a :class:`CalendarItem`."""
@@ -785,9 +882,39 @@ class GCalLink(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     owner_id = Column(BigInteger, ForeignKey("users_tg.telegram_id"))
+    # Web account that connected the calendar (OAuth ``state``)
+    user_id = Column(String(64), index=True)
     calendar_id = Column(String(255), nullable=False)
-    access_token = Column(String(255))
-    refresh_token = Column(String(255))
+    google_calendar_id = synonym("calendar_id")
+    access_token = Column(String(2048))
+    refresh_token = Column(String(512))
+    scope = Column(String(1024))
+    token_expiry = Column(DateTime(timezone=True))
+    sync_token = Column(String(1024))
+    channel_id = Column(String(255))
+    resource_id = Column(String(255))
+    channel_expiry = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), default=utcnow)
     updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
 
+
+
+class SyncChange(Base):
+    """A write to a synced table, for ``GET /api/v1/sync``.
+
+    Appended by :mod:`core.services.sync_service` while the writing
+    transaction commits, so ids grow in commit order and serve as the
+    sync cursor. Pruned after ``SYNC_LOG_DAYS``.
+    """
+
+    __tablename__ = "sync_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    owner_id = Column(BigInteger, nullable=False)
+    entity = Column(String(32), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    changed_at = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_sync_changes_owner_entity", "owner_id", "entity", "id"),
+    )
@@ -7,6 +7,7 @@ from .telegram_user_service import TelegramUserService
 from .time_service import TimeService
 from .web_user_service import WebUserService
 from .favorite_service import FavoriteService
+from .sync_service import SyncService
 from .sync_gcal import (
     generate_auth_url,
     exchange_code,
@@ -23,6 +24,7 @@ __all__ = [
     "TimeService",
     "WebUserService",
     "FavoriteService",
+    "SyncService",
     "generate_auth_url",
     "exchange_code",
     "save_gcal_link",
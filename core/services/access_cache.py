@@ -0,0 +1,93 @@
+"""In-process TTL cache for bot access checks.
+
+``role_required`` and ``group_required`` consult this cache first, so
+repeated commands from known users in known groups touch no database.
+Entries expire after ``ttl`` seconds, roles after the shorter
+``role_ttl``; role and log-chat changes made through
+:class:`TelegramUserService` drop the affected entries at once. Other
+processes do not hear about them: roles are changed from the web app,
+so a bot running as a separate process (``BOT_MODE=polling``) picks up
+a demotion after at most ``role_ttl`` seconds.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+MISSING = object()
+
+
+class AccessCache:
+    """Roles, group memberships and the log chat id with expiry."""
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 300.0,
+        role_ttl: float = 30.0,
+        max_entries: int = 50_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.role_ttl = role_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None or item[1] <= self._clock():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return item[0]
+
+    def _set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self._data[key] = (value, self._clock() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    # -- roles ---------------------------------------------------------------
+    def role(self, telegram_id: int) -> Any:
+        """Cached role name or :data:`MISSING`."""
+        return self._get(("role", telegram_id))
+
+    def set_role(self, telegram_id: int, role: str) -> None:
+        self._set(("role", telegram_id), role, self.role_ttl)
+
+    def invalidate_user(self, telegram_id: int) -> None:
+        self._data.pop(("role", telegram_id), None)
+
+    # -- memberships -----------------------------------------------------------
+    def is_member(self, user_id: int, group_id: int) -> bool:
+        return self._get(("member", user_id, group_id)) is True
+
+    def set_member(self, user_id: int, group_id: int) -> None:
+        self._set(("member", user_id, group_id), True)
+
+    # -- log chat --------------------------------------------------------------
+    def log_chat_id(self) -> Any:
+        return self._get("log_chat")
+
+    def set_log_chat_id(self, chat_id: int | None) -> None:
+        self._set("log_chat", chat_id)
+
+    def invalidate_log_chat(self) -> None:
+        self._data.pop("log_chat", None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+access_cache = AccessCache(
+    ttl=float(os.getenv("BOT_ACCESS_CACHE_TTL", "300")),
+    role_ttl=float(os.getenv("BOT_ACCESS_ROLE_TTL", "30")),
+)
@@ -0,0 +1,258 @@
+"""Merged agenda across calendar events, calendar items, tasks and reminders.
+
+All sources are combined in a single ``UNION ALL`` query ordered by start
+time, so clients get one consistent timeline instead of merging several
+collections themselves. Recurring tasks contribute their materialized
+occurrences (see :mod:`core.services.recurrence_service`). Pagination uses
+an opaque keyset cursor over ``(start_at, kind, id)``.
+"""
+
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import DateTime, Integer, and_, cast, false, literal, null, or_, select, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.models import Area, CalendarEvent, CalendarItem, Reminder, Task, TaskOccurrence
+
+
+@dataclass
+class AgendaEntry:
+    """Single row of the merged agenda."""
+
+    kind: str
+    id: int
+    title: str
+    start_at: datetime
+    end_at: datetime | None
+    area_id: int | None
+    project_id: int | None
+
+    @property
+    def cursor(self) -> str:
+        return encode_cursor(self.start_at, self.kind, self.id)
+
+
+def encode_cursor(start_at: datetime, kind: str, item_id: int) -> str:
+    raw = f"{start_at.isoformat()}|{kind}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str, int]:
+    """Decode cursor produced by :func:`encode_cursor`.
+
+    Raises ``ValueError`` for malformed input.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        start_s, kind, id_s = raw.split("|", 2)
+        return datetime.fromisoformat(start_s), kind, int(id_s)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+class AgendaService:
+    """Read-only merged view over agenda sources."""
+
+    def __init__(self, session: Optional[AsyncSession] = None) -> None:
+        self.session = session
+        self._external = session is not None
+
+    async def __aenter__(self) -> "AgendaService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # pragma: no cover
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    @staticmethod
+    def _subtree_ids(owner_id: int, area_id: int):
+        """Area ids of ``area_id`` and its descendants (by ``mp_path`` prefix)."""
+        root = aliased(Area)
+        return (
+            select(Area.id)
+            .join(root, Area.mp_path.like(root.mp_path.concat("%")))
+            .where(root.id == area_id, Area.owner_id == owner_id)
+        )
+
+    def _query(
+        self,
+        owner_id: int,
+        *,
+        time_from: datetime | None = None,
+        time_to: datetime | None = None,
+        area_id: int | None = None,
+        project_id: int | None = None,
+        include_sub: bool = False,
+        after: tuple[datetime, str, int] | None = None,
+    ):
+        """Build the ``UNION ALL`` statement with all filters applied."""
+
+        def _scope(start_col, area_col, project_col):
+            conds = [start_col.is_not(None)]
+            if time_from is not None:
+                conds.append(start_col >= time_from)
+            if time_to is not None:
+                conds.append(start_col <= time_to)
+            if project_id is not None:
+                conds.append(project_col == project_id)
+            if area_id is not None:
+                if include_sub:
+                    conds.append(area_col.in_(self._subtree_ids(owner_id, area_id)))
+                else:
+                    conds.append(area_col == area_id)
+            return conds
+
+        no_id = cast(null(), Integer)
+        no_end = cast(null(), DateTime(timezone=True))
+
+        # Calendar events are not bound to PARA containers.
+        events = select(
+            literal("event").label("kind"),
+            CalendarEvent.id.label("id"),
+            CalendarEvent.title.label("title"),
+            CalendarEvent.start_at.label("start_at"),
+            CalendarEvent.end_at.label("end_at"),
+            no_id.label("area_id"),
+            no_id.label("project_id"),
+        ).where(CalendarEvent.owner_id == owner_id)
+        if area_id is not None or project_id is not None:
+            events = events.where(false())
+        else:
+            events = events.where(*_scope(CalendarEvent.start_at, None, None))
+
+        items = select(
+            literal("item").label("kind"),
+            CalendarItem.id,
+            CalendarItem.title,
+            CalendarItem.start_at,
+            CalendarItem.end_at,
+            CalendarItem.area_id,
+            CalendarItem.project_id,
+        ).where(
+            CalendarItem.owner_id == owner_id,
+            *_scope(CalendarItem.start_at, CalendarItem.area_id, CalendarItem.project_id),
+        )
+
+        tasks = select(
+            literal("task").label("kind"),
+            Task.id,
+            Task.title,
+            Task.due_date,
+            no_end,
+            Task.area_id,
+            Task.project_id,
+        ).where(
+            Task.owner_id == owner_id,
+            or_(Task.recurrence.is_(None), Task.recurrence == ""),
+            *_scope(Task.due_date, Task.area_id, Task.project_id),
+        )
+
+        # Recurring tasks are read from their materialized occurrences.
+        occurrences = (
+            select(
+                literal("task").label("kind"),
+                Task.id,
+                Task.title,
+                TaskOccurrence.occurs_at,
+                no_end,
+                Task.area_id,
+                Task.project_id,
+            )
+            .join(Task, Task.id == TaskOccurrence.task_id)
+            .where(
+                TaskOccurrence.owner_id == owner_id,
+                *_scope(TaskOccurrence.occurs_at, Task.area_id, Task.project_id),
+            )
+        )
+
+        # Reminders inherit PARA scope from their task (if any).
+        rtask = aliased(Task)
+        reminders = (
+            select(
+                literal("reminder").label("kind"),
+                Reminder.id,
+                Reminder.message,
+                Reminder.remind_at,
+                no_end,
+                rtask.area_id,
+                rtask.project_id,
+            )
+            .outerjoin(rtask, rtask.id == Reminder.task_id)
+            .where(
+                Reminder.owner_id == owner_id,
+                *_scope(Reminder.remind_at, rtask.area_id, rtask.project_id),
+            )
+        )
+
+        u = union_all(events, items, tasks, occurrences, reminders).subquery("agenda")
+        stmt = select(u)
+        if after is not None:
+            a_start, a_kind, a_id = after
+            stmt = stmt.where(
+                or_(
+                    u.c.start_at > a_start,
+                    and_(
+                        u.c.start_at == a_start,
+                        or_(u.c.kind > a_kind, and_(u.c.kind == a_kind, u.c.id > a_id)),
+                    ),
+                )
+            )
+        return stmt.order_by(u.c.start_at, u.c.kind, u.c.id)
+
+    async def stream(
+        self,
+        owner_id: int,
+        *,
+        limit: int | None = None,
+        cursor: str | None = None,
+        **filters,
+    ) -> AsyncIterator[AgendaEntry]:
+        """Yield agenda entries in start-time order without buffering them all."""
+
+        after = decode_cursor(cursor) if cursor else None
+        stmt = self._query(owner_id, after=after, **filters)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await self.session.stream(stmt)
+        async for row in result:
+            yield AgendaEntry(
+                kind=row.kind,
+                id=row.id,
+                title=row.title,
+                start_at=row.start_at,
+                end_at=row.end_at,
+                area_id=row.area_id,
+                project_id=row.project_id,
+            )
+
+    async def page(
+        self,
+        owner_id: int,
+        *,
+        limit: int = 100,
+        cursor: str | None = None,
+        **filters,
+    ) -> tuple[List[AgendaEntry], str | None]:
+        """Return up to ``limit`` entries and the cursor for the next page."""
+
+        entries: list[AgendaEntry] = []
+        async for entry in self.stream(owner_id, limit=limit + 1, cursor=cursor, **filters):
+            entries.append(entry)
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = entries[-1].cursor
+        return entries, next_cursor
@@ -0,0 +1,223 @@
+"""Free/busy lookup and conflict detection.
+
+Busy ranges come from calendar items, calendar events and time entries
+(a running timer is busy until now). They are fetched with one indexed
+overlap query (``start < :end AND end > :start``) and loaded into an
+:class:`IntervalTree`, which answers overlap queries in
+``O(log n + k)`` and provides merging, gap finding and conflict pairs
+with a single sort-and-sweep instead of comparing every pair.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.models import CalendarEvent, CalendarItem, TimeEntry
+from core.utils import naive_utc, utcnow
+
+
+@dataclass(frozen=True, order=True)
+class Interval:
+    """Half-open busy range ``[start, end)`` with its source."""
+
+    start: datetime
+    end: datetime
+    kind: str = ""
+    id: int = 0
+    title: str = ""
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return self.start < end and self.end > start
+
+
+class IntervalTree:
+    """Static augmented interval tree over a sorted array.
+
+    Intervals are sorted by start; the implicit balanced tree uses the
+    middle of every index range as its node and stores the maximum end of
+    the subtree, so whole branches that end before the query are skipped.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]) -> None:
+        self._items: List[Interval] = sorted(i for i in intervals if i.end > i.start)
+        self._max_end: List[datetime] = [i.end for i in self._items]
+        if self._items:
+            self._build(0, len(self._items) - 1)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def _build(self, lo: int, hi: int) -> datetime:
+        mid = (lo + hi) // 2
+        best = self._items[mid].end
+        if lo < mid:
+            best = max(best, self._build(lo, mid - 1))
+        if mid < hi:
+            best = max(best, self._build(mid + 1, hi))
+        self._max_end[mid] = best
+        return best
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Intervals intersecting ``[start, end)`` ordered by start."""
+
+        start, end = naive_utc(start), naive_utc(end)
+        out: List[Interval] = []
+        stack = [(0, len(self._items) - 1)] if self._items else []
+        while stack:
+            lo, hi = stack.pop()
+            if lo > hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] <= start:
+                continue  # nothing in this subtree reaches the window
+            node = self._items[mid]
+            if node.start < end:
+                if node.end > start:
+                    out.append(node)
+                stack.append((mid + 1, hi))
+            stack.append((lo, mid - 1))
+        out.sort()
+        return out
+
+    def merged(self) -> List[tuple[datetime, datetime]]:
+        """Union of all intervals as disjoint ``(start, end)`` blocks."""
+
+        blocks: List[tuple[datetime, datetime]] = []
+        for i in self._items:
+            if blocks and i.start <= blocks[-1][1]:
+                if i.end > blocks[-1][1]:
+                    blocks[-1] = (blocks[-1][0], i.end)
+            else:
+                blocks.append((i.start, i.end))
+        return blocks
+
+    def gaps(
+        self, start: datetime, end: datetime, min_length: timedelta = timedelta(0)
+    ) -> List[tuple[datetime, datetime]]:
+        """Free ranges inside ``[start, end)`` at least ``min_length`` long."""
+
+        start, end = naive_utc(start), naive_utc(end)
+        out: List[tuple[datetime, datetime]] = []
+        cursor = start
+        for b_start, b_end in self.merged():
+            if b_end <= start:
+                continue
+            if b_start >= end:
+                break
+            if b_start > cursor and b_start - cursor >= min_length:
+                out.append((cursor, b_start))
+            cursor = max(cursor, b_end)
+        if end > cursor and end - cursor >= min_length:
+            out.append((cursor, end))
+        return out
+
+    def conflicts(self) -> List[tuple[Interval, Interval]]:
+        """All overlapping pairs, found with one sweep over sorted starts."""
+
+        pairs: List[tuple[Interval, Interval]] = []
+        active: List[Interval] = []
+        for i in self._items:
+            active = [a for a in active if a.end > i.start]
+            pairs.extend((a, i) for a in active)
+            active.append(i)
+        return pairs
+
+
+class FreeBusyService:
+    """Query busy ranges of a user."""
+
+    def __init__(self, session: Optional[AsyncSession] = None) -> None:
+        self.session = session
+        self._external = session is not None
+
+    async def __aenter__(self) -> "FreeBusyService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # pragma: no cover
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    async def busy(
+        self,
+        owner_id: int,
+        start: datetime,
+        end: datetime,
+        *,
+        exclude: tuple[str, int] | None = None,
+    ) -> List[Interval]:
+        """Busy intervals overlapping ``[start, end)`` from all sources."""
+
+        start, end = naive_utc(start), naive_utc(end)
+        te_end = func.coalesce(TimeEntry.end_time, utcnow())
+        items = select(
+            literal("item").label("kind"),
+            CalendarItem.id.label("id"),
+            CalendarItem.title.label("title"),
+            CalendarItem.start_at.label("start_at"),
+            CalendarItem.end_at.label("end_at"),
+        ).where(
+            CalendarItem.owner_id == owner_id,
+            CalendarItem.start_at < end,
+            CalendarItem.end_at > start,
+        )
+        events = select(
+            literal("event"),
+            CalendarEvent.id,
+            CalendarEvent.title,
+            CalendarEvent.start_at,
+            CalendarEvent.end_at,
+        ).where(
+            CalendarEvent.owner_id == owner_id,
+            CalendarEvent.start_at < end,
+            CalendarEvent.end_at > start,
+        )
+        entries = select(
+            literal("time"),
+            TimeEntry.id,
+            func.coalesce(TimeEntry.description, ""),
+            TimeEntry.start_time,
+            te_end,
+        ).where(
+            TimeEntry.owner_id == owner_id,
+            TimeEntry.start_time < end,
+            te_end > start,
+        )
+        res = await self.session.execute(union_all(items, events, entries))
+        out: List[Interval] = []
+        for kind, obj_id, title, s, e in res.all():
+            if exclude == (kind, obj_id):
+                continue
+            if isinstance(e, str):  # pragma: no cover - SQLite coalesce returns text
+                e = datetime.fromisoformat(e)
+            out.append(Interval(naive_utc(s), naive_utc(e), kind, obj_id, title or ""))
+        return out
+
+    async def tree(self, owner_id: int, start: datetime, end: datetime) -> IntervalTree:
+        return IntervalTree(await self.busy(owner_id, start, end))
+
+    async def conflicts(
+        self,
+        owner_id: int,
+        start: datetime,
+        end: datetime,
+        *,
+        exclude: tuple[str, int] | None = None,
+    ) -> List[Interval]:
+        """Busy intervals that overlap the candidate range ``[start, end)``."""
+
+        return sorted(await self.busy(owner_id, start, end, exclude=exclude))
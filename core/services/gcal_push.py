@@ -0,0 +1,560 @@
+"""Outbound push of local calendar item changes to Google Calendar.
+
+:class:`~core.services.para_repository.CalendarItemRepository` records
+creates, updates and deletes of items whose owner has a
+:class:`GCalLink` in the ``calendar_item_changes`` journal
+(:func:`journal_change`), inside the caller's transaction.
+:class:`GCalPushWorker` drains the journal: pending changes are collapsed
+per event, grouped per link and sent as Google batch requests
+(``multipart/mixed``, up to ``batch_size`` calls each). Updates and
+deletes carry ``If-Match`` with the etag the change was based on; a 412
+parks the change as ``conflict`` (remote wins, a pull sync is requested).
+Parts answered with 429/5xx are retried one by one with exponential
+back-off; other failures are parked as ``failed``.
+
+Several workers (one per web process) may drain the same journal. Each
+claims the rows it sends with a lease (``claimed_by``/``claimed_until``)
+in a conditional ``UPDATE`` first and leaves events alone while another
+live worker holds rows of them, so a change is sent once. A worker that
+dies leaves its claim to expire after ``lease`` seconds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+from urllib.parse import quote
+
+import httpx
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from core import db
+from core.logger import logger
+from core.models import CalendarItem, CalendarItemChange, GCalLink
+from core.utils import naive_utc, utcnow
+from . import sync_service
+
+BATCH_URL = os.getenv("GCAL_BATCH_URL", "https://www.googleapis.com/batch/calendar/v3")
+BATCH_PATH_PREFIX = "/calendar/v3"
+PUSHED_FIELDS = frozenset({"title", "start_at", "end_at"})
+
+
+def new_event_id() -> str:
+    """Client-side event id (Google accepts base32hex, 5-1024 chars)."""
+
+    return uuid.uuid4().hex
+
+
+def event_body(item: CalendarItem) -> Dict[str, Any]:
+    start = naive_utc(item.start_at)
+    end = naive_utc(item.end_at) or start
+    return {
+        "summary": item.title,
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%SZ")},
+        "end": {"dateTime": end.strftime("%Y-%m-%dT%H:%M:%SZ")},
+    }
+
+
+async def journal_change(
+    session: AsyncSession, item: CalendarItem, op: str
+) -> CalendarItemChange | None:
+    """Record ``op`` for ``item`` if its owner has a linked calendar.
+
+    Items not yet known to Google get a link and a fresh event id, and
+    their first journalled change becomes an insert.
+    """
+
+    if item.gcal_link_id is None:
+        if op == "delete" or item.owner_id is None:
+            return None
+        link_id = await session.scalar(
+            select(GCalLink.id)
+            .where(GCalLink.owner_id == item.owner_id)
+            .order_by(GCalLink.id)
+            .limit(1)
+        )
+        if link_id is None:
+            return None
+        item.gcal_link_id = link_id
+    if item.gcal_event_id is None:
+        if op == "delete":
+            return None
+        item.gcal_event_id = new_event_id()
+        op = "insert"
+    change = CalendarItemChange(
+        item_id=item.id,
+        link_id=item.gcal_link_id,
+        event_id=item.gcal_event_id,
+        op=op,
+        payload=None if op == "delete" else event_body(item),
+        etag=item.gcal_etag,
+        next_attempt_at=utcnow(),
+    )
+    session.add(change)
+    return change
+
+
+# ---------------------------------------------------------------------------
+# multipart/mixed batch encoding
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class BatchPart:
+    content_id: str
+    method: str
+    path: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: Dict[str, Any] | None = None
+
+
+def encode_batch(parts: Iterable[BatchPart], boundary: str) -> bytes:
+    chunks = []
+    for part in parts:
+        lines = [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <{part.content_id}>",
+            "",
+            f"{part.method} {part.path} HTTP/1.1",
+        ]
+        lines += [f"{k}: {v}" for k, v in part.headers.items()]
+        if part.body is not None:
+            lines.append("Content-Type: application/json")
+        lines += ["", json.dumps(part.body) if part.body is not None else ""]
+        chunks.append("\r\n".join(lines))
+    chunks.append(f"--{boundary}--\r\n")
+    return "\r\n".join(chunks).encode()
+
+
+def _headers(lines: Iterable[str]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for line in lines:
+        name, sep, value = line.partition(":")
+        if sep:
+            out[name.strip().lower()] = value.strip()
+    return out
+
+
+def split_batch(body: bytes, content_type: str) -> List[Tuple[Dict[str, str], str]]:
+    """Split a ``multipart/mixed`` body into ``(part headers, http message)``."""
+
+    boundary = content_type.split("boundary=", 1)[1].split(";")[0].strip().strip('"')
+    text = body.decode().replace("\r\n", "\n")
+    parts = []
+    for chunk in text.split(f"--{boundary}")[1:]:
+        if chunk.startswith("--"):
+            break
+        head, _, message = chunk.strip("\n").partition("\n\n")
+        parts.append((_headers(head.split("\n")), message))
+    return parts
+
+
+def parse_http(message: str) -> Tuple[str, Dict[str, str], str]:
+    """Split an embedded HTTP message into start line, headers and body."""
+
+    head, _, body = message.partition("\n\n")
+    first, *rest = head.split("\n")
+    return first.strip(), _headers(rest), body.strip()
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class PushResult:
+    batches: int = 0
+    sent: int = 0
+    pushed: int = 0
+    collapsed: int = 0
+    conflicts: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+@dataclass
+class _Pending:
+    link_id: int
+    event_id: str
+    item_id: int | None
+    op: str | None
+    payload: Dict[str, Any] | None
+    etag: str | None
+    ids: List[int]
+    attempts: int
+    due: bool
+
+
+def collapse(rows: Iterable[CalendarItemChange], now: datetime) -> List[_Pending]:
+    """Fold journal rows (ordered by id) into one pending call per event.
+
+    insert+update sends the insert with the newest body, insert+delete
+    sends nothing (unless the insert was attempted before),
+    update+delete sends the delete. The base etag is the
+    one of the oldest row. A group is due only when all its rows are.
+    """
+
+    groups: Dict[Tuple[int, str], _Pending] = {}
+    for row in rows:
+        due = naive_utc(row.next_attempt_at) is None or naive_utc(row.next_attempt_at) <= now
+        cur = groups.get((row.link_id, row.event_id))
+        if cur is None:
+            groups[(row.link_id, row.event_id)] = _Pending(
+                row.link_id, row.event_id, row.item_id, row.op, row.payload,
+                row.etag, [row.id], row.attempts or 0, due,
+            )
+            continue
+        cur.ids.append(row.id)
+        cur.attempts = max(cur.attempts, row.attempts or 0)
+        cur.due = cur.due and due
+        if row.op == "delete":
+            # an insert that may already have reached Google must be undone
+            cur.op = None if cur.op in ("insert", None) and not cur.attempts else "delete"
+            cur.payload = None
+        elif cur.op in ("insert", "update"):
+            cur.payload = row.payload
+    return list(groups.values())
+
+
+def _part_for(change: _Pending, calendar_id: str) -> BatchPart:
+    events = f"{BATCH_PATH_PREFIX}/calendars/{quote(calendar_id, safe='')}/events"
+    headers = {"If-Match": change.etag} if change.etag and change.op != "insert" else {}
+    content_id = f"change-{change.ids[0]}"
+    if change.op == "insert":
+        return BatchPart(content_id, "POST", events, body=dict(change.payload or {}, id=change.event_id))
+    path = f"{events}/{quote(change.event_id, safe='')}"
+    if change.op == "update":
+        return BatchPart(content_id, "PATCH", path, headers, change.payload)
+    return BatchPart(content_id, "DELETE", path, headers)
+
+
+def _is_retryable(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class GCalPushWorker:
+    """Drain ``calendar_item_changes`` into Google batch requests."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        *,
+        batch_url: str | None = None,
+        batch_size: int = 50,
+        max_changes: int = 1000,
+        max_attempts: int = 8,
+        base_backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+        lease: float = 300.0,
+    ) -> None:
+        self._client = client
+        self.worker_id = uuid.uuid4().hex
+        self.lease = timedelta(seconds=lease)
+        self.batch_url = batch_url or BATCH_URL
+        self.batch_size = batch_size
+        self.max_changes = max_changes
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            from .sync_gcal import get_client
+
+            return get_client()
+        return self._client
+
+    async def _claim(self, session: AsyncSession, now: datetime) -> List[CalendarItemChange]:
+        """Lease up to ``max_changes`` pending rows to this worker."""
+
+        free = or_(CalendarItemChange.claimed_until.is_(None), CalendarItemChange.claimed_until < now)
+        due = or_(
+            CalendarItemChange.next_attempt_at.is_(None),
+            CalendarItemChange.next_attempt_at <= now,
+        )
+        # rows in back-off are skipped here rather than in collapse(), so
+        # they cannot fill the limit ahead of due ones; an event with such
+        # a row waits as a whole
+        waiting = aliased(CalendarItemChange)
+        backing_off = (
+            select(waiting.id)
+            .where(
+                waiting.status == "pending",
+                waiting.link_id == CalendarItemChange.link_id,
+                waiting.event_id == CalendarItemChange.event_id,
+                waiting.next_attempt_at > now,
+            )
+            .exists()
+        )
+        ids = (
+            await session.execute(
+                select(CalendarItemChange.id)
+                .where(CalendarItemChange.status == "pending", free, due, ~backing_off)
+                .order_by(CalendarItemChange.id)
+                .limit(self.max_changes)
+            )
+        ).scalars().all()
+        if not ids:
+            return []
+        # conditional: rows another worker claimed meanwhile are not taken over
+        await session.execute(
+            update(CalendarItemChange)
+            .where(CalendarItemChange.id.in_(ids), free)
+            .values(claimed_by=self.worker_id, claimed_until=now + self.lease)
+        )
+        await session.commit()
+        rows = (
+            await session.execute(
+                select(CalendarItemChange)
+                .where(
+                    CalendarItemChange.claimed_by == self.worker_id,
+                    CalendarItemChange.status == "pending",
+                )
+                .order_by(CalendarItemChange.id)
+            )
+        ).scalars().all()
+        # events with rows held by another live worker wait for it to finish
+        busy = set(
+            (
+                await session.execute(
+                    select(CalendarItemChange.link_id, CalendarItemChange.event_id).where(
+                        CalendarItemChange.status == "pending",
+                        CalendarItemChange.claimed_by != self.worker_id,
+                        CalendarItemChange.claimed_until >= now,
+                        CalendarItemChange.event_id.in_({r.event_id for r in rows}),
+                    )
+                )
+            ).tuples()
+        )
+        return [r for r in rows if (r.link_id, r.event_id) not in busy]
+
+    async def _release(self, session: AsyncSession) -> None:
+        await session.execute(
+            update(CalendarItemChange)
+            .where(CalendarItemChange.claimed_by == self.worker_id)
+            .values(claimed_by=None, claimed_until=None)
+        )
+        await session.commit()
+
+    async def drain_once(self) -> PushResult:
+        """Send every due pending change once."""
+
+        result = PushResult()
+        now = utcnow()
+        async with db.async_session() as session:
+            rows = await self._claim(session, now)
+            if not rows:
+                await self._release(session)
+                return result
+            try:
+                await self._drain(session, rows, now, result)
+            finally:
+                await session.rollback()  # a batch interrupted by an error
+                await self._release(session)
+        if result.sent:
+            logger.info(
+                "gcal push batches=%s sent=%s pushed=%s conflicts=%s retried=%s failed=%s",
+                result.batches, result.sent, result.pushed,
+                result.conflicts, result.retried, result.failed,
+            )
+        return result
+
+    async def _drain(
+        self,
+        session: AsyncSession,
+        rows: List[CalendarItemChange],
+        now: datetime,
+        result: PushResult,
+    ) -> None:
+        pending = [p for p in collapse(rows, now) if p.due]
+        noop = [i for p in pending if p.op is None for i in p.ids]
+        if noop:
+            await session.execute(
+                delete(CalendarItemChange).where(CalendarItemChange.id.in_(noop))
+            )
+            await session.commit()
+        result.collapsed = sum(len(p.ids) - (p.op is not None) for p in pending)
+        by_link: Dict[int, List[_Pending]] = {}
+        for p in pending:
+            if p.op is not None:
+                by_link.setdefault(p.link_id, []).append(p)
+        if not by_link:
+            return
+        links = {
+            link.id: link
+            for link in (
+                await session.execute(select(GCalLink).where(GCalLink.id.in_(by_link)))
+            ).scalars()
+        }
+        for link_id, changes in by_link.items():
+            link = links.get(link_id)
+            if link is None:
+                continue
+            for i in range(0, len(changes), self.batch_size):
+                await self._send(session, link, changes[i : i + self.batch_size], result)
+                await session.commit()
+
+    async def _send(
+        self,
+        session: AsyncSession,
+        link: GCalLink,
+        changes: List[_Pending],
+        result: PushResult,
+    ) -> None:
+        from .gcal_tokens import token_manager
+
+        parts = {f"change-{c.ids[0]}": c for c in changes}
+        boundary = f"batch_{uuid.uuid4().hex}"
+        result.batches += 1
+        result.sent += len(changes)
+        try:
+            token = await token_manager.get_token(link.id, link)
+            resp = await self.client.post(
+                self.batch_url,
+                content=encode_batch((_part_for(c, link.calendar_id) for c in changes), boundary),
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": f"multipart/mixed; boundary={boundary}",
+                },
+            )
+            if resp.status_code == 401:
+                await token_manager.expire(link.id)
+            resp.raise_for_status()
+            answers = split_batch(resp.content, resp.headers["content-type"])
+        except Exception as exc:
+            logger.warning("gcal push link=%s batch failed: %s", link.id, exc)
+            for change in changes:
+                await self._retry(session, change, str(exc), result)
+            return
+        seen = set()
+        for headers, message in answers:
+            key = headers.get("content-id", "").strip("<>").removeprefix("response-")
+            change = parts.get(key)
+            if change is None:
+                continue
+            seen.add(key)
+            status_line, part_headers, body = parse_http(message)
+            status = int(status_line.split()[1])
+            await self._apply(session, change, status, part_headers, body, result)
+        for key, change in parts.items():
+            if key not in seen:
+                await self._retry(session, change, "missing in batch response", result)
+
+    async def _apply(
+        self,
+        session: AsyncSession,
+        change: _Pending,
+        status: int,
+        headers: Dict[str, str],
+        body: str,
+        result: PushResult,
+    ) -> None:
+        ok = 200 <= status < 300
+        if change.op == "delete" and status in (404, 410):
+            ok = True  # already gone remotely
+        if change.op == "insert" and status == 409:
+            ok = True  # id taken: an earlier attempt went through
+        if ok:
+            result.pushed += 1
+            await session.execute(
+                delete(CalendarItemChange).where(CalendarItemChange.id.in_(change.ids))
+            )
+            etag = headers.get("etag")
+            if body:
+                try:
+                    etag = json.loads(body).get("etag", etag)
+                except ValueError:
+                    pass
+            if etag and change.op != "delete":
+                if change.item_id is not None:
+                    owner_id = await session.scalar(
+                        update(CalendarItem)
+                        .where(CalendarItem.id == change.item_id)
+                        .values(gcal_etag=etag)
+                        .returning(CalendarItem.owner_id)
+                    )
+                    if owner_id is not None:
+                        sync_service.track(session, CalendarItem, owner_id, [change.item_id])
+                # later edits of the same event are now based on this version
+                await session.execute(
+                    update(CalendarItemChange)
+                    .where(
+                        CalendarItemChange.link_id == change.link_id,
+                        CalendarItemChange.event_id == change.event_id,
+                        CalendarItemChange.id > max(change.ids),
+                    )
+                    .values(etag=etag)
+                )
+            return
+        if status == 412:
+            result.conflicts += 1
+            await self._park(session, change, "conflict", f"412 etag {change.etag} is stale")
+            from .gcal_scheduler import gcal_scheduler
+
+            gcal_scheduler.notify(change.link_id)  # pull the remote version
+            return
+        if _is_retryable(status):
+            await self._retry(session, change, f"HTTP {status}", result)
+            return
+        result.failed += 1
+        await self._park(session, change, "failed", f"HTTP {status}: {body[:500]}")
+
+    async def _park(
+        self, session: AsyncSession, change: _Pending, status: str, error: str
+    ) -> None:
+        await session.execute(
+            update(CalendarItemChange)
+            .where(CalendarItemChange.id.in_(change.ids))
+            .values(status=status, last_error=error)
+        )
+
+    async def _retry(
+        self, session: AsyncSession, change: _Pending, error: str, result: PushResult
+    ) -> None:
+        attempts = change.attempts + 1
+        if attempts >= self.max_attempts:
+            result.failed += 1
+            await self._park(session, change, "failed", error)
+            return
+        result.retried += 1
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        await session.execute(
+            update(CalendarItemChange)
+            .where(CalendarItemChange.id.in_(change.ids))
+            .values(
+                attempts=attempts,
+                last_error=error,
+                next_attempt_at=utcnow() + timedelta(seconds=delay),
+            )
+        )
+
+    async def run(
+        self, *, stop_event: asyncio.Event | None = None, poll_interval: float = 15.0
+    ) -> None:
+        """Drain the journal until ``stop_event`` is set."""
+
+        _stop = stop_event or asyncio.Event()
+        logger.info("GCal push: старт")
+        while not _stop.is_set():
+            try:
+                await self.drain_once()
+            except Exception:
+                logger.exception("GCal push: ошибка цикла")
+            try:
+                await asyncio.wait_for(_stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("GCal push: остановка")
+
+
+gcal_push = GCalPushWorker()
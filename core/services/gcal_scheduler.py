@@ -0,0 +1,232 @@
+"""Background scheduler for Google Calendar sync.
+
+Every linked calendar is synced periodically with at most
+``concurrency`` syncs running at once. Webhook pings mark a link dirty;
+pings arriving while a sync is queued or running collapse into a single
+follow-up sync, and pinged links go first. Accounts answering 429/5xx
+(or failing at transport level) are backed off exponentially, honouring
+``Retry-After``. Watch channels are re-opened before ``channel_expiry``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Set
+
+import httpx
+from sqlalchemy import select
+
+from core import db
+from core.logger import logger
+from core.models import GCalLink
+from core.utils import naive_utc, utcnow
+from .sync_gcal import GCalSyncEngine, start_watch
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    if isinstance(exc, httpx.HTTPStatusError):
+        value = exc.response.headers.get("Retry-After")
+        if value and value.isdigit():
+            return float(value)
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429, 5xx and transport errors are worth retrying later."""
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code == 429 or code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class GCalSyncScheduler:
+    """Sync all :class:`GCalLink` rows with bounded concurrency."""
+
+    def __init__(
+        self,
+        engine: GCalSyncEngine | None = None,
+        *,
+        concurrency: int = 4,
+        interval: float = 900.0,
+        debounce: float = 2.0,
+        base_backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+        renew_before: timedelta = timedelta(hours=12),
+        watcher: Callable[..., Awaitable[None]] = start_watch,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._engine = engine
+        self.concurrency = concurrency
+        self.interval = interval
+        self.debounce = debounce
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.renew_before = renew_before
+        self._watch = watcher
+        self._clock = clock
+        self._last_sync: Dict[int, float] = {}
+        self._blocked_until: Dict[int, float] = {}
+        self._failures: Dict[int, int] = {}
+        self._pinged: Dict[int, float] = {}  # link id -> last ping time
+        self._inflight: Set[int] = set()
+        self._wake = asyncio.Event()
+        self.running = False
+        self.stats = {"synced": 0, "failed": 0, "coalesced": 0, "renewed": 0}
+
+    @property
+    def engine(self) -> GCalSyncEngine:
+        if self._engine is None:
+            self._engine = GCalSyncEngine()
+        return self._engine
+
+    # -- webhook side -------------------------------------------------------
+    def notify(self, link_id: int) -> None:
+        """Request an incremental sync; bursts collapse into one run."""
+
+        if link_id in self._pinged:
+            self.stats["coalesced"] += 1
+        self._pinged[link_id] = self._clock()
+        self._wake.set()
+
+    async def notify_channel(self, channel_id: str) -> int | None:
+        """Resolve ``X-Goog-Channel-ID`` to a link and :meth:`notify` it."""
+
+        async with db.async_session() as session:
+            link_id = await session.scalar(
+                select(GCalLink.id).where(GCalLink.channel_id == channel_id)
+            )
+        if link_id is not None:
+            self.notify(link_id)
+        return link_id
+
+    # -- scheduling -----------------------------------------------------------
+    def _due(self, link_ids: Iterable[int], now: float) -> List[int]:
+        """Links to sync now: pinged first (newest ping), then stale ones."""
+
+        ready = [
+            i for i in link_ids
+            if i not in self._inflight and self._blocked_until.get(i, 0.0) <= now
+        ]
+        pinged = sorted((i for i in ready if i in self._pinged), key=lambda i: -self._pinged[i])
+        stale = sorted(
+            (i for i in ready if i not in self._pinged
+             and now - self._last_sync.get(i, float("-inf")) >= self.interval),
+            key=lambda i: self._last_sync.get(i, float("-inf")),
+        )
+        return pinged + stale
+
+    def _backoff(self, link_id: int, exc: BaseException, now: float) -> float:
+        n = self._failures.get(link_id, 0) + 1
+        self._failures[link_id] = n
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (n - 1))
+            delay *= random.uniform(0.8, 1.2)
+        self._blocked_until[link_id] = now + delay
+        return delay
+
+    async def _sync_one(self, link_id: int, sem: asyncio.Semaphore) -> None:
+        async with sem:
+            # Pings arriving from here on schedule another run
+            self._pinged.pop(link_id, None)
+            try:
+                await self.engine.sync(link_id)
+            except Exception as exc:
+                self.stats["failed"] += 1
+                delay = self._backoff(link_id, exc, self._clock())
+                if is_retryable(exc):
+                    logger.warning("gcal sync link=%s backoff %.0fs: %s", link_id, delay, exc)
+                else:
+                    logger.exception("gcal sync link=%s failed, retry in %.0fs", link_id, delay)
+            else:
+                self.stats["synced"] += 1
+                self._failures.pop(link_id, None)
+                self._blocked_until.pop(link_id, None)
+            finally:
+                self._last_sync[link_id] = self._clock()
+                self._inflight.discard(link_id)
+
+    async def _links(self) -> List[tuple[int, str | None, datetime | None]]:
+        async with db.async_session() as session:
+            res = await session.execute(
+                select(GCalLink.id, GCalLink.channel_id, GCalLink.channel_expiry).where(
+                    GCalLink.owner_id.is_not(None)
+                )
+            )
+            return [tuple(r) for r in res.all()]
+
+    async def renew_channels(self, links) -> int:
+        """Re-open watch channels expiring within ``renew_before``."""
+
+        limit = utcnow() + self.renew_before
+        renewed = 0
+        for link_id, channel_id, expiry in links:
+            expiry = naive_utc(expiry)
+            if not channel_id or (expiry is not None and expiry > limit):
+                continue
+            if self._blocked_until.get(link_id, 0.0) > self._clock():
+                continue
+            async with db.async_session() as session:
+                link = await session.get(GCalLink, link_id)
+            if link is None:
+                continue
+            try:
+                await self._watch(link, renew=True)
+                renewed += 1
+            except Exception as exc:
+                self._backoff(link_id, exc, self._clock())
+                logger.warning("gcal watch renewal link=%s failed: %s", link_id, exc)
+        self.stats["renewed"] += renewed
+        return renewed
+
+    async def run_once(self) -> List[int]:
+        """Sync every due link once; return the ids that were started."""
+
+        links = await self._links()
+        now = self._clock()
+        known = {link_id for link_id, _, _ in links}
+        for stale in set(self._pinged) - known:
+            self._pinged.pop(stale, None)
+        due = self._due(known, now)
+        sem = asyncio.Semaphore(self.concurrency)
+        self._inflight.update(due)
+        await asyncio.gather(*(self._sync_one(i, sem) for i in due))
+        await self.renew_channels(links)
+        return due
+
+    async def run(
+        self, *, stop_event: asyncio.Event | None = None, tick: float = 60.0
+    ) -> None:
+        """Loop until ``stop_event``; wakes early on webhook pings."""
+
+        _stop = stop_event or asyncio.Event()
+        self.running = True
+        logger.info("GCal scheduler: старт")
+        try:
+            while not _stop.is_set():
+                # cleared before the run: a ping during it wakes the next one
+                self._wake.clear()
+                try:
+                    await self.run_once()
+                except Exception:
+                    logger.exception("GCal scheduler: ошибка цикла")
+                stopper = asyncio.ensure_future(_stop.wait())
+                waker = asyncio.ensure_future(self._wake.wait())
+                try:
+                    await asyncio.wait({stopper, waker}, timeout=tick, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    stopper.cancel()
+                    waker.cancel()
+                if self._wake.is_set() and not _stop.is_set():
+                    # let a burst of pings settle into one sync
+                    await asyncio.sleep(self.debounce)
+        finally:
+            self.running = False
+            logger.info("GCal scheduler: остановка")
+
+
+gcal_scheduler = GCalSyncScheduler()
@@ -0,0 +1,200 @@
+"""Single-flight OAuth access-token manager for Google links.
+
+Live access tokens are cached in memory per link id. When a token is
+close to expiry exactly one refresh request per link is in flight;
+concurrent callers await the same future. The refreshed token is
+written back with one ``UPDATE`` and never through callers' sessions.
+A background loop refreshes cached tokens ahead of expiry so request
+paths rarely wait on the token endpoint.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict
+
+import httpx
+from sqlalchemy import select, update
+
+from core import db
+from core.logger import logger
+from core.models import GCalLink
+from core.utils import naive_utc, utcnow
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    access_token: str
+    expires_at: datetime  # naive UTC
+
+    def fresh(self, margin: timedelta) -> bool:
+        return self.expires_at - margin > utcnow()
+
+
+class GCalTokenManager:
+    """Per-link access token cache with single-flight refresh."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        *,
+        token_url: str | None = None,
+        margin: timedelta = timedelta(minutes=1),
+        proactive: timedelta = timedelta(minutes=10),
+    ) -> None:
+        self._client = client
+        self._token_url = token_url
+        self.margin = margin
+        self.proactive = proactive
+        self._cache: Dict[int, CachedToken] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        # links whose stored token Google rejected; never seeded from columns again
+        self._rejected: set[int] = set()
+        self.refreshes = 0
+
+    def _http(self) -> tuple[httpx.AsyncClient, str]:
+        from .sync_gcal import TOKEN_URL, get_client
+
+        return self._client or get_client(), self._token_url or TOKEN_URL
+
+    def invalidate(self, link_id: int) -> None:
+        """Forget a token; the next :meth:`get` refreshes it."""
+        self._cache.pop(link_id, None)
+        self._rejected.add(link_id)
+
+    async def expire(self, link_id: int) -> None:
+        """Google answered 401: drop the token here and in the stored columns.
+
+        Clearing ``token_expiry`` makes other processes refresh as well
+        instead of reusing the revoked token until it would have expired.
+        """
+
+        self.invalidate(link_id)
+        async with db.async_session() as session:
+            await session.execute(
+                update(GCalLink).where(GCalLink.id == link_id).values(token_expiry=None)
+            )
+            await session.commit()
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._rejected.clear()
+
+    async def get(self, link_id: int, link: GCalLink | None = None) -> CachedToken:
+        """Return a usable token, refreshing at most once per link.
+
+        ``link`` (if loaded already) seeds the cache from stored columns.
+        """
+
+        cached = self._cache.get(link_id)
+        if cached is not None and cached.fresh(self.margin):
+            return cached
+        if (
+            link is not None
+            and link_id not in self._rejected
+            and link.access_token
+            and link.token_expiry
+        ):
+            stored = CachedToken(link.access_token, naive_utc(link.token_expiry))
+            if stored.fresh(self.margin):
+                self._cache[link_id] = stored
+                return stored
+        return await self.refresh(link_id)
+
+    async def get_token(self, link_id: int, link: GCalLink | None = None) -> str:
+        return (await self.get(link_id, link)).access_token
+
+    async def refresh(self, link_id: int) -> CachedToken:
+        """Refresh ``link_id`` now; concurrent calls share one request."""
+
+        fut = self._inflight.get(link_id)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[link_id] = fut
+        try:
+            token = await self._do_refresh(link_id)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(link_id, None)
+        fut.set_result(token)
+        return token
+
+    async def _do_refresh(self, link_id: int) -> CachedToken:
+        from web.config import S
+
+        async with db.async_session() as session:
+            refresh_token = await session.scalar(
+                select(GCalLink.refresh_token).where(GCalLink.id == link_id)
+            )
+        if not refresh_token:
+            raise ValueError("not linked")
+        client, token_url = self._http()
+        resp = await client.post(
+            token_url,
+            data={
+                "client_id": S.GOOGLE_CLIENT_ID,
+                "client_secret": S.GOOGLE_CLIENT_SECRET,
+                "refresh_token": refresh_token,
+                "grant_type": "refresh_token",
+            },
+        )
+        resp.raise_for_status()
+        payload = resp.json()
+        token = CachedToken(
+            payload["access_token"],
+            utcnow() + timedelta(seconds=int(payload.get("expires_in", 3600))),
+        )
+        async with db.async_session() as session:
+            await session.execute(
+                update(GCalLink)
+                .where(GCalLink.id == link_id)
+                .values(
+                    access_token=token.access_token,
+                    token_expiry=token.expires_at,
+                    updated_at=utcnow(),
+                )
+            )
+            await session.commit()
+        self.refreshes += 1
+        self._rejected.discard(link_id)
+        self._cache[link_id] = token
+        return token
+
+    async def refresh_expiring(self) -> int:
+        """Refresh cached tokens expiring within ``proactive``."""
+
+        due = [i for i, t in list(self._cache.items()) if not t.fresh(self.proactive)]
+        done = 0
+        for link_id in due:
+            try:
+                await self.refresh(link_id)
+                done += 1
+            except Exception:
+                logger.warning("gcal token refresh link=%s failed", link_id, exc_info=True)
+                self.invalidate(link_id)
+        return done
+
+    async def run(
+        self, *, stop_event: asyncio.Event | None = None, poll_interval: float = 60.0
+    ) -> None:
+        """Keep cached tokens fresh until ``stop_event`` is set."""
+
+        _stop = stop_event or asyncio.Event()
+        while not _stop.is_set():
+            await self.refresh_expiring()
+            try:
+                await asyncio.wait_for(_stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+token_manager = GCalTokenManager()
@@ -0,0 +1,198 @@
+"""iCalendar feed rendering with a versioned in-process cache.
+
+Calendar clients poll the feed every few minutes, while the underlying
+items change rarely. The feed body is therefore cached per
+``(owner, scope, id)`` and keyed by a cheap version query
+(``max(updated_at)`` plus row count, so deletions are noticed too).
+Concurrent requests for the same missing version share one build.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, UTC
+from typing import Awaitable, Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models import CalendarItem
+
+
+def _ics_ts(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%SZ")
+
+
+ICS_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//LeonidPro//EN\r\n"
+ICS_FOOTER = "END:VCALENDAR"
+
+
+def render_component(e: CalendarItem, dtstamp: datetime) -> str:
+    """Render one calendar item as a VEVENT (timed) or VTODO (no end)."""
+
+    now = _ics_ts(dtstamp)
+    if e.end_at:
+        return (
+            "BEGIN:VEVENT\r\n"
+            f"UID:{e.id}@leonidpro\r\n"
+            f"DTSTAMP:{now}\r\n"
+            f"DTSTART:{_ics_ts(e.start_at)}\r\n"
+            f"DTEND:{_ics_ts(e.end_at)}\r\n"
+            f"SUMMARY:{e.title}\r\n"
+            "END:VEVENT\r\n"
+        )
+    return (
+        "BEGIN:VTODO\r\n"
+        f"UID:{e.id}@leonidpro\r\n"
+        f"DTSTAMP:{now}\r\n"
+        f"DUE:{_ics_ts(e.start_at)}\r\n"
+        f"SUMMARY:{e.title}\r\n"
+        f"STATUS:{e.status.value.upper()}\r\n"
+        "END:VTODO\r\n"
+    )
+
+
+def iter_ics(items: Iterable[CalendarItem], dtstamp: datetime) -> Iterator[str]:
+    """Yield the iCalendar document for ``items`` piece by piece.
+
+    ``dtstamp`` is fixed by the caller so that the same data always renders
+    to the same bytes, which keeps ETags stable between polls.
+    """
+
+    yield ICS_HEADER
+    for e in items:
+        yield render_component(e, dtstamp)
+    yield ICS_FOOTER
+
+
+def scope_filters(owner_id: int, scope: str, scope_id: int | None) -> list:
+    """WHERE clauses selecting the feed's calendar items."""
+
+    conds = [CalendarItem.owner_id == owner_id]
+    if scope == "project" and scope_id:
+        conds.append(CalendarItem.project_id == scope_id)
+    elif scope == "area" and scope_id:
+        conds.append(CalendarItem.area_id == scope_id)
+    return conds
+
+
+@dataclass(frozen=True)
+class FeedVersion:
+    """Version marker for a feed scope."""
+
+    last_modified: datetime
+    count: int
+
+    @property
+    def etag(self) -> str:
+        raw = f"{self.last_modified.isoformat()}:{self.count}"
+        return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+    @property
+    def http_last_modified(self) -> datetime:
+        """``last_modified`` rounded down to HTTP-date precision."""
+        return self.last_modified.replace(microsecond=0)
+
+
+async def feed_version(
+    session: AsyncSession, owner_id: int, scope: str, scope_id: int | None
+) -> FeedVersion:
+    """Return current version using a single aggregate query."""
+
+    stmt = select(func.max(CalendarItem.updated_at), func.count(CalendarItem.id)).where(
+        *scope_filters(owner_id, scope, scope_id)
+    )
+    last, count = (await session.execute(stmt)).one()
+    if last is None:
+        last = datetime(1970, 1, 1)
+    if isinstance(last, str):  # pragma: no cover - SQLite aggregate returns text
+        last = datetime.fromisoformat(last)
+    if last.tzinfo is None:
+        last = last.replace(tzinfo=UTC)
+    return FeedVersion(last, int(count or 0))
+
+
+class IcsFeedCache:
+    """LRU cache of rendered feeds with single-flight builds."""
+
+    def __init__(self, max_entries: int = 512, token_ttl: float = 60.0) -> None:
+        self.max_entries = max_entries
+        self.token_ttl = token_ttl
+        self._bodies: OrderedDict[tuple, tuple[FeedVersion, bytes]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self._tokens: dict[str, tuple[float, int]] = {}
+        self.builds = 0
+
+    # -- token hash -> owner --------------------------------------------
+    def owner_for_token(self, token_hash: str) -> Optional[int]:
+        hit = self._tokens.get(token_hash)
+        if hit is None:
+            return None
+        expires, owner_id = hit
+        if expires < time.monotonic():
+            self._tokens.pop(token_hash, None)
+            return None
+        return owner_id
+
+    def remember_token(self, token_hash: str, owner_id: int) -> None:
+        self._tokens[token_hash] = (time.monotonic() + self.token_ttl, owner_id)
+
+    def forget_owner(self, owner_id: int) -> None:
+        """Drop cached token lookups and bodies for ``owner_id``."""
+
+        for h in [h for h, (_, o) in self._tokens.items() if o == owner_id]:
+            self._tokens.pop(h, None)
+        for key in [k for k in self._bodies if k[0] == owner_id]:
+            self._bodies.pop(key, None)
+
+    # -- bodies -----------------------------------------------------------
+    async def get_or_build(
+        self,
+        key: tuple,
+        version: FeedVersion,
+        build: Callable[[], Awaitable[bytes]],
+    ) -> bytes:
+        """Return cached body for ``version`` or build it exactly once."""
+
+        cached = self._bodies.get(key)
+        if cached is not None and cached[0] == version:
+            self._bodies.move_to_end(key)
+            return cached[1]
+
+        flight_key = (key, version)
+        fut = self._inflight.get(flight_key)
+        if fut is not None:
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = fut
+        try:
+            body = await build()
+            self.builds += 1
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # retrieve exception so it is not reported as "never retrieved"
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(flight_key, None)
+        fut.set_result(body)
+        self._bodies[key] = (version, body)
+        self._bodies.move_to_end(key)
+        while len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+        return body
+
+    def clear(self) -> None:
+        self._bodies.clear()
+        self._tokens.clear()
+
+
+feed_cache = IcsFeedCache()
@@ -0,0 +1,402 @@
+"""Streaming iCalendar (.ics) import into calendar items.
+
+:class:`VEventParser` is fed raw chunks and hands back complete VEVENTs
+as soon as their ``END:VEVENT`` line arrives, so only the current
+(unfolded) line and the current event are kept in memory.
+:class:`IcsImportService` turns events into ``CalendarItem`` rows and
+writes them in batches with one upsert per batch keyed by
+``(owner_id, ics_uid)``: importing the same file twice updates items
+instead of duplicating them.
+
+Recurring events (``RRULE``) are expanded with the task recurrence engine
+(:mod:`core.services.recurrence_service`) into one item per occurrence
+from ``RRULE_PAST_DAYS`` ago up to ``RRULE_FUTURE_DAYS`` ahead, keyed
+``<UID>#<start in UTC>``; ``EXDATE`` dates are left out. An override
+(``RECURRENCE-ID``) has the same key as the occurrence it replaces, so it
+wins over the expanded one wherever it appears in the file; a cancelled
+override removes the occurrence. Rules the engine does not support
+(``FREQ=HOURLY`` etc.) are skipped rather than imported as one event.
+"""
+
+from __future__ import annotations
+
+import codecs
+import re
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from typing import AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.logger import logger
+from core.models import CalendarItem, CalendarItemStatus, Project
+from core.utils import utcnow
+from . import sync_service
+from .recurrence_service import HORIZON_DAYS, expand, parse_rule
+
+MAX_LINE = 64 * 1024  # longer lines (inline attachments) are truncated
+RRULE_PAST_DAYS = 365
+RRULE_FUTURE_DAYS = HORIZON_DAYS
+
+_ESCAPED = re.compile(r"\\([\\;,nN])")
+_DURATION = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+
+
+@dataclass
+class ParsedEvent:
+    uid: str | None
+    title: str
+    start_at: datetime | None  # naive UTC
+    end_at: datetime | None
+    cancelled: bool = False
+    rrule: str | None = None
+    recurrence_id: datetime | None = None  # set on overrides of one occurrence
+    exdates: List[date] = field(default_factory=list)
+
+
+def _unescape(value: str) -> str:
+    return _ESCAPED.sub(lambda m: " " if m.group(1) in "nN" else m.group(1), value)
+
+
+def _split_property(line: str) -> Tuple[str, Dict[str, str], str]:
+    """Split ``NAME;PARAM=V:value`` honouring quoted parameter values."""
+
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ":" and not quoted:
+            head, value = line[:i], line[i + 1 :]
+            break
+    else:
+        return line.strip().upper(), {}, ""
+    name, *raw = head.split(";")
+    params = {}
+    for param in raw:
+        key, _, val = param.partition("=")
+        params[key.strip().upper()] = val.strip('"')
+    return name.strip().upper(), params, value
+
+
+def _parse_dt(value: str, params: Dict[str, str], default_tz: ZoneInfo) -> datetime | None:
+    value = value.strip()
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime.combine(date(int(value[:4]), int(value[4:6]), int(value[6:8])), datetime.min.time())
+        utc = value.endswith("Z")
+        raw = value.rstrip("Z")
+        fmt = "%Y%m%dT%H%M%S" if len(raw) == 15 else "%Y%m%dT%H%M"
+        dt = datetime.strptime(raw, fmt)
+    except ValueError:
+        return None
+    if utc:
+        return dt
+    tz = default_tz
+    if params.get("TZID"):
+        try:
+            tz = ZoneInfo(params["TZID"].lstrip("/"))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return dt.replace(tzinfo=tz).astimezone(UTC).replace(tzinfo=None)
+
+
+def _parse_duration(value: str) -> timedelta | None:
+    m = _DURATION.match(value.strip())
+    if not m:
+        return None
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+        minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    return -delta if sign == "-" else delta
+
+
+def to_event(props: Dict[str, Tuple[Dict[str, str], str]], default_tz: ZoneInfo) -> ParsedEvent:
+    """Build a :class:`ParsedEvent` from collected VEVENT properties."""
+
+    start = end = None
+    if "DTSTART" in props:
+        start = _parse_dt(props["DTSTART"][1], props["DTSTART"][0], default_tz)
+    if "DTEND" in props:
+        end = _parse_dt(props["DTEND"][1], props["DTEND"][0], default_tz)
+    elif start is not None and "DURATION" in props:
+        duration = _parse_duration(props["DURATION"][1])
+        end = start + duration if duration is not None else None
+    uid = props.get("UID", ({}, ""))[1].strip() or None
+    title = _unescape(props.get("SUMMARY", ({}, ""))[1]).strip() or "(без названия)"
+    recurrence_id = None
+    if "RECURRENCE-ID" in props:
+        recurrence_id = _parse_dt(props["RECURRENCE-ID"][1], props["RECURRENCE-ID"][0], default_tz)
+    exdates = []
+    if "EXDATE" in props:
+        params, value = props["EXDATE"]
+        for raw in value.split(","):
+            dt = _parse_dt(raw, params, default_tz)
+            if dt is not None:
+                exdates.append(dt.date())
+    return ParsedEvent(
+        uid=uid[:255] if uid else None,
+        title=title[:255],
+        start_at=start,
+        end_at=end,
+        cancelled=props.get("STATUS", ({}, ""))[1].strip().upper() == "CANCELLED",
+        rrule=props.get("RRULE", ({}, ""))[1].strip() or None,
+        recurrence_id=recurrence_id,
+        exdates=exdates,
+    )
+
+
+def occurrence_uid(uid: str, start: datetime) -> str:
+    return f"{uid[:237]}#{start:%Y%m%dT%H%M%SZ}"  # fits ics_uid (255)
+
+
+class VEventParser:
+    """Incremental iCalendar reader yielding one VEVENT at a time."""
+
+    def __init__(self, default_tz: str = "UTC") -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._tz = ZoneInfo(default_tz)
+        self._tail = ""  # incomplete physical line
+        self._logical: str | None = None  # current unfolded line
+        self._props: Dict[str, Tuple[Dict[str, str], str]] | None = None
+        self._nested = 0  # VALARM etc. inside the current VEVENT
+
+    def feed(self, data: bytes | str) -> List[ParsedEvent]:
+        text = data if isinstance(data, str) else self._decoder.decode(data)
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()[:MAX_LINE]
+        out: List[ParsedEvent] = []
+        for line in lines:
+            self._physical(line.rstrip("\r"), out)
+        return out
+
+    def close(self) -> List[ParsedEvent]:
+        out: List[ParsedEvent] = []
+        rest = self._tail + self._decoder.decode(b"", final=True)
+        self._tail = ""
+        if rest:
+            self._physical(rest.rstrip("\r"), out)
+        self._flush(out)
+        return out
+
+    def _physical(self, line: str, out: List[ParsedEvent]) -> None:
+        if line[:1] in (" ", "\t"):  # folded continuation
+            if self._logical is not None and len(self._logical) < MAX_LINE:
+                self._logical += line[1:]
+            return
+        self._flush(out)
+        self._logical = line
+
+    def _flush(self, out: List[ParsedEvent]) -> None:
+        line, self._logical = self._logical, None
+        if not line:
+            return
+        name, params, value = _split_property(line[:MAX_LINE])
+        component = value.strip().upper()
+        if name == "BEGIN":
+            if component == "VEVENT":
+                self._props, self._nested = {}, 0
+            elif self._props is not None:
+                self._nested += 1
+        elif name == "END":
+            if self._props is None:
+                return
+            if component == "VEVENT":
+                out.append(to_event(self._props, self._tz))
+                self._props = None
+            elif self._nested:
+                self._nested -= 1
+        elif self._props is not None and not self._nested:
+            if name == "EXDATE" and name in self._props:  # may repeat
+                first, seen = self._props[name]
+                self._props[name] = (first, f"{seen},{value}")
+            else:
+                self._props.setdefault(name, (params, value))
+
+
+async def _aiter(chunks: AsyncIterable[bytes] | Iterable[bytes]):
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:
+            yield chunk
+    else:
+        for chunk in chunks:
+            yield chunk
+
+
+@dataclass
+class ImportResult:
+    parsed: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    batches: int = 0
+
+
+class IcsImportService:
+    """Import .ics streams into :class:`CalendarItem` rows."""
+
+    def __init__(self, session: Optional[AsyncSession] = None, *, batch_size: int = 500) -> None:
+        self.session = session
+        self._external = session is not None
+        self.batch_size = batch_size
+
+    async def __aenter__(self) -> "IcsImportService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    async def import_stream(
+        self,
+        chunks: AsyncIterable[bytes] | Iterable[bytes],
+        *,
+        owner_id: int,
+        area_id: int | None = None,
+        project_id: int | None = None,
+        default_tz: str = "UTC",
+        on_progress: Callable[[ImportResult], None] | None = None,
+    ) -> ImportResult:
+        """Parse ``chunks`` and upsert events; flushes, caller commits."""
+
+        if project_id is None and area_id is None:
+            raise ValueError("project_id or area_id is required")
+        if project_id is not None and area_id is None:
+            project = await self.session.get(Project, project_id)
+            if not project:
+                raise ValueError("project not found")
+            area_id = project.area_id
+        try:
+            parser = VEventParser(default_tz)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError("unknown time zone")
+        scope = {"owner_id": owner_id, "area_id": area_id, "project_id": project_id}
+        result = ImportResult()
+        batch: Dict[str, dict] = {}
+        cancelled: set[str] = set()
+
+        # occurrence keys set by RECURRENCE-ID overrides: the expansion of
+        # their series must not overwrite them, whatever the order in the file
+        overridden: set[str] = set()
+        now = utcnow()
+        window = (now - timedelta(days=RRULE_PAST_DAYS), now + timedelta(days=RRULE_FUTURE_DAYS))
+
+        def rows_for(event: ParsedEvent) -> List[dict] | None:
+            if event.recurrence_id is not None:
+                key = occurrence_uid(event.uid, event.recurrence_id)
+                overridden.add(key)
+                batch.pop(key, None)
+                if event.cancelled:
+                    cancelled.add(key)
+                    return []
+                return [{"ics_uid": key, "start_at": event.start_at, "end_at": event.end_at}]
+            if event.cancelled:
+                return None
+            if event.rrule is None:
+                return [{"ics_uid": event.uid, "start_at": event.start_at, "end_at": event.end_at}]
+            try:
+                rule = parse_rule(event.rrule)
+            except ValueError:
+                logger.debug("ics import: unsupported RRULE %s in %s", event.rrule, event.uid)
+                return None
+            length = event.end_at - event.start_at if event.end_at else None
+            return [
+                {"ics_uid": key, "start_at": at, "end_at": at + length if length else None}
+                for at in expand(rule, event.start_at, *window, skip=event.exdates)
+                if (key := occurrence_uid(event.uid, at)) not in overridden
+            ]
+
+        async def consume(events: List[ParsedEvent]) -> None:
+            for event in events:
+                result.parsed += 1
+                rows = None if event.uid is None or event.start_at is None else rows_for(event)
+                if rows is None:
+                    result.skipped += 1
+                    continue
+                for row in rows:
+                    if row["ics_uid"] in batch:
+                        result.updated += 1  # repeated UID in the file: last wins
+                    batch[row["ics_uid"]] = {**scope, **row, "title": event.title}
+                    if len(batch) >= self.batch_size:
+                        await self._write(batch, owner_id, result, on_progress)
+
+        async for chunk in _aiter(chunks):
+            await consume(parser.feed(chunk))
+        await consume(parser.close())
+        if batch:
+            await self._write(batch, owner_id, result, on_progress)
+        if cancelled:
+            await self._delete(cancelled, owner_id)
+        logger.info(
+            "ics import owner=%s parsed=%s created=%s updated=%s skipped=%s",
+            owner_id, result.parsed, result.created, result.updated, result.skipped,
+        )
+        return result
+
+    async def _delete(self, uids: set[str], owner_id: int) -> None:
+        """Remove occurrences cancelled by overrides (imported earlier)."""
+
+        res = await self.session.execute(
+            select(CalendarItem).where(
+                CalendarItem.owner_id == owner_id, CalendarItem.ics_uid.in_(list(uids))
+            )
+        )
+        for item in res.scalars():
+            await self.session.delete(item)
+        await self.session.flush()
+
+    async def _write(
+        self,
+        batch: Dict[str, dict],
+        owner_id: int,
+        result: ImportResult,
+        on_progress: Callable[[ImportResult], None] | None,
+    ) -> None:
+        existing = set(
+            (
+                await self.session.execute(
+                    select(CalendarItem.ics_uid).where(
+                        CalendarItem.owner_id == owner_id,
+                        CalendarItem.ics_uid.in_(list(batch)),
+                    )
+                )
+            ).scalars()
+        )
+        now = utcnow()
+        rows = [
+            dict(row, status=CalendarItemStatus.planned, created_at=now, updated_at=now)
+            for row in batch.values()
+        ]
+        dialect = self.session.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(CalendarItem).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CalendarItem.owner_id, CalendarItem.ics_uid],
+            set_={
+                "title": stmt.excluded.title,
+                "start_at": stmt.excluded.start_at,
+                "end_at": stmt.excluded.end_at,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ).returning(CalendarItem.id)
+        ids = (await self.session.execute(stmt)).scalars().all()
+        sync_service.track(self.session, CalendarItem, owner_id, ids)
+        result.updated += len(existing)
+        result.created += len(rows) - len(existing)
+        result.batches += 1
+        batch.clear()
+        if on_progress is not None:
+            on_progress(result)
@@ -0,0 +1,235 @@
+"""Per-owner live events pushed to open browser tabs.
+
+Services call :func:`emit` with their session; the event is staged in
+``session.info`` and published by :data:`broker` only after the session
+commits (a rollback drops it), so clients never see changes that did
+not happen. Without a session the event is published at once (workers
+that send notifications).
+
+:class:`EventBroker` fans events out to local subscribers through
+bounded queues: a slow client loses its oldest events and gets a
+``lagged`` flag instead of growing memory. With ``LIVE_EVENTS=redis``
+every process also publishes to one Redis channel and relays events
+of the other processes (bot, workers) to its own subscribers.
+``GET /api/v1/events`` streams them as Server-Sent Events.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.logger import logger
+
+PENDING_KEY = "live_events"
+CHANNEL = "live:events"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+@dataclass
+class LiveEvent:
+    owner_id: int
+    type: str
+    data: Dict[str, Any]
+    id: int = 0
+
+    def sse(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, default=_json_default)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+@dataclass(eq=False)
+class Subscription:
+    owner_id: int
+    queue: asyncio.Queue
+    lagged: bool = False
+
+    async def next(self, timeout: float | None = None) -> LiveEvent | None:
+        """Next event, or ``None`` after ``timeout`` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+@dataclass(eq=False)
+class EventBroker:
+    """In-process fan-out with an optional Redis relay between processes."""
+
+    queue_size: int = 100
+    redis: Any = None
+    origin: str = field(default_factory=lambda: uuid.uuid4().hex)
+    stats: Dict[str, int] = field(
+        default_factory=lambda: {"published": 0, "delivered": 0, "dropped": 0, "relayed": 0}
+    )
+
+    def __post_init__(self) -> None:
+        self._subs: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._ids = itertools.count(1)
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(s) for s in self._subs.values())
+
+    def subscribe(self, owner_id: int) -> Subscription:
+        sub = Subscription(owner_id, asyncio.Queue(self.queue_size))
+        self._subs[owner_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subs.get(sub.owner_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.owner_id]
+
+    def deliver(self, ev: LiveEvent) -> int:
+        """Put ``ev`` into the local queues of its owner; returns the count."""
+
+        ev.id = next(self._ids)
+        subs = self._subs.get(ev.owner_id, ())
+        for sub in subs:
+            if sub.queue.full():
+                sub.queue.get_nowait()
+                sub.lagged = True
+                self.stats["dropped"] += 1
+            sub.queue.put_nowait(ev)
+        self.stats["delivered"] += len(subs)
+        return len(subs)
+
+    def publish(self, owner_id: int, type: str, data: Dict[str, Any] | None = None) -> None:
+        ev = LiveEvent(owner_id, type, data or {})
+        self.stats["published"] += 1
+        self.deliver(ev)
+        if self.redis is not None:
+            message = json.dumps(
+                {"origin": self.origin, "owner_id": owner_id, "type": type, "data": ev.data},
+                default=_json_default,
+            )
+            task = asyncio.get_running_loop().create_task(self._send(message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, message: str) -> None:
+        try:
+            await self.redis.publish(CHANNEL, message)
+        except Exception:
+            logger.exception("live events: redis publish failed")
+
+    async def relay(self, *, stop_event: asyncio.Event | None = None) -> None:
+        """Deliver events published by other processes (``LIVE_EVENTS=redis``)."""
+
+        if self.redis is None:
+            return
+        _stop = stop_event or asyncio.Event()
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(CHANNEL)
+        logger.info("Live events relay: старт")
+        try:
+            while not _stop.is_set():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+                try:
+                    raw = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if raw.get("origin") == self.origin:
+                    continue
+                self.stats["relayed"] += 1
+                self.deliver(LiveEvent(int(raw["owner_id"]), raw["type"], raw.get("data") or {}))
+        finally:
+            await pubsub.unsubscribe(CHANNEL)
+            await pubsub.aclose()
+            logger.info("Live events relay: остановка")
+
+    async def stream(
+        self, owner_id: int, *, heartbeat: float = 15.0, is_disconnected=None
+    ) -> AsyncIterator[str]:
+        """SSE text for one client until it disconnects."""
+
+        sub = self.subscribe(owner_id)
+        try:
+            # sent on every (re)connect: the client reloads its state, since
+            # events published while it was away are not replayed; ``shared``
+            # tells whether events of other processes reach this stream
+            ready = json.dumps({"shared": self.redis is not None})
+            yield f"retry: 5000\nevent: ready\ndata: {ready}\n\n"
+            while True:
+                ev = await sub.next(heartbeat)
+                if is_disconnected is not None and await is_disconnected():
+                    break
+                if sub.lagged:
+                    sub.lagged = False
+                    yield "event: lagged\ndata: {}\n\n"  # client should reload its state
+                yield ev.sse() if ev is not None else ": ping\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "subscribers": self.subscribers, "redis": self.redis is not None}
+
+
+def create_broker(kind: str | None = None) -> EventBroker:
+    """Build the broker selected by ``LIVE_EVENTS`` (memory | redis)."""
+
+    kind = (kind or os.getenv("LIVE_EVENTS") or "memory").lower()
+    queue_size = int(os.getenv("LIVE_EVENTS_QUEUE", "100"))
+    if kind == "memory":
+        return EventBroker(queue_size=queue_size)
+    if kind == "redis":
+        from redis.asyncio import Redis
+
+        redis = Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            db=int(os.getenv("LIVE_EVENTS_REDIS_DB", "0")),
+        )
+        return EventBroker(queue_size=queue_size, redis=redis)
+    raise ValueError(f"unknown LIVE_EVENTS: {kind}")
+
+
+broker = create_broker()
+
+
+def emit(session: Any, owner_id: int | None, type: str, **data: Any) -> None:
+    """Publish after ``session`` commits (``AsyncSession`` or ``Session``)."""
+
+    if owner_id is None:
+        return
+    if session is None:
+        broker.publish(owner_id, type, data)
+        return
+    sync = getattr(session, "sync_session", session)
+    pending: List = sync.info.setdefault(PENDING_KEY, [])
+    pending.append((owner_id, type, data))
+
+
+@event.listens_for(Session, "after_commit")
+def _session_committed(session: Session) -> None:
+    for owner_id, type, data in session.info.pop(PENDING_KEY, ()):
+        broker.publish(owner_id, type, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _session_rolled_back(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
@@ -14,6 +14,7 @@ from typing import Awaitable, Callable, Iterable
 
 from core.logger import logger
 from core.utils import utcnow
+from . import live_events
 from .reminder_service import ReminderService
 
 
@@ -78,6 +79,9 @@ async def run_reminder_dispatcher(
                 try:
                     await _sender(r.owner_id, r.message)
                     sent_ids.append(r.id)
+                    live_events.emit(
+                        None, r.owner_id, "reminder.fired", id=r.id, message=r.message, task_id=r.task_id
+                    )
                 except Exception:
                     logger.exception("Ошибка отправки напоминания", extra={"id": r.id})
             if sent_ids:
@@ -22,6 +22,8 @@ from core.models import (
 from core.utils import utcnow
 from .nexus_service import CRUDService
 from .alarm_service import AlarmService
+from .freebusy_service import FreeBusyService
+from .gcal_push import PUSHED_FIELDS, journal_change
 
 
 class AreaRepository(CRUDService[Area]):
@@ -71,6 +73,7 @@ class CalendarItemRepository(CRUDService[CalendarItem]):
         project_id: int | None = None,
         area_id: int | None = None,
         status: CalendarItemStatus = CalendarItemStatus.planned,
+        task_id: int | None = None,
     ) -> CalendarItem:
         if project_id is None and area_id is None:
             raise ValueError("project_id or area_id is required")
@@ -87,11 +90,19 @@ class CalendarItemRepository(CRUDService[CalendarItem]):
             project_id=project_id,
             area_id=area_id,
             status=status,
+            task_id=task_id,
         )
         self.session.add(item)
         await self.session.flush()
         alarm_service = AlarmService(self.session)
         await alarm_service.create_alarm(item.id, utcnow())
+        # Overlaps are reported, not rejected: callers decide what to do.
+        item.conflicts = []
+        if end_at is not None:
+            item.conflicts = await FreeBusyService(self.session).conflicts(
+                owner_id, start_at, end_at, exclude=("item", item.id)
+            )
+        await journal_change(self.session, item, "insert")
         return item
 
     async def list(
@@ -124,9 +135,17 @@ class CalendarItemRepository(CRUDService[CalendarItem]):
         obj = await super().update(obj_id, **kwargs)
         if obj is not None:
             obj.updated_at = utcnow()
+            if PUSHED_FIELDS.intersection(kwargs):
+                await journal_change(self.session, obj, "update")
             await self.session.flush()
         return obj
 
+    async def delete(self, obj_id: int) -> bool:
+        obj = await self.get(obj_id)
+        if obj is not None:
+            await journal_change(self.session, obj, "delete")
+        return await super().delete(obj_id)
+
 
 class AlarmRepository(CRUDService[Alarm]):
     """Repository for :class:`Alarm` objects."""
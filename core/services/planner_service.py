@@ -0,0 +1,235 @@
+"""Time-blocking planner: fit open tasks into free calendar slots.
+
+Tasks are ordered earliest-deadline-first, then by ``neural_priority``
+and shorter estimates, and placed greedily into the first free slot that
+is long enough, ends before the deadline and whose day still has
+cognitive budget left. Slots come from :class:`FreeBusyService` clipped to
+working hours. The core :func:`plan` is pure and runs in
+``O(tasks * slots)``; proposals are written as ``CalendarItem`` rows
+through :class:`CalendarItemRepository` (alarm, Google journal, conflict
+flags) and remember their task, so tasks that already have a planned
+block that has not ended are not planned again.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.models import CalendarItem, CalendarItemStatus, Task, TaskStatus
+from core.utils import naive_utc, utcnow
+from .freebusy_service import FreeBusyService, IntervalTree
+from .para_repository import CalendarItemRepository
+
+
+DEFAULT_ESTIMATE_MINUTES = 30
+DEFAULT_DAILY_BUDGET = 20
+_FAR = datetime.max
+
+
+@dataclass
+class PlanTask:
+    """Planner view of a :class:`Task`."""
+
+    id: int
+    title: str
+    minutes: int
+    cost: int = 1
+    priority: float = 0.0
+    due: datetime | None = None
+    area_id: int | None = None
+    project_id: int | None = None
+
+    @classmethod
+    def from_model(cls, task: Task) -> "PlanTask":
+        return cls(
+            id=task.id,
+            title=task.title,
+            minutes=task.estimate_minutes or DEFAULT_ESTIMATE_MINUTES,
+            cost=task.cognitive_cost or 1,
+            priority=task.neural_priority or 0.0,
+            due=naive_utc(task.due_date) if task.due_date else None,
+            area_id=task.area_id,
+            project_id=task.project_id,
+        )
+
+
+@dataclass
+class Placement:
+    task_id: int
+    title: str
+    start: datetime
+    end: datetime
+    area_id: int | None = None
+    project_id: int | None = None
+
+
+@dataclass
+class Plan:
+    placements: List[Placement] = field(default_factory=list)
+    unplaced: Dict[int, str] = field(default_factory=dict)
+
+
+def plan(
+    tasks: Sequence[PlanTask],
+    slots: Sequence[tuple[datetime, datetime]],
+    *,
+    daily_budget: int = DEFAULT_DAILY_BUDGET,
+) -> Plan:
+    """Greedily place ``tasks`` into ``slots`` (sorted, non-overlapping).
+
+    Unplaced tasks are reported with a reason: ``too_long`` (no slot is
+    long enough), ``deadline`` (nothing fits before ``due``) or ``budget``
+    (fitting days have no cognitive budget left).
+    """
+
+    free = sorted([s, e] for s, e in slots if e > s)
+    spent: Dict[date, int] = {}
+    longest = max((e - s for s, e in free), default=timedelta(0))
+    result = Plan()
+    order = sorted(tasks, key=lambda t: (t.due or _FAR, -t.priority, t.minutes, t.id))
+    for t in order:
+        need = timedelta(minutes=t.minutes)
+        if need > longest:
+            result.unplaced[t.id] = "too_long"
+            continue
+        reason = "deadline"
+        placed = False
+        for slot in free:
+            start, end = slot
+            if t.due is not None and start + need > t.due:
+                break  # slots are sorted: later ones are past the deadline too
+            if end - start < need:
+                continue
+            day = start.date()
+            if spent.get(day, 0) + t.cost > daily_budget:
+                reason = "budget"
+                continue
+            spent[day] = spent.get(day, 0) + t.cost
+            slot[0] = start + need
+            result.placements.append(
+                Placement(t.id, t.title, start, start + need, t.area_id, t.project_id)
+            )
+            placed = True
+            break
+        if not placed:
+            result.unplaced[t.id] = reason
+    result.placements.sort(key=lambda p: p.start)
+    return result
+
+
+def working_slots(
+    tree: IntervalTree,
+    start: datetime,
+    days: int,
+    work_start: time,
+    work_end: time,
+    min_minutes: int = 15,
+) -> List[tuple[datetime, datetime]]:
+    """Free ranges within working hours for ``days`` days from ``start``."""
+
+    start = naive_utc(start)
+    out: List[tuple[datetime, datetime]] = []
+    for offset in range(days):
+        day = start.date() + timedelta(days=offset)
+        lo = max(datetime.combine(day, work_start), start)
+        hi = datetime.combine(day, work_end)
+        if hi > lo:
+            out.extend(tree.gaps(lo, hi, timedelta(minutes=min_minutes)))
+    return out
+
+
+class PlannerService:
+    """Propose and apply time blocks for an owner's open tasks."""
+
+    def __init__(self, session: Optional[AsyncSession] = None) -> None:
+        self.session = session
+        self._external = session is not None
+
+    async def __aenter__(self) -> "PlannerService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    async def _planned_task_ids(self, owner_id: int, after: datetime) -> set[int]:
+        res = await self.session.execute(
+            select(CalendarItem.task_id).where(
+                CalendarItem.owner_id == owner_id,
+                CalendarItem.task_id.is_not(None),
+                CalendarItem.status == CalendarItemStatus.planned,
+                CalendarItem.end_at > after,
+            )
+        )
+        return set(res.scalars())
+
+    async def propose(
+        self,
+        owner_id: int,
+        *,
+        days: int = 7,
+        start: datetime | None = None,
+        work_start: time = time(9, 0),
+        work_end: time = time(18, 0),
+        daily_budget: int = DEFAULT_DAILY_BUDGET,
+    ) -> Plan:
+        start = naive_utc(start or utcnow())
+        end = datetime.combine(start.date() + timedelta(days=days), time.min)
+        res = await self.session.execute(
+            select(Task).where(
+                Task.owner_id == owner_id,
+                Task.status != TaskStatus.done,
+                or_(Task.recurrence.is_(None), Task.recurrence == ""),
+            )
+        )
+        planned = await self._planned_task_ids(owner_id, start)
+        candidates: List[PlanTask] = []
+        skipped: Dict[int, str] = {}
+        for task in res.scalars():
+            if task.id in planned:
+                skipped[task.id] = "planned"
+            elif task.area_id is None and task.project_id is None:
+                skipped[task.id] = "no_scope"  # calendar items need a PARA container
+            else:
+                candidates.append(PlanTask.from_model(task))
+        tree = await FreeBusyService(self.session).tree(owner_id, start, end)
+        slots = working_slots(tree, start, days, work_start, work_end)
+        result = plan(candidates, slots, daily_budget=daily_budget)
+        result.unplaced.update(skipped)
+        return result
+
+    async def apply(self, owner_id: int, result: Plan) -> int:
+        """Create planned calendar items; tasks already planned are skipped."""
+
+        if not result.placements:
+            return 0
+        planned = await self._planned_task_ids(owner_id, result.placements[0].start)
+        repo = CalendarItemRepository(self.session)
+        created = 0
+        for p in result.placements:
+            if p.task_id in planned:
+                continue
+            await repo.create(
+                owner_id=owner_id,
+                title=p.title,
+                start_at=p.start,
+                end_at=p.end,
+                project_id=p.project_id,
+                area_id=p.area_id,
+                task_id=p.task_id,
+            )
+            planned.add(p.task_id)
+            created += 1
+        return created
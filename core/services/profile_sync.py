@@ -0,0 +1,235 @@
+"""Coalesced writes of Telegram profile fields.
+
+Every bot command carries the sender's ``username``, ``first_name``,
+``last_name`` and ``language_code``. :class:`ProfileSync` remembers a
+hash of the last tuple seen per telegram id and ignores repeats; real
+changes wait in a pending map (later changes of the same user replace
+earlier ones) and are written by :meth:`ProfileSync.flush` with one
+``executemany`` UPDATE. The UPDATE only matches rows whose columns
+actually differ, so ``updated_at`` moves only on real changes.
+
+``None`` fields keep the stored value, as in
+:meth:`TelegramUserService.update_from_telegram`. The bot feeds senders
+in through :class:`ProfileSyncMiddleware`; users that do not exist yet
+are not created here.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy import bindparam, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.logger import logger
+from core.models import TgUser
+from core.utils import utcnow
+
+PROFILE_FIELDS = ("username", "first_name", "last_name", "language_code")
+
+
+def profile_hash(profile: Dict[str, Any]) -> str:
+    raw = "\x1f".join(
+        "\x00" if profile.get(f) is None else str(profile[f]) for f in PROFILE_FIELDS
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def _update_stmt():
+    table = TgUser.__table__
+    new = {f: func.coalesce(bindparam(f"p_{f}"), table.c[f]) for f in PROFILE_FIELDS}
+    return (
+        update(table)
+        .where(table.c.telegram_id == bindparam("p_telegram_id"))
+        .where(or_(*(table.c[f].is_distinct_from(new[f]) for f in PROFILE_FIELDS)))
+        .values(**new, updated_at=bindparam("p_updated_at"))
+    )
+
+
+class ProfileSync:
+    """Per-user profile hashes plus a pending batch of changed profiles."""
+
+    def __init__(self, *, max_tracked: int = 100_000, max_pending: int = 1000) -> None:
+        self.max_tracked = max_tracked
+        self.max_pending = max_pending
+        self._seen: "OrderedDict[int, str]" = OrderedDict()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._flushing = asyncio.Lock()
+        self.stats = {
+            "observed": 0,
+            "unchanged": 0,  # same hash as last time
+            "coalesced": 0,  # replaced a change still waiting for flush
+            "queued": 0,
+            "written": 0,
+            "noop": 0,  # queued, but the row already had these values
+            "failed": 0,
+            "flushes": 0,
+        }
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def saved(self) -> int:
+        """Profile writes avoided compared to one UPDATE per observation."""
+        return self.stats["unchanged"] + self.stats["coalesced"] + self.stats["noop"]
+
+    def _remember(self, telegram_id: int, digest: str) -> None:
+        self._seen[telegram_id] = digest
+        self._seen.move_to_end(telegram_id)
+        while len(self._seen) > self.max_tracked:
+            self._seen.popitem(last=False)
+
+    def observe(self, telegram_id: int, **profile: Any) -> bool:
+        """Record a profile seen in an update; ``True`` if a write was queued."""
+
+        self.stats["observed"] += 1
+        values = {f: profile.get(f) for f in PROFILE_FIELDS}
+        digest = profile_hash(values)
+        if self._seen.get(telegram_id) == digest:
+            self._seen.move_to_end(telegram_id)
+            self.stats["unchanged"] += 1
+            return False
+        if telegram_id in self._pending:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["queued"] += 1
+        self._pending[telegram_id] = values
+        self._remember(telegram_id, digest)
+        return True
+
+    def remember(self, telegram_id: int, **profile: Any) -> None:
+        """Mark a profile as stored (written elsewhere, e.g. on login)."""
+
+        self._pending.pop(telegram_id, None)
+        self._remember(telegram_id, profile_hash(profile))
+
+    def forget(self, telegram_id: int) -> None:
+        self._pending.pop(telegram_id, None)
+        self._seen.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._seen.clear()
+
+    @property
+    def due(self) -> bool:
+        return len(self._pending) >= self.max_pending
+
+    async def flush(self, session: AsyncSession | None = None) -> int:
+        """Write pending profiles; returns the number of rows changed.
+
+        With ``session`` the caller commits; otherwise a session of its
+        own is opened and committed.
+        """
+
+        async with self._flushing:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                if session is not None:
+                    return await self._write(session, batch)
+                async with db.async_session() as own:
+                    written = await self._write(own, batch)
+                    await own.commit()
+                    return written
+            except Exception:
+                # seen again later -> queued again
+                for tid in batch:
+                    self._seen.pop(tid, None)
+                raise
+
+    async def _write(self, session: AsyncSession, batch: Dict[int, Dict[str, Any]]) -> int:
+        now = utcnow()
+        params = [
+            {"p_telegram_id": tid, "p_updated_at": now, **{f"p_{f}": v[f] for f in PROFILE_FIELDS}}
+            for tid, v in batch.items()
+        ]
+        stmt = _update_stmt()
+        self.stats["flushes"] += 1
+        try:
+            async with session.begin_nested():
+                result = await session.execute(stmt, params)
+            written = result.rowcount
+        except IntegrityError:
+            # a username moved between accounts: write rows one by one
+            written = 0
+            attempted = len(params)
+            for row in params:
+                try:
+                    async with session.begin_nested():
+                        written += (await session.execute(stmt, row)).rowcount
+                except IntegrityError:
+                    attempted -= 1
+                    self.stats["failed"] += 1
+                    self._seen.pop(row["p_telegram_id"], None)
+                    logger.warning("profile sync: user %s not updated", row["p_telegram_id"])
+        else:
+            attempted = len(params)
+        if written is not None and written >= 0:  # some drivers do not report executemany counts
+            self.stats["written"] += written
+            self.stats["noop"] += max(0, attempted - written)
+        return max(written or 0, 0)
+
+    async def run(
+        self, *, stop_event: asyncio.Event | None = None, poll_interval: float = 5.0
+    ) -> None:
+        """Flush every ``poll_interval`` seconds (sooner when the batch is full)."""
+
+        _stop = stop_event or asyncio.Event()
+        logger.info("Profile sync: старт")
+        while not _stop.is_set():
+            waited = 0.0
+            while waited < poll_interval and not self.due and not _stop.is_set():
+                try:
+                    await asyncio.wait_for(_stop.wait(), timeout=min(0.5, poll_interval))
+                except asyncio.TimeoutError:
+                    waited += min(0.5, poll_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("profile sync flush failed")
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("profile sync flush failed")
+        logger.info("Profile sync: остановка (сэкономлено записей: %s)", self.saved)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": self.pending, "tracked": len(self._seen), "saved": self.saved}
+
+
+profile_sync = ProfileSync()
+
+
+class ProfileSyncMiddleware(BaseMiddleware):
+    """Feeds the sender of every message/callback into :data:`profile_sync`."""
+
+    def __init__(self, sync: ProfileSync | None = None) -> None:
+        self.sync = sync or profile_sync
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = getattr(event, "from_user", None)
+        if user is not None and not user.is_bot:
+            self.sync.observe(
+                user.id,
+                username=user.username,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                language_code=user.language_code,
+            )
+        return await handler(event, data)
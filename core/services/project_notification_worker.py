@@ -11,6 +11,7 @@ from core.models import (
     NotificationChannel,
 )
 from core.utils import utcnow
+from . import live_events
 from .telegram_bot import TelegramBotClient
 
 
@@ -62,6 +63,9 @@ class ProjectNotificationWorker:
                 continue
             text = f"{item.title} — {item.start_at:%Y-%m-%d %H:%M}"
             await self.bot.send_message(chat_id, text, silent=False)
+        live_events.emit(
+            session, item.owner_id, "calendar.alarm", item_id=item.id, title=item.title, start_at=item.start_at
+        )
 
     async def start(self) -> None:
         while True:
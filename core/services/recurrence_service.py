@@ -0,0 +1,392 @@
+"""Recurrence expansion for repeating tasks.
+
+A recurring task stores its rule in ``Task.recurrence`` (``daily``,
+``weekly``, ``weekdays``, ``monthly``, ``yearly`` or an RRULE fragment such
+as ``FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH``) with optional overrides in
+``Task.repeat_config``. ``Task.due_date`` is the series start.
+
+Occurrences are materialized into ``task_occurrences`` for a rolling
+horizon, so agenda queries read them by index instead of expanding rules
+per request. ``Task.occurrences_until`` remembers how far a series is
+expanded; the background job only generates the missing tail.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import calendar
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.logger import logger
+from core.models import ScheduleException, Task, TaskOccurrence
+from core.utils import naive_utc, utcnow
+
+
+HORIZON_DAYS = 90
+
+_FREQS = {"DAILY", "WEEKLY", "MONTHLY", "YEARLY"}
+_DAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+_ALIASES = {
+    "daily": {"FREQ": "DAILY"},
+    "weekly": {"FREQ": "WEEKLY"},
+    "weekdays": {"FREQ": "WEEKLY", "BYDAY": "MO,TU,WE,TH,FR"},
+    "monthly": {"FREQ": "MONTHLY"},
+    "yearly": {"FREQ": "YEARLY"},
+}
+
+
+@dataclass
+class RecurrenceRule:
+    """Subset of RFC 5545 RRULE supported by the engine."""
+
+    freq: str
+    interval: int = 1
+    byday: List[int] = field(default_factory=list)
+    bymonthday: List[int] = field(default_factory=list)
+    count: int | None = None
+    until: datetime | None = None
+
+
+def _weekday(value) -> int:
+    if isinstance(value, int):
+        if not 0 <= value <= 6:
+            raise ValueError(f"invalid weekday: {value}")
+        return value
+    return _DAYS.index(str(value).strip().upper()[-2:])
+
+
+def _parse_until(value) -> datetime | None:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.max)
+    raw = str(value).strip().rstrip("Z")
+    if raw.isdigit() and len(raw) == 8:
+        return datetime.combine(datetime.strptime(raw, "%Y%m%d").date(), time.max)
+    if "T" in raw and "-" not in raw:
+        return datetime.strptime(raw, "%Y%m%dT%H%M%S")
+    return datetime.fromisoformat(raw)
+
+
+def parse_rule(recurrence: str | None, config: dict | None = None) -> RecurrenceRule | None:
+    """Parse ``recurrence`` plus ``repeat_config`` overrides.
+
+    Returns ``None`` for an empty rule; raises ``ValueError`` on bad input.
+    """
+
+    if not recurrence or not recurrence.strip():
+        return None
+    raw = recurrence.strip()
+    parts = dict(_ALIASES.get(raw.lower(), {}))
+    if not parts:
+        if raw.upper().startswith("RRULE:"):
+            raw = raw[6:]
+        for chunk in raw.split(";"):
+            if not chunk:
+                continue
+            key, _, value = chunk.partition("=")
+            parts[key.strip().upper()] = value.strip()
+    for key, value in (config or {}).items():
+        if value is not None:
+            parts[key.upper()] = value
+
+    freq = str(parts.get("FREQ", "")).upper()
+    if freq not in _FREQS:
+        raise ValueError(f"unsupported recurrence: {recurrence!r}")
+    byday = parts.get("BYDAY") or parts.get("BYWEEKDAY") or []
+    if isinstance(byday, str):
+        byday = byday.split(",")
+    bymonthday = parts.get("BYMONTHDAY") or []
+    if isinstance(bymonthday, str):
+        bymonthday = bymonthday.split(",")
+    until = _parse_until(parts.get("UNTIL"))
+    count = parts.get("COUNT")
+    return RecurrenceRule(
+        freq=freq,
+        interval=max(int(parts.get("INTERVAL") or 1), 1),
+        byday=sorted({_weekday(d) for d in byday}),
+        bymonthday=sorted({int(d) for d in bymonthday}),
+        count=int(count) if count else None,
+        until=naive_utc(until) if until else None,
+    )
+
+
+def _add_months(year: int, month: int, n: int) -> tuple[int, int]:
+    total = year * 12 + (month - 1) + n
+    return total // 12, total % 12 + 1
+
+
+def _period_candidates(rule: RecurrenceRule, start: datetime, k: int) -> List[datetime]:
+    """Candidate datetimes of the ``k``-th period (ascending)."""
+
+    step = k * rule.interval
+    at = start.time()
+    if rule.freq == "DAILY":
+        return [start + timedelta(days=step)]
+    if rule.freq == "WEEKLY":
+        monday = start.date() - timedelta(days=start.weekday()) + timedelta(weeks=step)
+        days = rule.byday or [start.weekday()]
+        return [datetime.combine(monday + timedelta(days=d), at) for d in days]
+    if rule.freq == "MONTHLY":
+        y, m = _add_months(start.year, start.month, step)
+        last = calendar.monthrange(y, m)[1]
+        days = rule.bymonthday or [start.day]
+        out = []
+        for d in days:
+            d = last + d + 1 if d < 0 else d
+            if 1 <= d <= last:  # months without that day are skipped (RFC 5545)
+                out.append(datetime.combine(date(y, m, d), at))
+        return sorted(out)
+    # YEARLY
+    y = start.year + step
+    if start.month == 2 and start.day == 29 and not calendar.isleap(y):
+        return []
+    return [start.replace(year=y)]
+
+
+def _first_period(rule: RecurrenceRule, start: datetime, window_start: datetime) -> int:
+    """Index of the first period that may intersect ``window_start``."""
+
+    if rule.count is not None or window_start <= start:
+        return 0  # COUNT needs the full series to number occurrences
+    if rule.freq == "DAILY":
+        return (window_start - start).days // rule.interval
+    if rule.freq == "WEEKLY":
+        return (window_start - start).days // (7 * rule.interval)
+    if rule.freq == "MONTHLY":
+        months = (window_start.year - start.year) * 12 + window_start.month - start.month
+        return max(months // rule.interval - 1, 0)
+    return max((window_start.year - start.year) // rule.interval - 1, 0)
+
+
+def expand(
+    rule: RecurrenceRule,
+    start: datetime,
+    window_start: datetime,
+    window_end: datetime,
+    skip: Iterable[date] = (),
+) -> Iterator[datetime]:
+    """Yield occurrences of ``rule`` in ``[window_start, window_end)``.
+
+    ``skip`` holds excluded dates; it is converted to a set once so every
+    candidate costs a single hash lookup. Excluded dates still count
+    towards ``COUNT`` as in RFC 5545.
+    """
+
+    start = naive_utc(start)
+    window_start = naive_utc(window_start)
+    window_end = naive_utc(window_end)
+    skip = set(skip)
+    end = window_end if rule.until is None else min(window_end, rule.until + timedelta(microseconds=1))
+    produced = 0
+    k = _first_period(rule, start, window_start)
+    while True:
+        candidates = _period_candidates(rule, start, k)
+        k += 1
+        if candidates and candidates[0] >= end:
+            return
+        if not candidates and k > 100000:  # pragma: no cover - defensive
+            return
+        for dt in candidates:
+            if dt < start:
+                continue
+            if dt >= end:
+                return
+            produced += 1
+            if rule.count is not None and produced > rule.count:
+                return
+            if dt >= window_start and dt.date() not in skip:
+                yield dt
+
+
+def horizon(days: int = HORIZON_DAYS) -> datetime:
+    """Horizon end: midnight ``days`` days after today (UTC)."""
+    return datetime.combine(utcnow().date(), time.min) + timedelta(days=days)
+
+
+def _excluded(task: Task) -> set[date]:
+    out: set[date] = set()
+    for value in task.excluded_dates or []:
+        try:
+            out.add(date.fromisoformat(str(value)[:10]))
+        except ValueError:
+            logger.warning("Некорректная дата исключения", extra={"task_id": task.id})
+    return out
+
+
+class RecurrenceService:
+    """Materialize and query occurrences of recurring tasks."""
+
+    def __init__(self, session: Optional[AsyncSession] = None) -> None:
+        self.session = session
+        self._external = session is not None
+
+    async def __aenter__(self) -> "RecurrenceService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    async def _exception_dates(self, task_ids: List[int]) -> dict[int, set[date]]:
+        res = await self.session.execute(
+            select(ScheduleException.task_id, ScheduleException.date).where(
+                ScheduleException.task_id.in_(task_ids),
+                ScheduleException.date.is_not(None),
+            )
+        )
+        out: dict[int, set[date]] = {}
+        for task_id, day in res.all():
+            out.setdefault(task_id, set()).add(day)
+        return out
+
+    async def materialize(
+        self,
+        task: Task,
+        until: datetime | None = None,
+        *,
+        skip: set[date] | None = None,
+    ) -> int:
+        """Extend ``task`` occurrences up to ``until``; return rows inserted."""
+
+        if not task.recurrence or task.due_date is None:
+            return 0
+        try:
+            rule = parse_rule(task.recurrence, task.repeat_config)
+        except ValueError:
+            logger.warning("Не удалось разобрать повтор задачи", extra={"task_id": task.id})
+            return 0
+        until = naive_utc(until or horizon())
+        today = horizon(0)
+        lower = (
+            naive_utc(task.occurrences_until)
+            if task.occurrences_until
+            else max(naive_utc(task.due_date), today)
+        )
+        if lower >= until:
+            return 0
+        if skip is None:
+            skip = (await self._exception_dates([task.id])).get(task.id, set())
+        skip = skip | _excluded(task)
+        rows = [
+            {"task_id": task.id, "owner_id": task.owner_id, "occurs_at": dt}
+            for dt in expand(rule, task.due_date, lower, until, skip)
+        ]
+        if rows:
+            await self.session.execute(insert(TaskOccurrence), rows)
+        task.occurrences_until = until
+        await self.session.flush()
+        return len(rows)
+
+    async def rebuild(self, task: Task, until: datetime | None = None) -> int:
+        """Drop future occurrences of ``task`` and expand the series again."""
+
+        today = horizon(0)
+        await self.session.execute(
+            delete(TaskOccurrence).where(
+                TaskOccurrence.task_id == task.id, TaskOccurrence.occurs_at >= today
+            )
+        )
+        task.occurrences_until = None
+        return await self.materialize(task, until)
+
+    async def drop_date(self, task_id: int, day: date) -> None:
+        """Remove occurrences falling on ``day`` (after adding an exception)."""
+
+        start = datetime.combine(day, time.min)
+        await self.session.execute(
+            delete(TaskOccurrence).where(
+                TaskOccurrence.task_id == task_id,
+                TaskOccurrence.occurs_at >= start,
+                TaskOccurrence.occurs_at < start + timedelta(days=1),
+            )
+        )
+
+    async def extend_horizon(
+        self, *, days: int = HORIZON_DAYS, batch_size: int = 200
+    ) -> int:
+        """Materialize every recurring series up to :func:`horizon`.
+
+        Works in batches by task id, loading schedule exceptions for the
+        whole batch in one query. Returns the number of inserted rows.
+        """
+
+        target = horizon(days)
+        inserted = 0
+        last_id = 0
+        while True:
+            res = await self.session.execute(
+                select(Task)
+                .where(
+                    Task.id > last_id,
+                    Task.recurrence.is_not(None),
+                    Task.recurrence != "",
+                    Task.due_date.is_not(None),
+                    or_(Task.occurrences_until.is_(None), Task.occurrences_until < target),
+                )
+                .order_by(Task.id)
+                .limit(batch_size)
+            )
+            tasks = res.scalars().all()
+            if not tasks:
+                break
+            skips = await self._exception_dates([t.id for t in tasks])
+            for task in tasks:
+                inserted += await self.materialize(task, target, skip=skips.get(task.id, set()))
+            last_id = tasks[-1].id
+        return inserted
+
+    async def list_occurrences(
+        self, owner_id: int, start: datetime, end: datetime
+    ) -> List[TaskOccurrence]:
+        res = await self.session.execute(
+            select(TaskOccurrence)
+            .where(
+                TaskOccurrence.owner_id == owner_id,
+                TaskOccurrence.occurs_at >= start,
+                TaskOccurrence.occurs_at < end,
+            )
+            .order_by(TaskOccurrence.occurs_at)
+        )
+        return res.scalars().all()
+
+
+async def run_recurrence_worker(
+    *,
+    poll_interval: float = 3600.0,
+    days: int = HORIZON_DAYS,
+    stop_event: asyncio.Event | None = None,
+) -> None:
+    """Periodically roll the occurrence horizon forward."""
+
+    _stop = stop_event or asyncio.Event()
+    logger.info("Recurrence worker: старт")
+    try:
+        while not _stop.is_set():
+            try:
+                async with RecurrenceService() as service:
+                    inserted = await service.extend_horizon(days=days)
+                if inserted:
+                    logger.debug(f"Recurrence worker: добавлено {inserted} повторений")
+            except Exception:
+                logger.exception("Recurrence worker: ошибка продления горизонта")
+            try:
+                await asyncio.wait_for(_stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        logger.info("Recurrence worker: остановка")
@@ -9,6 +9,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core import db
 from core.models import Reminder
+from core.services import live_events
+
+
+def _event(reminder: Reminder) -> dict:
+    return {
+        "id": reminder.id,
+        "message": reminder.message,
+        "remind_at": reminder.remind_at,
+        "task_id": reminder.task_id,
+        "is_done": reminder.is_done,
+    }
 
 
 class ReminderService:
@@ -48,6 +59,7 @@ class ReminderService:
         )
         self.session.add(reminder)
         await self.session.flush()
+        live_events.emit(self.session, owner_id, "reminder.created", **_event(reminder))
         return reminder
 
     async def list_reminders(
@@ -74,6 +86,7 @@ class ReminderService:
                 continue
             setattr(reminder, key, value)
         await self.session.flush()
+        live_events.emit(self.session, reminder.owner_id, "reminder.updated", **_event(reminder))
         return reminder
 
     async def delete_reminder(self, reminder_id: int) -> bool:
@@ -84,6 +97,7 @@ class ReminderService:
             return False
         await self.session.delete(reminder)
         await self.session.flush()
+        live_events.emit(self.session, reminder.owner_id, "reminder.deleted", id=reminder_id)
         return True
 
     async def mark_done(self, reminder_id: int) -> Reminder | None:
@@ -94,4 +108,5 @@ class ReminderService:
             return None
         reminder.is_done = True
         await self.session.flush()
+        live_events.emit(self.session, reminder.owner_id, "reminder.updated", **_event(reminder))
         return reminder
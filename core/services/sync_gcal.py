@@ -1,47 +1,75 @@
-"""Google Calendar sync helpers."""
+"""Google Calendar sync helpers.
+
+All Google requests go through one pooled :class:`httpx.AsyncClient`
+(:func:`get_client`). :class:`GCalSyncEngine` pages through
+``events.list`` with ``nextPageToken``, upserts events into
+``CalendarItem`` keyed by ``(gcal_link_id, gcal_event_id)`` one page per
+statement, removes cancelled events and stores ``nextSyncToken`` only
+after every page has been committed, so an interrupted run is simply
+repeated from the previous token.
+"""
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
 from typing import Any
-from urllib.parse import urlencode
+from urllib.parse import quote, urlencode
+import os
 import uuid
 
 import httpx
-from sqlalchemy import select
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from core import db
 from core.logger import logger
-from core.models import GCalLink
+from core.models import CalendarItem, CalendarItemStatus, GCalLink, TgUser, WebTgLink
 from core.utils import utcnow
+from . import sync_service
 
 AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
-TOKEN_URL = "https://oauth2.googleapis.com/token"
-EVENTS_URL_TMPL = "https://www.googleapis.com/calendar/v3/calendars/{cal_id}/events"
+TOKEN_URL = os.getenv("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+API_BASE = os.getenv("GCAL_API_BASE", "https://www.googleapis.com/calendar/v3")
+EVENTS_URL_TMPL = API_BASE + "/calendars/{cal_id}/events"
 WATCH_URL_TMPL = EVENTS_URL_TMPL + "/watch"
 SCOPE = "https://www.googleapis.com/auth/calendar"
 
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client used for Google APIs."""
+
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def aclose_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 async def _refresh_if_needed(link: GCalLink, session: AsyncSession) -> GCalLink:
-    from web.config import S
+    """Ensure ``link.access_token`` is live via the shared token manager.
 
-    if link.token_expiry and link.token_expiry > utcnow() + timedelta(minutes=1):
-        return link
-    data = {
-        "client_id": S.GOOGLE_CLIENT_ID,
-        "client_secret": S.GOOGLE_CLIENT_SECRET,
-        "refresh_token": link.refresh_token,
-        "grant_type": "refresh_token",
-    }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(TOKEN_URL, data=data)
-        resp.raise_for_status()
-        payload = resp.json()
-    link.access_token = payload["access_token"]
-    expires_in = int(payload.get("expires_in", 3600))
-    link.token_expiry = utcnow() + timedelta(seconds=expires_in)
-    session.add(link)
-    await session.commit()
+    The manager persists refreshed tokens itself, so ``link`` is updated
+    without marking it dirty in ``session``.
+    """
+    from .gcal_tokens import token_manager
+
+    token = await token_manager.get(link.id, link)
+    if token.access_token != link.access_token:
+        set_committed_value(link, "access_token", token.access_token)
+        set_committed_value(link, "token_expiry", token.expires_at)
     return link
 
 
@@ -70,10 +98,23 @@ async def exchange_code(code: str, redirect_uri: str) -> dict[str, Any]:
         "grant_type": "authorization_code",
         "redirect_uri": redirect_uri,
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(TOKEN_URL, data=data)
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_client().post(TOKEN_URL, data=data)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _owner_for_web_user(session: AsyncSession, user_id: str) -> int | None:
+    """Telegram id linked to web user ``user_id`` (items are owned by it)."""
+
+    if not str(user_id).isdigit():
+        return None
+    res = await session.execute(
+        select(TgUser.telegram_id)
+        .join(WebTgLink, WebTgLink.tg_user_id == TgUser.id)
+        .where(WebTgLink.web_user_id == int(user_id))
+        .limit(1)
+    )
+    return res.scalar_one_or_none()
 
 
 async def save_link(
@@ -84,6 +125,7 @@ async def save_link(
     async with db.async_session() as session:
         link = GCalLink(
             user_id=user_id,
+            owner_id=await _owner_for_web_user(session, user_id),
             google_calendar_id=google_calendar_id,
             access_token=token_data["access_token"],
             refresh_token=token_data.get("refresh_token", ""),
@@ -110,79 +152,232 @@ async def get_link(user_id: str, calendar_id: str) -> GCalLink | None:
         return await _refresh_if_needed(link, session)
 
 
-async def initial(user_id: str, google_calendar_id: str) -> list[dict[str, Any]]:
-    link = await get_link(user_id, google_calendar_id)
-    if not link:
-        raise ValueError("not linked")
-    params = {
-        "timeMin": (utcnow() - timedelta(days=60)).isoformat(),
-        "timeMax": (utcnow() + timedelta(days=180)).isoformat(),
-        "singleEvents": True,
-        "showDeleted": True,
+# ---------------------------------------------------------------------------
+# Sync engine
+# ---------------------------------------------------------------------------
+
+
+class SyncTokenExpired(Exception):
+    """Google answered 410 Gone: a full resync is required."""
+
+
+@dataclass
+class SyncResult:
+    pages: int = 0
+    upserted: int = 0
+    deleted: int = 0
+    full: bool = False
+
+
+def _parse_when(value: dict[str, Any] | None) -> datetime | None:
+    """Convert a Google ``start``/``end`` object to naive UTC."""
+
+    if not value:
+        return None
+    if value.get("dateTime"):
+        dt = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return dt
+    if value.get("date"):  # all-day event
+        return datetime.combine(date.fromisoformat(value["date"]), datetime.min.time())
+    return None
+
+
+def event_to_row(link: GCalLink, event: dict[str, Any], now: datetime) -> dict[str, Any] | None:
+    """Map a Google event to ``CalendarItem`` column values."""
+
+    start = _parse_when(event.get("start"))
+    if start is None:
+        return None
+    return {
+        "owner_id": link.owner_id,
+        "gcal_link_id": link.id,
+        "gcal_event_id": event["id"],
+        "gcal_etag": event.get("etag"),
+        "title": (event.get("summary") or "(без названия)")[:255],
+        "start_at": start,
+        "end_at": _parse_when(event.get("end")),
+        "status": CalendarItemStatus.planned,
+        "created_at": now,
+        "updated_at": now,
     }
-    headers = {"Authorization": f"Bearer {link.access_token}"}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            EVENTS_URL_TMPL.format(cal_id=google_calendar_id),
-            params=params,
-            headers=headers,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-    async with db.async_session() as session:
-        link.sync_token = data.get("nextSyncToken")
+
+
+def _upsert_stmt(session: AsyncSession, rows: list[dict[str, Any]]):
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(CalendarItem).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[CalendarItem.gcal_link_id, CalendarItem.gcal_event_id],
+        set_={
+            "title": stmt.excluded.title,
+            "start_at": stmt.excluded.start_at,
+            "end_at": stmt.excluded.end_at,
+            "gcal_etag": stmt.excluded.gcal_etag,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(CalendarItem.id)
+
+
+class GCalSyncEngine:
+    """Pull events of one :class:`GCalLink` into ``CalendarItem`` rows."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        *,
+        events_url: str | None = None,
+        page_size: int = 250,
+        past_days: int = 60,
+        future_days: int = 180,
+    ) -> None:
+        self.client = client or get_client()
+        self.events_url = events_url or EVENTS_URL_TMPL
+        self.page_size = page_size
+        self.past_days = past_days
+        self.future_days = future_days
+
+    async def sync(self, link_id: int, *, full: bool = False) -> SyncResult:
+        """Run incremental sync (or full when forced / token expired)."""
+
+        async with db.async_session() as session:
+            link = await session.get(GCalLink, link_id)
+            if link is None:
+                raise ValueError("not linked")
+            if link.owner_id is None:
+                raise ValueError("link has no telegram owner")
+            await _refresh_if_needed(link, session)
+            try:
+                return await self._run(session, link, full=full or not link.sync_token)
+            except SyncTokenExpired:
+                logger.warning("gcal sync token expired, resyncing")
+                await session.rollback()
+                await session.refresh(link)
+                return await self._run(session, link, full=True)
+
+    async def _run(self, session: AsyncSession, link: GCalLink, *, full: bool) -> SyncResult:
+        result = SyncResult(full=full)
+        params: dict[str, Any] = {
+            "singleEvents": "true",
+            "showDeleted": "true",
+            "maxResults": self.page_size,
+        }
+        if full:
+            params["timeMin"] = (utcnow() - timedelta(days=self.past_days)).isoformat() + "Z"
+            params["timeMax"] = (utcnow() + timedelta(days=self.future_days)).isoformat() + "Z"
+        else:
+            params["syncToken"] = link.sync_token
+        url = self.events_url.format(cal_id=quote(link.calendar_id, safe=""))
+        headers = {"Authorization": f"Bearer {link.access_token}"}
+        page_token: str | None = None
+        next_sync_token: str | None = None
+        while True:
+            query = dict(params, pageToken=page_token) if page_token else params
+            resp = await self.client.get(url, params=query, headers=headers)
+            if resp.status_code == 410 and not full:
+                raise SyncTokenExpired()
+            if resp.status_code == 401:
+                from .gcal_tokens import token_manager
+
+                await token_manager.expire(link.id)  # next run refreshes
+            resp.raise_for_status()
+            data = resp.json()
+            await self._apply_page(session, link, data.get("items", []), result)
+            await session.commit()
+            result.pages += 1
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                next_sync_token = data.get("nextSyncToken")
+                break
+        # Token is written only once all pages are committed
+        link.sync_token = next_sync_token
         session.add(link)
         await session.commit()
-    items = data.get("items", [])
-    logger.info("gcal initial sync: %s items", len(items))
-    return items
+        logger.info(
+            "gcal sync link=%s pages=%s upserted=%s deleted=%s",
+            link.id, result.pages, result.upserted, result.deleted,
+        )
+        return result
+
+    async def _apply_page(
+        self,
+        session: AsyncSession,
+        link: GCalLink,
+        items: list[dict[str, Any]],
+        result: SyncResult,
+    ) -> None:
+        now = utcnow()
+        rows: dict[str, dict[str, Any]] = {}
+        cancelled: set[str] = set()
+        for event in items:
+            event_id = event.get("id")
+            if not event_id:
+                continue
+            if event.get("status") == "cancelled":
+                cancelled.add(event_id)
+                rows.pop(event_id, None)
+                continue
+            row = event_to_row(link, event, now)
+            if row is not None:
+                rows[event_id] = row  # last version on the page wins
+                cancelled.discard(event_id)
+        if rows:
+            res = await session.execute(_upsert_stmt(session, list(rows.values())))
+            sync_service.track(session, CalendarItem, link.owner_id, res.scalars().all())
+            result.upserted += len(rows)
+        if cancelled:
+            res = await session.execute(
+                delete(CalendarItem)
+                .where(
+                    CalendarItem.gcal_link_id == link.id,
+                    CalendarItem.gcal_event_id.in_(cancelled),
+                )
+                .returning(CalendarItem.id)
+            )
+            gone = res.scalars().all()
+            sync_service.track(session, CalendarItem, link.owner_id, gone)
+            result.deleted += len(gone)
 
 
-async def incremental(user_id: str, google_calendar_id: str) -> list[dict[str, Any]]:
+async def _sync_for_user(user_id: str, google_calendar_id: str, *, full: bool) -> SyncResult:
     link = await get_link(user_id, google_calendar_id)
-    if not link or not link.sync_token:
-        return await initial(user_id, google_calendar_id)
-    params = {
-        "syncToken": link.sync_token,
-        "singleEvents": True,
-        "showDeleted": True,
-    }
-    headers = {"Authorization": f"Bearer {link.access_token}"}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            EVENTS_URL_TMPL.format(cal_id=google_calendar_id),
-            params=params,
-            headers=headers,
-        )
-    if resp.status_code == 410:
-        logger.warning("gcal sync token expired, resyncing")
-        return await initial(user_id, google_calendar_id)
-    resp.raise_for_status()
-    data = resp.json()
-    async with db.async_session() as session:
-        link.sync_token = data.get("nextSyncToken")
-        session.add(link)
-        await session.commit()
-    items = data.get("items", [])
-    logger.info("gcal incremental sync: %s items", len(items))
-    return items
+    if not link:
+        raise ValueError("not linked")
+    return await GCalSyncEngine().sync(link.id, full=full)
 
 
-async def start_watch(link: GCalLink) -> None:
+async def initial(user_id: str, google_calendar_id: str) -> SyncResult:
+    """Full sync of the configured window into ``CalendarItem``."""
+
+    return await _sync_for_user(user_id, google_calendar_id, full=True)
+
+
+async def incremental(user_id: str, google_calendar_id: str) -> SyncResult:
+    """Incremental sync from the stored token (full sync when missing)."""
+
+    return await _sync_for_user(user_id, google_calendar_id, full=False)
+
+
+async def start_watch(link: GCalLink, *, renew: bool = False) -> None:
+    """Open a push channel; ``renew`` always opens a new channel id."""
     from web.config import S
 
     body = {
-        "id": link.channel_id or str(uuid.uuid4()),
+        "id": (None if renew else link.channel_id) or str(uuid.uuid4()),
         "type": "webhook",
         "address": S.GCAL_WEBHOOK_URL,
+        # Echoed back as X-Goog-Channel-Token: "<user_id>:<link_id>"
+        "token": f"{link.user_id}:{link.id}",
     }
     headers = {"Authorization": f"Bearer {link.access_token}"}
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            WATCH_URL_TMPL.format(cal_id=link.google_calendar_id), json=body, headers=headers
-        )
-        resp.raise_for_status()
-        payload = resp.json()
+    resp = await get_client().post(
+        WATCH_URL_TMPL.format(cal_id=quote(link.google_calendar_id, safe="")),
+        json=body,
+        headers=headers,
+    )
+    resp.raise_for_status()
+    payload = resp.json()
     link.channel_id = payload.get("id")
     link.resource_id = payload.get("resourceId")
     exp = payload.get("expiration")
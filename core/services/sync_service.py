@@ -0,0 +1,329 @@
+"""Delta sync: rows changed or deleted since a client's cursor.
+
+Every write to a synced table is recorded in ``sync_changes``: mapper
+events stage ORM inserts, updates and deletes (cascades included) in
+``session.info``, services that write with Core statements call
+:func:`track`, and the staged rows are appended while the session
+commits. So a change-log id is handed out at commit time, never while a
+long transaction is still running; on PostgreSQL a transaction-level
+advisory lock also keeps concurrent commits from taking ids out of
+order. The cursor is the highest id a sync has seen, and the next sync
+reads the log past it: a logged row that still exists is returned as
+changed, one that is gone as deleted.
+
+Large answers are split into pages keyed by entity and id; all pages of
+one sync carry the same cursor. Log rows older than ``SYNC_LOG_DAYS``
+are dropped by :func:`run_sync_log_pruner`; a cursor older than the log
+(or unknown to it) gets a full snapshot with ``reset`` set, and the
+client replaces its copy.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from core import db
+from core.models import (
+    Area,
+    CalendarItem,
+    Habit,
+    Note,
+    Project,
+    Reminder,
+    SyncChange,
+    Task,
+    TimeEntry,
+)
+from core.logger import logger
+from core.utils import utcnow
+
+SYNC_ENTITIES: Dict[str, type] = {
+    "tasks": Task,
+    "notes": Note,
+    "reminders": Reminder,
+    "calendar_items": CalendarItem,
+    "time_entries": TimeEntry,
+    "habits": Habit,
+    "areas": Area,
+    "projects": Project,
+}
+LOG_DAYS = int(os.getenv("SYNC_LOG_DAYS", "90"))
+PENDING_KEY = "sync_changes"
+LOCK_KEY = 0x5359_4E43  # pg_advisory_xact_lock: log ids in commit order
+
+
+def decode_cursor(cursor: str) -> int:
+    """Raises ``ValueError`` for anything but a cursor from :meth:`SyncService.changes`."""
+    seq = int(cursor)
+    if seq < 0:
+        raise ValueError("negative cursor")
+    return seq
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+@dataclass
+class _Pending:
+    rows: Set[Tuple[int, str, int]] = field(default_factory=set)
+    # (owner_id, table) -> rows of the owner stamped with updated_at >= this
+    since: Dict[Tuple[int, str], datetime] = field(default_factory=dict)
+
+
+def _pending(session: Session) -> _Pending:
+    return session.info.setdefault(PENDING_KEY, _Pending())
+
+
+def track(
+    session: Any,
+    model: type,
+    owner_id: int,
+    ids: Iterable[int] = (),
+    *,
+    since: datetime | None = None,
+) -> None:
+    """Log rows written with Core statements (ORM writes are logged already).
+
+    Pass the ids of the rows, or ``since`` when they are not known (bulk
+    inserts, ``COPY``): all rows of the owner with ``updated_at`` at or
+    after it are logged on commit.
+    """
+
+    pending = _pending(getattr(session, "sync_session", session))
+    table = model.__tablename__
+    pending.rows.update((owner_id, table, i) for i in ids)
+    if since is not None:
+        key = (owner_id, table)
+        pending.since[key] = min(since, pending.since.get(key, since))
+
+
+@dataclass
+class SyncResult:
+    cursor: str  # ``since`` for the next sync, once all pages are read
+    reset: bool = False
+    page: str | None = None  # set when a limit was hit: call again with it
+    changed: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    deleted: Dict[str, List[int]] = field(default_factory=dict)
+
+    @property
+    def more(self) -> bool:
+        return self.page is not None
+
+
+class SyncService:
+    """Changed and deleted rows of one owner since a cursor."""
+
+    def __init__(self, session: Optional[AsyncSession] = None) -> None:
+        self.session = session
+        self._external = session is not None
+
+    async def __aenter__(self) -> "SyncService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # pragma: no cover
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    async def changes(
+        self,
+        owner_id: int,
+        since: str | None = None,
+        *,
+        page: str | None = None,
+        entities: List[str] | None = None,
+        limit: int = 1000,
+    ) -> SyncResult:
+        """Rows changed or deleted since ``since`` (all rows without a cursor).
+
+        At most ``limit`` rows and deleted ids are returned per call; the
+        rest follows on pages (``page`` token, same ``since``), ordered by
+        entity and id. Raises ``ValueError`` for bad cursors, page tokens
+        and entities.
+        """
+
+        kinds = list(entities or SYNC_ENTITIES)
+        unknown = set(kinds) - set(SYNC_ENTITIES)
+        if unknown:
+            raise ValueError(f"unknown entities: {', '.join(sorted(unknown))}")
+        if page:
+            snapshot_raw, kind, last_id = page.split(":")
+            snapshot, last_id = decode_cursor(snapshot_raw), int(last_id)
+            if kind not in kinds:
+                raise ValueError("bad page token")
+        else:
+            snapshot = await self.session.scalar(select(func.max(SyncChange.id))) or 0
+            kind, last_id = kinds[0], 0
+        after = decode_cursor(since) if since is not None else None
+        if after is not None and after < snapshot:
+            oldest = await self.session.scalar(select(func.min(SyncChange.id)))
+            reset = oldest is not None and after < oldest - 1  # pruned past the cursor
+        else:
+            # from another database or an older cursor format
+            reset = after is not None and after > snapshot
+        if reset:
+            after = None
+        result = SyncResult(cursor=str(snapshot), reset=reset)
+
+        remaining = limit
+        for kind in kinds[kinds.index(kind):]:
+            if after is None:
+                rows, deleted = await self._rows(owner_id, kind, last_id, remaining + 1), []
+                ids = [row["id"] for row in rows]
+            else:
+                ids = await self._logged(owner_id, kind, after, snapshot, last_id, remaining + 1)
+                rows, deleted = await self._by_ids(owner_id, kind, ids[:remaining])
+            last_id = 0
+            if len(ids) > remaining:
+                result.page = f"{snapshot}:{kind}:{ids[remaining - 1] if remaining else 0}"
+                rows = rows[:remaining]
+            result.changed[kind] = [{k: _plain(v) for k, v in row.items()} for row in rows]
+            if deleted:
+                result.deleted[kind] = deleted
+            remaining -= min(len(ids), remaining)
+            if result.page:
+                return result
+        return result
+
+    async def _rows(self, owner_id: int, kind: str, last_id: int, limit: int) -> List[Any]:
+        table = SYNC_ENTITIES[kind].__table__
+        stmt = (
+            select(table)
+            .where(table.c.owner_id == owner_id, table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(limit)
+        )
+        return (await self.session.execute(stmt)).mappings().all()
+
+    async def _logged(
+        self, owner_id: int, kind: str, after: int, snapshot: int, last_id: int, limit: int
+    ) -> List[int]:
+        res = await self.session.execute(
+            select(SyncChange.entity_id)
+            .where(
+                SyncChange.owner_id == owner_id,
+                SyncChange.entity == kind,
+                SyncChange.id > after,
+                SyncChange.id <= snapshot,
+                SyncChange.entity_id > last_id,
+            )
+            .group_by(SyncChange.entity_id)
+            .order_by(SyncChange.entity_id)
+            .limit(limit)
+        )
+        return list(res.scalars())
+
+    async def _by_ids(self, owner_id: int, kind: str, ids: List[int]) -> Tuple[List[Any], List[int]]:
+        if not ids:
+            return [], []
+        table = SYNC_ENTITIES[kind].__table__
+        stmt = (
+            select(table)
+            .where(table.c.owner_id == owner_id, table.c.id.in_(ids))
+            .order_by(table.c.id)
+        )
+        rows = (await self.session.execute(stmt)).mappings().all()
+        found = {row["id"] for row in rows}
+        return rows, [i for i in ids if i not in found]
+
+    async def prune(self, older_than_days: int = LOG_DAYS) -> int:
+        """Drop old log rows (the newest one always stays); returns the number removed."""
+
+        newest = select(func.max(SyncChange.id)).scalar_subquery()
+        res = await self.session.execute(
+            delete(SyncChange).where(
+                SyncChange.changed_at < utcnow() - timedelta(days=older_than_days),
+                SyncChange.id < newest,
+            )
+        )
+        return res.rowcount or 0
+
+
+def _stage(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None and target.owner_id is not None and target.id is not None:
+        _pending(session).rows.add((target.owner_id, target.__tablename__, target.id))
+
+
+for _model in SYNC_ENTITIES.values():
+    for _name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _name, _stage)
+
+
+@event.listens_for(Session, "before_commit")
+def _write_log(session: Session) -> None:
+    session.flush()  # mapper events of still pending changes stage their rows
+    pending: _Pending | None = session.info.pop(PENDING_KEY, None)
+    if not pending or not (pending.rows or pending.since):
+        return
+    conn = session.connection()
+    if conn.dialect.name == "postgresql":
+        # held until the commit ends: a later id never commits first
+        conn.execute(select(func.pg_advisory_xact_lock(LOCK_KEY)))
+    now = utcnow()
+    if pending.rows:
+        conn.execute(
+            insert(SyncChange),
+            [
+                {"owner_id": o, "entity": e, "entity_id": i, "changed_at": now}
+                for o, e, i in sorted(pending.rows)
+            ],
+        )
+    models = {m.__tablename__: m for m in SYNC_ENTITIES.values()}
+    for (owner_id, entity), since in pending.since.items():
+        table = models[entity].__table__
+        conn.execute(
+            insert(SyncChange).from_select(
+                ["owner_id", "entity", "entity_id", "changed_at"],
+                select(table.c.owner_id, literal(entity), table.c.id, literal(now, SyncChange.changed_at.type))
+                .where(table.c.owner_id == owner_id, table.c.updated_at >= since),
+            )
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _session_rolled_back(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+async def run_sync_log_pruner(
+    *, poll_interval: float = 86400.0, stop_event: asyncio.Event | None = None
+) -> None:
+    """Prune old ``sync_changes`` rows once per ``poll_interval`` seconds."""
+
+    _stop = stop_event or asyncio.Event()
+    logger.info("Sync log pruner: старт")
+    try:
+        while not _stop.is_set():
+            try:
+                async with SyncService() as service:
+                    removed = await service.prune()
+                if removed:
+                    logger.debug(f"Sync log pruner: удалено {removed}")
+            except Exception:
+                logger.exception("Sync log pruner: ошибка очистки")
+            try:
+                await asyncio.wait_for(_stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        logger.info("Sync log pruner: остановка")
@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -16,12 +17,25 @@ from core.models import (
     ScheduleException,
     Project,
     Area,
+    TimeEntry,
 )
+from core.services import live_events
+from core.services.recurrence_service import RecurrenceService
 from core.services.reminder_service import ReminderService
 from core.services.time_service import TimeService
+from core.services.time_rollup import RollupKey, TimeRollupService, contributions
 from sqlalchemy import func
 
 
+def _event(task: Task) -> dict:
+    status = task.status.value if isinstance(task.status, TaskStatus) else task.status
+    return {"id": task.id, "title": task.title, "status": status, "due_date": task.due_date}
+
+
+# Changing any of these re-expands the materialized occurrences
+_RECURRENCE_FIELDS = {"recurrence", "repeat_config", "excluded_dates", "due_date"}
+
+
 class TaskService:
     """CRUD helpers for the :class:`Task` model."""
 
@@ -93,6 +107,9 @@ class TaskService:
             task.neural_priority = 1 / cognitive_cost
         self.session.add(task)
         await self.session.flush()
+        if task.recurrence:
+            await RecurrenceService(self.session).materialize(task)
+        live_events.emit(self.session, owner_id, "task.created", **_event(task))
         return task
 
     async def list_tasks(
@@ -135,6 +152,9 @@ class TaskService:
                 task.area_id = prj.area_id
 
         await self.session.flush()
+        if _RECURRENCE_FIELDS.intersection(k for k, v in fields.items() if v is not None):
+            await RecurrenceService(self.session).rebuild(task)
+        live_events.emit(self.session, task.owner_id, "task.updated", **_event(task))
         return task
 
     async def delete_task(self, task_id: int) -> bool:
@@ -143,8 +163,21 @@ class TaskService:
         task = await self.session.get(Task, task_id)
         if task is None:
             return False
+        # the entries go with the task (delete-orphan); take their seconds
+        # out of the rollups first
+        res = await self.session.execute(
+            select(TimeEntry).where(
+                TimeEntry.task_id == task_id, TimeEntry.end_time.is_not(None)
+            )
+        )
+        tracked: Dict[RollupKey, int] = defaultdict(int)
+        for entry in res.scalars():
+            for key, seconds in contributions(entry).items():
+                tracked[key] -= seconds
+        await TimeRollupService(self.session).add(tracked)
         await self.session.delete(task)
         await self.session.flush()
+        live_events.emit(self.session, task.owner_id, "task.deleted", id=task_id)
         return True
 
     async def mark_done(self, task_id: int) -> Task | None:
@@ -155,6 +188,7 @@ class TaskService:
             return None
         task.status = TaskStatus.done
         await self.session.flush()
+        live_events.emit(self.session, task.owner_id, "task.updated", **_event(task))
         return task
 
     async def add_reminder(
@@ -195,6 +229,8 @@ class TaskService:
         exc = ScheduleException(task_id=task_id, date=date, reason=reason)
         self.session.add(exc)
         await self.session.flush()
+        if date is not None:
+            await RecurrenceService(self.session).drop_date(task_id, date)
         return exc
 
     # --- Time tracking helpers -------------------------------------------------
@@ -217,14 +253,9 @@ class TaskService:
     async def total_tracked_minutes(self, task_id: int) -> int:
         """Return total tracked minutes for finished entries of a task.
 
-        Uses Python aggregation for cross‑DB compatibility (SQLite, Postgres).
+        Reads the daily rollups instead of the task's entries.
         """
-        svc = TimeService(self.session)
-        entries = await svc.list_entries_by_task(task_id)
-        total = 0
-        for e in entries:
-            if e.end_time and e.start_time:
-                total += int((e.end_time - e.start_time).total_seconds())
+        total = await TimeRollupService(self.session).total_seconds(task_id=task_id)
         return total // 60
 
     async def list_tasks_by_area(self, owner_id: int, area_id: int, include_sub: bool = False) -> List[Task]:
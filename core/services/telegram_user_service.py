@@ -7,7 +7,8 @@ import secrets
 import hashlib
 
 from aiogram import Bot
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -23,6 +24,8 @@ from core.models import (
     GroupType,
 )
 from core.utils import utcnow
+from .access_cache import access_cache
+from .profile_sync import PROFILE_FIELDS, profile_sync
 
 
 class TelegramUserService:
@@ -122,10 +125,97 @@ class TelegramUserService:
         user = await self.create_user(**{**required_fields, **optional_fields})
         return user, True
 
+    def _insert(self):
+        dialect = self.session.get_bind().dialect.name
+        return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    async def upsert_user(self, telegram_id: int, **kwargs) -> str:
+        """Create the user if missing and return its role in one statement."""
+
+        now = utcnow()
+        insert = self._insert()
+        stmt = insert(TgUser).values(
+            telegram_id=telegram_id,
+            first_name=kwargs.get("first_name") or f"User_{telegram_id}",
+            username=kwargs.get("username"),
+            last_name=kwargs.get("last_name"),
+            language_code=kwargs.get("language_code"),
+            role=self.determine_role(telegram_id, kwargs.get("role")).name,
+            bot_settings={},
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TgUser.telegram_id],
+            set_={"role": TgUser.__table__.c.role},  # no-op, makes RETURNING work
+        ).returning(TgUser.role)
+        try:
+            return (await self.session.execute(stmt)).scalar_one()
+        except IntegrityError:
+            # e.g. the username belongs to another account
+            await self.session.rollback()
+            user, _ = await self.get_or_create_user(telegram_id, **kwargs)
+            return user.role
+
+    async def ensure_group_member(
+        self,
+        user_id: int,
+        group_id: int,
+        *,
+        title: str | None = None,
+        type: GroupType = GroupType.group,
+    ) -> bool:
+        """Create the group and membership if missing; ``True`` if joined now.
+
+        One ``INSERT .. ON CONFLICT DO NOTHING`` each; the participant
+        counter is bumped only for a new membership. ``user_id`` must exist.
+        """
+
+        now = utcnow()
+        insert = self._insert()
+        await self.session.execute(
+            insert(Group)
+            .values(
+                telegram_id=group_id,
+                title=title or f"Group_{group_id}",
+                type=type,
+                owner_id=user_id,
+                participants_count=0,
+                created_at=now,
+                updated_at=now,
+            )
+            .on_conflict_do_nothing(index_elements=[Group.telegram_id])
+        )
+        joined = (
+            await self.session.execute(
+                insert(UserGroup)
+                .values(
+                    user_id=user_id,
+                    group_id=group_id,
+                    is_owner=False,
+                    is_moderator=False,
+                    joined_at=now,
+                )
+                .on_conflict_do_nothing(index_elements=[UserGroup.user_id, UserGroup.group_id])
+                .returning(UserGroup.user_id)
+            )
+        ).first() is not None
+        if joined:
+            await self.session.execute(
+                update(Group)
+                .where(Group.telegram_id == group_id)
+                .values(participants_count=Group.participants_count + 1)
+            )
+        return joined
+
     async def generate_ics_token(self, user: TgUser) -> str:
+        from .ics_feed import feed_cache
+
         token = secrets.token_urlsafe(32)
         user.ics_token_hash = hashlib.sha256(token.encode()).hexdigest()
         await self.session.flush()
+        # Revoke cached lookups of the previous token in this process
+        feed_cache.forget_owner(user.telegram_id)
         return token
 
     async def update_from_telegram(
@@ -134,14 +224,20 @@ class TelegramUserService:
         """Create or update a telegram user from Telegram login data."""
 
         user = await self.get_user_by_telegram_id(telegram_id)
-        if not user:
+        created = user is None
+        if created:
             user = TgUser(telegram_id=telegram_id, role=UserRole.single.name)
             self.session.add(user)
-        for field in ["username", "first_name", "last_name", "language_code"]:
-            if field in data and data[field] is not None:
-                setattr(user, field, data[field])
-        user.updated_at = utcnow()
-        await self.session.flush()
+        changed = False
+        for field in PROFILE_FIELDS:
+            value = data.get(field)
+            if value is not None and getattr(user, field) != value:
+                setattr(user, field, value)
+                changed = True
+        if created or changed:
+            user.updated_at = utcnow()
+            await self.session.flush()
+        profile_sync.remember(telegram_id, **data)
         return user
 
     async def update_user_role(
@@ -153,6 +249,7 @@ class TelegramUserService:
         try:
             user.role = new_role.name
             await self.session.flush()
+            access_cache.invalidate_user(telegram_id)
             return True
         except Exception as e:
             logger.error(f"Ошибка обновления роли пользователя: {e}")
@@ -364,6 +461,7 @@ class TelegramUserService:
     ) -> bool:
         try:
             settings = await self.get_log_settings()
+            access_cache.invalidate_log_chat()
             if settings:
                 settings.level = level
                 settings.updated_at = utcnow()
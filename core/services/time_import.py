@@ -0,0 +1,446 @@
+"""Bulk import of finished time entries from CSV or NDJSON.
+
+The file is read chunk by chunk; rows are collected into batches of
+``batch_size``. Per batch, task/project/area ids are checked and the
+PARA lineage is resolved with one query per table (a task gives its
+project and area, a project its area, as in
+:meth:`TimeService.start_timer`). Overlaps are found with a sweep over
+the batch and the owner's existing entries in its time window, both
+sorted by start; since earlier batches are already written, overlaps
+between batches of the same file are caught too.
+
+Valid rows are written with ``COPY`` on Postgres (asyncpg) and with one
+``executemany`` INSERT elsewhere, marked ``source=import``, and their
+seconds are added to ``time_rollups``. Invalid rows are reported with
+their line number and skipped.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Literal, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.logger import logger
+from core.models import ActivityType, Area, Project, Task, TimeEntry, TimeSource
+from core.services import sync_service
+from core.services.time_rollup import RollupKey, TimeRollupService, contributions
+from core.utils import naive_utc, utcnow
+
+ImportFormat = Literal["csv", "ndjson"]
+
+FIELDS = (
+    "start_time",
+    "end_time",
+    "description",
+    "task_id",
+    "project_id",
+    "area_id",
+    "activity_type",
+    "billable",
+)
+# columns written per row, in COPY order
+COLUMNS = FIELDS + ("owner_id", "source", "created_at", "updated_at")
+MAX_ERRORS = 100  # errors kept in the result; the counter keeps counting
+
+_TRUE = {"1", "true", "yes", "y", "да"}
+_FALSE = {"0", "false", "no", "n", "нет"}
+
+
+def _parse_dt(value: Any) -> datetime:
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, UTC).replace(tzinfo=None)
+    text = str(value or "").strip()
+    if not text:
+        raise ValueError("missing time")
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    return naive_utc(datetime.fromisoformat(text))
+
+
+def _parse_id(value: Any) -> int | None:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = "" if value is None else str(value).strip().lower()
+    if not text or text in _TRUE:
+        return True  # billable unless stated otherwise, like the model default
+    if text in _FALSE:
+        return False
+    raise ValueError(f"bad billable: {value}")
+
+
+async def _aiter(chunks: AsyncIterable[bytes] | Iterable[bytes]):
+    if hasattr(chunks, "__aiter__"):
+        async for chunk in chunks:
+            yield chunk
+    else:
+        for chunk in chunks:
+            yield chunk
+
+
+def parse_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise one input record; raises ``ValueError`` when invalid."""
+
+    try:
+        start = _parse_dt(raw.get("start_time"))
+        end = _parse_dt(raw.get("end_time"))
+    except (TypeError, ValueError, OverflowError, OSError) as e:
+        raise ValueError(f"bad time: {e}")
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    try:
+        ids = {k: _parse_id(raw.get(k)) for k in ("task_id", "project_id", "area_id")}
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers")
+    activity = raw.get("activity_type") or ActivityType.work.value
+    try:
+        activity = ActivityType(activity)
+    except ValueError:
+        raise ValueError(f"bad activity_type: {activity}")
+    description = raw.get("description")
+    return {
+        "start_time": start,
+        "end_time": end,
+        "description": str(description)[:500] if description not in (None, "") else None,
+        **ids,
+        "activity_type": activity,
+        "billable": _parse_bool(raw.get("billable")),
+    }
+
+
+class RecordReader:
+    """Incremental CSV/NDJSON reader returning ``(line, record)`` pairs.
+
+    CSV needs a header row; quoted fields may span lines. Lines that do
+    not parse come back as ``(line, ValueError)``.
+    """
+
+    def __init__(self, fmt: ImportFormat = "csv") -> None:
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"unknown format: {fmt}")
+        self.fmt = fmt
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._tail = ""
+        self._pending = ""  # CSV record still inside quotes
+        self._header: List[str] | None = None
+        self._line = 0  # physical lines read
+        self._start = 0  # first line of the pending record
+
+    def feed(self, data: bytes | str) -> List[Tuple[int, Dict[str, Any] | ValueError]]:
+        text = data if isinstance(data, str) else self._decoder.decode(data)
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        out: List[Tuple[int, Dict[str, Any] | ValueError]] = []
+        for line in lines:
+            self._physical(line, out)
+        return out
+
+    def close(self) -> List[Tuple[int, Dict[str, Any] | ValueError]]:
+        out: List[Tuple[int, Dict[str, Any] | ValueError]] = []
+        rest = self._tail + self._decoder.decode(b"", final=True)
+        self._tail = ""
+        if rest:
+            self._physical(rest, out)
+        if self._pending:
+            out.append((self._start, ValueError("unterminated quoted field")))
+            self._pending = ""
+        return out
+
+    def _physical(self, line: str, out: list) -> None:
+        self._line += 1
+        if self.fmt == "ndjson":
+            line = line.strip()
+            if not line:
+                return
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                out.append((self._line, ValueError(f"bad JSON: {e}")))
+                return
+            if not isinstance(record, dict):
+                out.append((self._line, ValueError("expected an object")))
+                return
+            out.append((self._line, record))
+            return
+        if not self._pending:
+            self._start = self._line
+            self._pending = line
+        else:
+            self._pending += "\n" + line
+        if self._pending.count('"') % 2:
+            return  # newline inside a quoted field
+        record, self._pending = self._pending.rstrip("\r"), ""
+        if not record.strip():
+            return
+        values = next(csv.reader([record]))
+        if self._header is None:
+            self._header = [v.strip().lower() for v in values]
+            return
+        out.append((self._start, dict(zip(self._header, values))))
+
+
+@dataclass
+class TimeImportResult:
+    rows: int = 0
+    created: int = 0
+    invalid: int = 0
+    overlaps: int = 0
+    batches: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    def reject(self, line: int, reason: str) -> None:
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, reason))
+
+
+def sweep_overlaps(
+    rows: List[Tuple[int, Dict[str, Any]]],
+    existing: Iterable[Tuple[datetime, datetime]],
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[int]]:
+    """Split ``rows`` into accepted ones and lines overlapping something.
+
+    ``existing`` must be sorted by start. A new row is rejected when it
+    overlaps an existing entry or an already accepted new row (earlier
+    start wins); with both sides sorted one pass suffices. Touching
+    intervals (``end == start``) do not overlap.
+    """
+
+    new = sorted(rows, key=lambda r: (r[1]["start_time"], r[1]["end_time"], r[0]))
+    accepted: List[Tuple[int, Dict[str, Any]]] = []
+    rejected: List[int] = []
+    reach = None  # latest end among existing entries starting before the row
+    last_end = None  # end of the last accepted new row
+    existing = iter(existing)
+    pending = next(existing, None)  # first existing entry not starting before the row
+    for line, row in new:
+        while pending is not None and pending[0] < row["start_time"]:
+            reach = pending[1] if reach is None else max(reach, pending[1])
+            pending = next(existing, None)
+        if (reach is not None and row["start_time"] < reach) or (
+            last_end is not None and row["start_time"] < last_end
+        ) or (pending is not None and pending[0] < row["end_time"]):
+            rejected.append(line)
+            continue
+        last_end = row["end_time"]
+        accepted.append((line, row))
+    return accepted, rejected
+
+
+class TimeImportService:
+    """Import finished time entries for one owner."""
+
+    def __init__(self, session: Optional[AsyncSession] = None, *, batch_size: int = 1000) -> None:
+        self.session = session
+        self._external = session is not None
+        self.batch_size = batch_size
+
+    async def __aenter__(self) -> "TimeImportService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    async def import_stream(
+        self,
+        chunks: AsyncIterable[bytes] | Iterable[bytes],
+        *,
+        owner_id: int,
+        fmt: ImportFormat = "csv",
+        on_progress: Callable[[TimeImportResult], None] | None = None,
+    ) -> TimeImportResult:
+        """Parse ``chunks`` and insert valid rows; flushes, caller commits."""
+
+        reader = RecordReader(fmt)
+        result = TimeImportResult()
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+
+        async def consume(records) -> None:
+            for line, record in records:
+                result.rows += 1
+                if isinstance(record, ValueError):
+                    result.invalid += 1
+                    result.reject(line, str(record))
+                    continue
+                try:
+                    batch.append((line, parse_row(record)))
+                except ValueError as e:
+                    result.invalid += 1
+                    result.reject(line, str(e))
+                    continue
+                if len(batch) >= self.batch_size:
+                    await self._process(batch, owner_id, result, on_progress)
+
+        async for chunk in _aiter(chunks):
+            await consume(reader.feed(chunk))
+        await consume(reader.close())
+        if batch:
+            await self._process(batch, owner_id, result, on_progress)
+        result.errors.sort()
+        logger.info(
+            "time import owner=%s rows=%s created=%s invalid=%s overlaps=%s",
+            owner_id, result.rows, result.created, result.invalid, result.overlaps,
+        )
+        return result
+
+    async def _process(
+        self,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        owner_id: int,
+        result: TimeImportResult,
+        on_progress: Callable[[TimeImportResult], None] | None,
+    ) -> None:
+        rows = await self._resolve(batch, owner_id, result)
+        if rows:
+            existing = await self._existing(owner_id, rows)
+            rows, overlapping = sweep_overlaps(rows, existing)
+            for line in overlapping:
+                result.overlaps += 1
+                result.reject(line, "overlaps another entry")
+        if rows:
+            now = utcnow()
+            values = [
+                dict(row, owner_id=owner_id, source=TimeSource.import_, created_at=now, updated_at=now)
+                for _, row in rows
+            ]
+            await self._insert(values)
+            sync_service.track(self.session, TimeEntry, owner_id, since=now)
+            deltas: Dict[RollupKey, int] = defaultdict(int)
+            for value in values:
+                for key, seconds in contributions(TimeEntry(**value)).items():
+                    deltas[key] += seconds
+            await TimeRollupService(self.session).add(deltas)
+            result.created += len(values)
+        result.batches += 1
+        batch.clear()
+        if on_progress is not None:
+            on_progress(result)
+
+    async def _resolve(
+        self,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        owner_id: int,
+        result: TimeImportResult,
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Check ownership and fill project/area from tasks and projects."""
+
+        def wanted(key: str) -> set:
+            return {row[key] for _, row in batch if row[key] is not None}
+
+        tasks: Dict[int, Tuple[int, int | None, int | None]] = {}
+        projects: Dict[int, Tuple[int, int | None]] = {}
+        areas: Dict[int, int] = {}
+        ids = wanted("task_id")
+        if ids:
+            res = await self.session.execute(
+                select(Task.id, Task.owner_id, Task.project_id, Task.area_id).where(Task.id.in_(ids))
+            )
+            tasks = {i: (o, p, a) for i, o, p, a in res.all()}
+        ids = wanted("project_id")
+        if ids:
+            res = await self.session.execute(
+                select(Project.id, Project.owner_id, Project.area_id).where(Project.id.in_(ids))
+            )
+            projects = {i: (o, a) for i, o, a in res.all()}
+        ids = wanted("area_id")
+        parents: set = set()
+        if ids:
+            res = await self.session.execute(select(Area.id, Area.owner_id).where(Area.id.in_(ids)))
+            areas = dict(res.all())
+            res = await self.session.execute(
+                select(Area.parent_id).where(Area.parent_id.in_(ids)).distinct()
+            )
+            parents = set(res.scalars())
+
+        out: List[Tuple[int, Dict[str, Any]]] = []
+        for line, row in batch:
+            if row["task_id"] is not None:
+                task = tasks.get(row["task_id"])
+                if task is None or task[0] != owner_id:
+                    reason = "task not found"
+                else:
+                    row["project_id"], row["area_id"] = task[1], task[2]
+                    reason = None
+            elif row["project_id"] is not None:
+                project = projects.get(row["project_id"])
+                if project is None or project[0] != owner_id:
+                    reason = "project not found"
+                else:
+                    row["area_id"] = project[1]
+                    reason = None
+            elif row["area_id"] is not None:
+                if areas.get(row["area_id"]) != owner_id:
+                    reason = "area not found"
+                elif row["area_id"] in parents:
+                    reason = "area must be a leaf"
+                else:
+                    reason = None
+            else:
+                reason = None
+            if reason is None:
+                out.append((line, row))
+            else:
+                result.invalid += 1
+                result.reject(line, reason)
+        return out
+
+    async def _existing(
+        self, owner_id: int, rows: List[Tuple[int, Dict[str, Any]]]
+    ) -> List[Tuple[datetime, datetime]]:
+        """The owner's entries inside the batch window, sorted by start."""
+
+        lo = min(row["start_time"] for _, row in rows)
+        hi = max(row["end_time"] for _, row in rows)
+        res = await self.session.execute(
+            select(TimeEntry.start_time, TimeEntry.end_time)
+            .where(
+                TimeEntry.owner_id == owner_id,
+                TimeEntry.start_time < hi,
+                or_(TimeEntry.end_time.is_(None), TimeEntry.end_time > lo),
+            )
+            .order_by(TimeEntry.start_time)
+        )
+        now = utcnow()
+        # a running timer occupies everything up to now
+        return [(naive_utc(s), naive_utc(e) if e is not None else max(now, hi)) for s, e in res.all()]
+
+    async def _insert(self, values: List[Dict[str, Any]]) -> None:
+        if self.session.get_bind().dialect.name == "postgresql":
+            conn = await self.session.connection()
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                TimeEntry.__tablename__,
+                columns=list(COLUMNS),
+                records=[tuple(_copy_value(v[c]) for c in COLUMNS) for v in values],
+            )
+            return
+        await self.session.execute(TimeEntry.__table__.insert(), values)
+
+
+def _copy_value(value: Any) -> Any:
+    # COPY skips SQLAlchemy types: enums go in by name, timestamps as UTC
+    if isinstance(value, (ActivityType, TimeSource)):
+        return value.name
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=UTC)
+    return value
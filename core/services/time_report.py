@@ -0,0 +1,192 @@
+"""Time reports aggregated in SQL from :class:`TimeRollup` rows.
+
+A report groups tracked seconds by any mix of ``day``, ``week``,
+``area``, ``project``, ``task`` and ``activity`` for an owner, a day
+range and optionally an area subtree. With ``rollup`` the ``area``
+column holds ancestors: each area's total includes its descendants,
+matched by ``mp_path`` prefix in the same statement. The result is
+columnar (one list per column) so a year of data stays a small payload.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Date, and_, cast, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from core import db
+from core.models import Area, Project, Task, TimeRollup
+
+DIMENSIONS = ("day", "week", "area", "project", "task", "activity")
+
+
+@dataclass
+class TimeReport:
+    group_by: List[str]
+    columns: Dict[str, List[Any]]
+    labels: Dict[str, Dict[int, str]] = field(default_factory=dict)
+    total_seconds: int = 0
+
+    @property
+    def rows(self) -> int:
+        return len(self.columns.get("seconds", []))
+
+
+def _is_prefix(prefix_col, path_col):
+    """``path_col`` starts with ``prefix_col`` (no LIKE wildcards involved)."""
+    return func.substr(path_col, 1, func.length(prefix_col)) == prefix_col
+
+
+class TimeReportService:
+    """Grouped totals over ``time_rollups``."""
+
+    def __init__(self, session: Optional[AsyncSession] = None) -> None:
+        self.session = session
+        self._external = session is not None
+
+    async def __aenter__(self) -> "TimeReportService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # pragma: no cover
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    def _week(self):
+        if self.session.get_bind().dialect.name == "postgresql":
+            return cast(func.date_trunc("week", TimeRollup.day), Date)
+        # back 6 days, then forward to Monday: the Monday of the same ISO week
+        return func.date(TimeRollup.day, "-6 days", "weekday 1")
+
+    async def report(
+        self,
+        owner_id: int,
+        *,
+        group_by: Sequence[str] = ("area",),
+        day_from: date,
+        day_to: date,
+        area_id: int | None = None,
+        rollup: bool = True,
+    ) -> TimeReport:
+        """Totals per group; ``day_to`` is inclusive.
+
+        Raises ``ValueError`` for unknown dimensions and ``LookupError``
+        when ``area_id`` is not an area of the owner.
+        """
+
+        group_by = list(dict.fromkeys(group_by))
+        unknown = set(group_by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"unknown group_by: {', '.join(sorted(unknown))}")
+
+        root_path = None
+        if area_id is not None:
+            root_path = await self.session.scalar(
+                select(Area.mp_path).where(Area.id == area_id, Area.owner_id == owner_id)
+            )
+            if root_path is None:
+                raise LookupError("area not found")
+        by_ancestor = rollup and "area" in group_by
+
+        exprs = {
+            "day": TimeRollup.day,
+            "week": self._week(),
+            "area": TimeRollup.area_id,
+            "project": func.nullif(TimeRollup.project_id, 0),
+            "task": func.nullif(TimeRollup.task_id, 0),
+            "activity": TimeRollup.activity_type,
+        }
+        # first sum rollup rows per key (area included), then join areas:
+        # the mp_path matching only sees one row per area and key
+        inner_keys = [exprs[d].label(d) for d in group_by]
+        if "area" not in group_by and root_path is not None:
+            inner_keys.append(TimeRollup.area_id.label("area"))
+        inner = (
+            select(*inner_keys, func.sum(TimeRollup.seconds).label("seconds"))
+            .where(
+                TimeRollup.owner_id == owner_id,
+                TimeRollup.day >= day_from,
+                TimeRollup.day <= day_to,
+            )
+            .group_by(*inner_keys)
+            .subquery()
+        )
+        stmt = select().select_from(inner)
+        if root_path is not None or by_ancestor:
+            # area -> ancestor pairs of the owner's areas, matched once per
+            # area rather than once per grouped row
+            child = aliased(Area)
+            ancestor = aliased(Area)
+            areas = select(child.id.label("child")).where(child.owner_id == owner_id)
+            if root_path is not None:
+                areas = areas.where(_is_prefix(literal(root_path), child.mp_path))
+            if by_ancestor:
+                on = and_(ancestor.owner_id == owner_id, _is_prefix(ancestor.mp_path, child.mp_path))
+                if root_path is not None:
+                    on = and_(on, _is_prefix(literal(root_path), ancestor.mp_path))
+                areas = areas.add_columns(ancestor.id.label("ancestor")).outerjoin(ancestor, on)
+            areas = areas.subquery()
+            stmt = stmt.join(areas, areas.c.child == inner.c.area, isouter=root_path is None)
+        outer = {d: inner.c[d] for d in group_by}
+        if "area" in group_by:
+            outer["area"] = areas.c.ancestor if by_ancestor else func.nullif(inner.c.area, 0)
+        keys = [outer[d].label(d) for d in group_by]
+        stmt = stmt.add_columns(*keys, func.sum(inner.c.seconds).label("seconds"))
+        if keys:
+            stmt = stmt.group_by(*keys).order_by(*keys)
+        rows = (await self.session.execute(stmt)).all()
+
+        columns: Dict[str, List[Any]] = {d: [] for d in group_by}
+        columns["seconds"] = []
+        for row in rows:
+            for i, d in enumerate(group_by):
+                value = row[i]
+                if d in ("day", "week") and value is not None and not isinstance(value, str):
+                    value = value.isoformat()
+                columns[d].append(value)
+            columns["seconds"].append(int(row[-1] or 0))
+        if not group_by and columns["seconds"] == [0]:
+            columns["seconds"] = []
+
+        report = TimeReport(group_by=group_by, columns=columns)
+        report.labels = await self._labels(columns)
+        if by_ancestor:
+            # ancestors repeat their descendants' time; count leaves only once
+            report.total_seconds = await self._total(owner_id, day_from, day_to, root_path)
+        else:
+            report.total_seconds = sum(columns["seconds"])
+        return report
+
+    async def _total(self, owner_id, day_from, day_to, root_path) -> int:
+        stmt = select(func.coalesce(func.sum(TimeRollup.seconds), 0)).where(
+            TimeRollup.owner_id == owner_id,
+            TimeRollup.day >= day_from,
+            TimeRollup.day <= day_to,
+        )
+        if root_path is not None:
+            stmt = stmt.join(Area, Area.id == TimeRollup.area_id).where(
+                _is_prefix(literal(root_path), Area.mp_path)
+            )
+        return int(await self.session.scalar(stmt) or 0)
+
+    async def _labels(self, columns: Dict[str, List[Any]]) -> Dict[str, Dict[int, str]]:
+        labels: Dict[str, Dict[int, str]] = {}
+        for dim, model, name in (
+            ("area", Area, Area.name),
+            ("project", Project, Project.name),
+            ("task", Task, Task.title),
+        ):
+            ids = {i for i in columns.get(dim, []) if i is not None}
+            if ids:
+                res = await self.session.execute(select(model.id, name).where(model.id.in_(ids)))
+                labels[dim] = {i: n for i, n in res.all()}
+        return labels
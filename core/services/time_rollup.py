@@ -0,0 +1,193 @@
+"""Daily rollups of tracked time.
+
+``time_rollups`` holds seconds of finished :class:`TimeEntry` rows per
+``(owner_id, day, area_id, project_id, task_id, activity_type,
+billable)``; entries crossing midnight (UTC) are split between days.
+:class:`TimeService` keeps the table current: it takes a
+:func:`contributions` snapshot of an entry before changing it and passes
+it to :meth:`TimeRollupService.apply` afterwards, which upserts only the
+difference. :meth:`TimeRollupService.rebuild` recomputes rows from the
+entries (``scripts/rebuild_time_rollups.py``).
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import db
+from core.models import ActivityType, TimeEntry, TimeRollup
+from core.utils import naive_utc
+
+# (owner_id, day, area_id, project_id, task_id, activity_type, billable)
+RollupKey = Tuple[int, date, int, int, int, str, bool]
+KEY_FIELDS = ("owner_id", "day", "area_id", "project_id", "task_id", "activity_type", "billable")
+
+
+def split_by_day(start: datetime, end: datetime) -> List[Tuple[date, int]]:
+    """Seconds of ``[start, end)`` per UTC day; pieces sum to the whole."""
+
+    start, end = naive_utc(start), naive_utc(end)
+    remaining = int((end - start).total_seconds())
+    pieces: List[Tuple[date, int]] = []
+    cursor = start
+    while remaining > 0:
+        midnight = datetime.combine(cursor.date() + timedelta(days=1), time())
+        if end <= midnight:
+            pieces.append((cursor.date(), remaining))
+            break
+        seconds = min(remaining, int((midnight - cursor).total_seconds()))
+        if seconds:
+            pieces.append((cursor.date(), seconds))
+        remaining -= seconds
+        cursor = midnight
+    return pieces
+
+
+def contributions(entry: TimeEntry) -> Dict[RollupKey, int]:
+    """Seconds the entry adds to each rollup row (empty while running)."""
+
+    if entry.start_time is None or entry.end_time is None:
+        return {}
+    activity = entry.activity_type or ActivityType.work
+    billable = True if entry.billable is None else bool(entry.billable)
+    out: Dict[RollupKey, int] = {}
+    for day, seconds in split_by_day(entry.start_time, entry.end_time):
+        key = (
+            entry.owner_id,
+            day,
+            entry.area_id or 0,
+            entry.project_id or 0,
+            entry.task_id or 0,
+            activity.value,
+            billable,
+        )
+        out[key] = out.get(key, 0) + seconds
+    return out
+
+
+class TimeRollupService:
+    """Incremental maintenance and reads of ``time_rollups``."""
+
+    def __init__(self, session: Optional[AsyncSession] = None) -> None:
+        self.session = session
+        self._external = session is not None
+
+    async def __aenter__(self) -> "TimeRollupService":
+        if self.session is None:
+            self.session = db.async_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # pragma: no cover
+        if not self._external:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+            await self.session.close()
+
+    def _insert(self):
+        dialect = self.session.get_bind().dialect.name
+        return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    async def add(self, deltas: Dict[RollupKey, int]) -> None:
+        """Add signed seconds per key; rows that drop to zero are removed."""
+
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+        insert = self._insert()
+        stmt = insert(TimeRollup).values(
+            [dict(zip(KEY_FIELDS, key), seconds=seconds) for key, seconds in deltas.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_FIELDS),
+            set_={"seconds": TimeRollup.seconds + stmt.excluded.seconds},
+        )
+        await self.session.execute(stmt)
+        if any(v < 0 for v in deltas.values()):
+            owners = {key[0] for key in deltas}
+            days = {key[1] for key in deltas}
+            await self.session.execute(
+                delete(TimeRollup).where(
+                    TimeRollup.owner_id.in_(owners),
+                    TimeRollup.day.in_(days),
+                    TimeRollup.seconds <= 0,
+                )
+            )
+
+    async def apply(self, before: Dict[RollupKey, int], entry: TimeEntry | None) -> None:
+        """Replace the ``before`` contributions with the entry's current ones."""
+
+        deltas: Dict[RollupKey, int] = defaultdict(int)
+        for key, seconds in before.items():
+            deltas[key] -= seconds
+        if entry is not None:
+            for key, seconds in contributions(entry).items():
+                deltas[key] += seconds
+        await self.add(deltas)
+
+    async def rebuild(self, owner_id: int | None = None, *, batch_size: int = 1000) -> int:
+        """Recompute rows from finished entries; returns the row count."""
+
+        cleanup = delete(TimeRollup)
+        stmt = select(TimeEntry).where(TimeEntry.end_time.is_not(None))
+        if owner_id is not None:
+            cleanup = cleanup.where(TimeRollup.owner_id == owner_id)
+            stmt = stmt.where(TimeEntry.owner_id == owner_id)
+        await self.session.execute(cleanup)
+        totals: Dict[RollupKey, int] = defaultdict(int)
+        result = await self.session.stream_scalars(
+            stmt.order_by(TimeEntry.id).execution_options(yield_per=batch_size)
+        )
+        async for entry in result:
+            for key, seconds in contributions(entry).items():
+                totals[key] += seconds
+        rows = [dict(zip(KEY_FIELDS, k), seconds=v) for k, v in totals.items() if v > 0]
+        for i in range(0, len(rows), batch_size):
+            await self.session.execute(TimeRollup.__table__.insert(), rows[i : i + batch_size])
+        return len(rows)
+
+    async def total_seconds(
+        self,
+        owner_id: int | None = None,
+        *,
+        task_id: int | None = None,
+        day_from: date | None = None,
+        day_to: date | None = None,
+    ) -> int:
+        """Sum of rolled-up seconds; ``day_to`` is inclusive."""
+
+        stmt = select(func.coalesce(func.sum(TimeRollup.seconds), 0))
+        if owner_id is not None:
+            stmt = stmt.where(TimeRollup.owner_id == owner_id)
+        if task_id is not None:
+            stmt = stmt.where(TimeRollup.task_id == task_id)
+        if day_from is not None:
+            stmt = stmt.where(TimeRollup.day >= day_from)
+        if day_to is not None:
+            stmt = stmt.where(TimeRollup.day <= day_to)
+        return int(await self.session.scalar(stmt) or 0)
+
+    async def by_day(
+        self, owner_id: int, day_from: date, day_to: date
+    ) -> List[Tuple[date, int]]:
+        """``(day, seconds)`` for days with tracked time, in order."""
+
+        res = await self.session.execute(
+            select(TimeRollup.day, func.sum(TimeRollup.seconds))
+            .where(
+                TimeRollup.owner_id == owner_id,
+                TimeRollup.day >= day_from,
+                TimeRollup.day <= day_to,
+            )
+            .group_by(TimeRollup.day)
+            .order_by(TimeRollup.day)
+        )
+        return [(day, int(seconds)) for day, seconds in res.all()]
+
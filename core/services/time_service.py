@@ -2,14 +2,28 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core import db
-from core.models import TimeEntry, Task, TaskStatus
-from core.utils import utcnow
+from core.models import ActivityType, TimeEntry, Task, TaskStatus
+from core.utils import naive_utc, utcnow
+from . import live_events
+from .time_rollup import TimeRollupService, contributions
+from .timer_registry import RunningTimer, has_pending, timer_registry
+
+
+def _event(entry: TimeEntry) -> dict:
+    return {
+        "id": entry.id,
+        "task_id": entry.task_id,
+        "start_time": entry.start_time,
+        "end_time": entry.end_time,
+        "description": entry.description,
+    }
 
 
 class TimeService:
@@ -48,18 +62,13 @@ class TimeService:
         - If ``task_id`` is provided, links the entry to the task and
           (soft) enforces that the task belongs to the same owner.
         - If ``exclusive`` is True, refuses to start when another timer
-          without ``end_time`` exists for the owner.
+          without ``end_time`` exists for the owner. This reads the
+          database, not the timer registry, which may lag behind writes
+          made by another process.
         """
 
         if exclusive:
-            stmt = (
-                select(TimeEntry)
-                .where(TimeEntry.owner_id == owner_id)
-                .where(TimeEntry.end_time.is_(None))
-                .order_by(TimeEntry.start_time.desc())
-            )
-            res = await self.session.execute(stmt)
-            running = res.scalars().first()
+            running = await self.get_running_entry(owner_id)
             if running:
                 raise ValueError(
                     f"Another timer #{running.id} is already running for owner {owner_id}."
@@ -106,6 +115,7 @@ class TimeService:
         if linked_task and linked_task.status != TaskStatus.done:
             linked_task.status = TaskStatus.in_progress
         await self.session.flush()
+        live_events.emit(self.session, owner_id, "timer.started", **_event(entry))
         return entry
 
     async def resume_task(self, owner_id: int, task_id: int, description: str | None = None) -> TimeEntry:
@@ -127,8 +137,11 @@ class TimeService:
         entry = await self.session.get(TimeEntry, entry_id)
         if entry is None:
             return None
+        before = contributions(entry)
         entry.end_time = utcnow()
         await self.session.flush()
+        await TimeRollupService(self.session).apply(before, entry)
+        live_events.emit(self.session, entry.owner_id, "timer.stopped", **_event(entry))
         return entry
 
     async def list_entries(
@@ -156,10 +169,46 @@ class TimeService:
         task = await self.session.get(Task, task_id)
         if not task or task.owner_id != owner_id:
             raise PermissionError("Task not found or belongs to different owner")
+        before = contributions(entry)
         entry.task_id = task.id
         entry.project_id = getattr(task, "project_id", None)
         entry.area_id = getattr(task, "area_id", None)
         await self.session.flush()
+        await TimeRollupService(self.session).apply(before, entry)
+        live_events.emit(self.session, owner_id, "time_entry.updated", **_event(entry))
+        return entry
+
+    async def update_entry(
+        self,
+        entry_id: int,
+        *,
+        owner_id: int,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        description: str | None = None,
+        activity_type: ActivityType | None = None,
+        billable: bool | None = None,
+    ) -> TimeEntry:
+        """Edit an entry of ``owner_id``; ``None`` leaves a field unchanged."""
+        entry = await self.session.get(TimeEntry, entry_id)
+        if not entry or entry.owner_id != owner_id:
+            raise PermissionError("Entry not found or belongs to different owner")
+        before = contributions(entry)
+        if start_time is not None:
+            entry.start_time = start_time
+        if end_time is not None:
+            entry.end_time = end_time
+        if entry.end_time is not None and naive_utc(entry.end_time) <= naive_utc(entry.start_time):
+            raise ValueError("end_time must be after start_time")
+        if description is not None:
+            entry.description = description
+        if activity_type is not None:
+            entry.activity_type = activity_type
+        if billable is not None:
+            entry.billable = billable
+        await self.session.flush()
+        await TimeRollupService(self.session).apply(before, entry)
+        live_events.emit(self.session, owner_id, "time_entry.updated", **_event(entry))
         return entry
 
     async def get_running_entry(self, owner_id: int, task_id: int | None = None) -> TimeEntry | None:
@@ -176,6 +225,45 @@ class TimeService:
         return res.scalars().first()
 
 
+    async def running_timers(self, owner_id: int) -> List[RunningTimer]:
+        """Running timers of the owner, newest first, from the timer registry."""
+
+        async def load() -> List[RunningTimer]:
+            stmt = (
+                select(TimeEntry)
+                .where(TimeEntry.owner_id == owner_id)
+                .where(TimeEntry.end_time.is_(None))
+            )
+            res = await self.session.execute(stmt)
+            return [RunningTimer.from_entry(e) for e in res.scalars()]
+
+        if has_pending(self.session):
+            # this session changed entries that are not committed yet
+            timers = await load()
+        else:
+            timers = await timer_registry.running(owner_id, load)
+        return sorted(timers, key=lambda t: naive_utc(t.start_time), reverse=True)
+
+    async def running_timer(self, owner_id: int, task_id: int | None = None) -> RunningTimer | None:
+        """Like :meth:`get_running_entry`, but a snapshot from the registry.
+
+        For display only: decisions that write use :meth:`get_running_entry`.
+        """
+        for timer in await self.running_timers(owner_id):
+            if task_id is None or timer.task_id == task_id:
+                return timer
+        return None
+
+    async def focus_seconds(self, owner_id: int, since: datetime) -> float:
+        """Tracked seconds from the day of ``since`` until now (rollups + running timer)."""
+        finished = await TimeRollupService(self.session).total_seconds(
+            owner_id, day_from=since.date()
+        )
+        running = await self.running_timer(owner_id)
+        if running is None:
+            return float(finished)
+        return finished + max(0.0, (utcnow() - naive_utc(running.start_time)).total_seconds())
+
     async def list_entries_filtered(self, owner_id: int, *, area_id: int | None = None, include_sub: bool = False, time_from=None, time_to=None) -> list[TimeEntry]:
         stmt = select(TimeEntry).where(TimeEntry.owner_id == owner_id)
         from sqlalchemy import and_, or_
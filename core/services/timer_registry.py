@@ -0,0 +1,329 @@
+"""Registry of running timers per owner.
+
+Timer status is read on every timer-widget refresh and task list render;
+:class:`TimerRegistry` answers those from memory (or Redis) instead of
+querying ``time_entries WHERE end_time IS NULL``. It serves display
+only: starting and stopping timers check the database, since the
+registry may lag behind another process.
+
+Writes are transactional: mapper events on :class:`TimeEntry` stage a
+change in ``session.info`` whenever an entry is inserted, updated or
+deleted through the ORM, and the registry applies the staged changes
+only after the session commits (a rollback drops them). So
+``start_timer``/``stop_timer``/``resume_task`` and any other ORM path
+keep it current without extra calls.
+
+The registry only holds owners it has loaded. A miss - an unknown owner,
+an expired entry, ``TIMER_REGISTRY=off`` - falls back to the database
+and caches the result. Entries expire after ``TIMER_REGISTRY_TTL``
+seconds, which bounds staleness after writes made by another process:
+the in-process backend is per process, so with a separately running
+polling bot use ``TIMER_REGISTRY=redis`` to share it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes, object_session
+
+from core.logger import logger
+from core.models import TimeEntry
+
+PENDING_KEY = "timer_registry_changes"
+
+# ("start", RunningTimer) | ("stop", (owner_id, entry_id))
+Change = Tuple[str, Any]
+
+
+@dataclass(frozen=True)
+class RunningTimer:
+    """Snapshot of a running entry; attribute names match :class:`TimeEntry`."""
+
+    id: int
+    owner_id: int
+    start_time: datetime
+    task_id: int | None = None
+    project_id: int | None = None
+    area_id: int | None = None
+    description: str | None = None
+    end_time: None = None
+
+    @classmethod
+    def from_entry(cls, entry: TimeEntry) -> "RunningTimer":
+        return cls(
+            id=entry.id,
+            owner_id=entry.owner_id,
+            start_time=entry.start_time,
+            task_id=entry.task_id,
+            project_id=entry.project_id,
+            area_id=entry.area_id,
+            description=entry.description,
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["start_time"] = self.start_time.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "RunningTimer":
+        data = json.loads(raw)
+        data["start_time"] = datetime.fromisoformat(data["start_time"])
+        return cls(**data)
+
+
+class MemoryTimerBackend:
+    """Per-process ``owner -> {entry_id: RunningTimer}`` map with TTL."""
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 300.0,
+        max_owners: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_owners = max_owners
+        self._clock = clock
+        self._timers: "OrderedDict[int, Tuple[Dict[int, RunningTimer], float]]" = OrderedDict()
+        # fill tokens: a commit counter and the count at each owner's last
+        # commit, bounded like _timers; a dropped owner is assumed to have
+        # changed as late as the newest dropped one (_floor)
+        self._seq = 0
+        self._changed: "OrderedDict[int, int]" = OrderedDict()
+        self._floor = 0
+
+    async def get(self, owner_id: int) -> List[RunningTimer] | None:
+        item = self._timers.get(owner_id)
+        if item is None:
+            return None
+        if item[1] <= self._clock():
+            del self._timers[owner_id]
+            return None
+        self._timers.move_to_end(owner_id)
+        return list(item[0].values())
+
+    async def token(self, owner_id: int) -> int:
+        return self._seq
+
+    async def fill(self, owner_id: int, timers: List[RunningTimer], token: int) -> None:
+        if self._changed.get(owner_id, self._floor) > token:
+            return  # a commit landed while the database was read
+        self._timers[owner_id] = ({t.id: t for t in timers}, self._clock() + self.ttl)
+        self._timers.move_to_end(owner_id)
+        while len(self._timers) > self.max_owners:
+            self._timers.popitem(last=False)
+
+    def commit(self, changes: List[Change]) -> None:
+        for op, value in changes:
+            owner_id = value.owner_id if op == "start" else value[0]
+            self._seq += 1
+            self._changed[owner_id] = self._seq
+            self._changed.move_to_end(owner_id)
+            while len(self._changed) > self.max_owners:
+                self._floor = self._changed.popitem(last=False)[1]
+            item = self._timers.get(owner_id)
+            if item is None:
+                continue
+            if op == "start":
+                item[0][value.id] = value
+            else:
+                item[0].pop(value[1], None)
+
+    def clear(self) -> None:
+        self._timers.clear()
+        self._changed.clear()
+        self._seq = self._floor = 0
+
+
+class RedisTimerBackend:
+    """Shared registry: one hash ``timers:<owner>`` of entry id -> JSON.
+
+    The ``_`` field marks a loaded owner; writes made before the owner was
+    loaded leave a hash without it, which still counts as a miss.
+    """
+
+    LOADED = "_"
+
+    def __init__(self, redis, *, ttl: float = 300.0, prefix: str = "timers") -> None:
+        self.redis = redis
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._tasks: set[asyncio.Task] = set()
+
+    def _key(self, owner_id: int) -> str:
+        return f"{self.prefix}:{owner_id}"
+
+    def _gen_key(self, owner_id: int) -> str:
+        return f"{self.prefix}:gen:{owner_id}"
+
+    async def get(self, owner_id: int) -> List[RunningTimer] | None:
+        raw = await self.redis.hgetall(self._key(owner_id))
+        if not raw or not any(k in (self.LOADED, self.LOADED.encode()) for k in raw):
+            return None
+        return [
+            RunningTimer.from_json(v)
+            for k, v in raw.items()
+            if k not in (self.LOADED, self.LOADED.encode())
+        ]
+
+    async def token(self, owner_id: int) -> Any:
+        return await self.redis.get(self._gen_key(owner_id))
+
+    async def fill(self, owner_id: int, timers: List[RunningTimer], token: Any) -> None:
+        if await self.redis.get(self._gen_key(owner_id)) != token:
+            return
+        key = self._key(owner_id)
+        await self.redis.delete(key)
+        await self.redis.hset(
+            key, mapping={self.LOADED: "1", **{str(t.id): t.to_json() for t in timers}}
+        )
+        await self.redis.expire(key, self.ttl)
+
+    async def _apply(self, changes: List[Change]) -> None:
+        for op, value in changes:
+            owner_id = value.owner_id if op == "start" else value[0]
+            key = self._key(owner_id)
+            await self.redis.incr(self._gen_key(owner_id))
+            await self.redis.expire(self._gen_key(owner_id), self.ttl)
+            if op == "start":
+                await self.redis.hset(key, str(value.id), value.to_json())
+                await self.redis.expire(key, self.ttl)
+            else:
+                await self.redis.hdel(key, str(value[1]))
+
+    def commit(self, changes: List[Change]) -> None:
+        async def apply() -> None:
+            try:
+                await self._apply(changes)
+            except Exception:
+                logger.exception("timer registry: redis update failed")
+
+        task = asyncio.get_running_loop().create_task(apply())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """Wait for scheduled updates (tests, shutdown)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    def clear(self) -> None:  # pragma: no cover - keys expire on their own
+        pass
+
+
+class TimerRegistry:
+    """Running timers per owner with a database fallback."""
+
+    def __init__(self, backend: MemoryTimerBackend | RedisTimerBackend | None) -> None:
+        self.backend = backend
+        self.stats = {"hits": 0, "misses": 0, "commits": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def running(
+        self, owner_id: int, load: Callable[[], Awaitable[List[RunningTimer]]]
+    ) -> List[RunningTimer]:
+        """Running timers of the owner; ``load`` reads them from the database."""
+
+        if self.backend is None:
+            return await load()
+        cached = await self.backend.get(owner_id)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+        self.stats["misses"] += 1
+        token = await self.backend.token(owner_id)
+        timers = await load()
+        await self.backend.fill(owner_id, timers, token)
+        return timers
+
+    def commit(self, changes: List[Change]) -> None:
+        if self.backend is not None and changes:
+            self.stats["commits"] += 1
+            self.backend.commit(changes)
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        kind = type(self.backend).__name__ if self.backend else "off"
+        return {"backend": kind, **self.stats}
+
+
+def create_registry(kind: str | None = None) -> TimerRegistry:
+    """Build the registry selected by ``TIMER_REGISTRY`` (memory | redis | off)."""
+
+    kind = (kind or os.getenv("TIMER_REGISTRY") or "memory").lower()
+    ttl = float(os.getenv("TIMER_REGISTRY_TTL", "300"))
+    if kind == "off":
+        return TimerRegistry(None)
+    if kind == "memory":
+        return TimerRegistry(MemoryTimerBackend(ttl=ttl))
+    if kind == "redis":
+        from redis.asyncio import Redis
+
+        redis = Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            db=int(os.getenv("TIMER_REDIS_DB", "0")),
+        )
+        return TimerRegistry(RedisTimerBackend(redis, ttl=ttl))
+    raise ValueError(f"unknown TIMER_REGISTRY: {kind}")
+
+
+timer_registry = create_registry()
+
+
+def has_pending(session: Session) -> bool:
+    """Uncommitted timer changes in ``session`` (read the database then)."""
+    return bool(session.info.get(PENDING_KEY))
+
+
+def _stage(target: TimeEntry, change: Change) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_KEY, []).append(change)
+
+
+@event.listens_for(TimeEntry, "after_insert")
+def _entry_inserted(mapper, connection, target: TimeEntry) -> None:
+    if target.end_time is None:
+        _stage(target, ("start", RunningTimer.from_entry(target)))
+
+
+@event.listens_for(TimeEntry, "after_update")
+def _entry_updated(mapper, connection, target: TimeEntry) -> None:
+    if target.end_time is None:
+        _stage(target, ("start", RunningTimer.from_entry(target)))
+    elif attributes.get_history(target, "end_time").has_changes():
+        _stage(target, ("stop", (target.owner_id, target.id)))
+
+
+@event.listens_for(TimeEntry, "after_delete")
+def _entry_deleted(mapper, connection, target: TimeEntry) -> None:
+    _stage(target, ("stop", (target.owner_id, target.id)))
+
+
+@event.listens_for(Session, "after_commit")
+def _session_committed(session: Session) -> None:
+    changes = session.info.pop(PENDING_KEY, None)
+    if changes:
+        timer_registry.commit(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _session_rolled_back(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
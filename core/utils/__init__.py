@@ -6,5 +6,12 @@ def utcnow() -> datetime:
     return datetime.now(UTC).replace(tzinfo=None)
 
 
-__all__ = ["utcnow"]
+def naive_utc(dt: datetime | None) -> datetime | None:
+    """Convert an aware datetime to naive UTC; naive ones are assumed UTC."""
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(UTC).replace(tzinfo=None)
+    return dt
+
+
+__all__ = ["naive_utc", "utcnow"]
 
@@ -0,0 +1,42 @@
+"""agenda source indexes (owner + start time)
+
+Revision ID: 20261019_01
+Revises: 20250901_01
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = '20261019_01'
+down_revision = '20250901_01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Merged agenda scans every source by (owner_id, start) in one UNION ALL
+    try:
+        op.create_index('ix_calendar_items_owner_start', 'calendar_items', ['owner_id', 'start_at'], unique=False)
+    except Exception:
+        pass
+    try:
+        op.create_index('ix_calendar_events_owner_start', 'calendar_events', ['owner_id', 'start_at'], unique=False)
+    except Exception:
+        pass
+    try:
+        op.create_index('ix_tasks_owner_due', 'tasks', ['owner_id', 'due_date'], unique=False)
+    except Exception:
+        pass
+    try:
+        op.create_index('ix_reminders_owner_remind', 'reminders', ['owner_id', 'remind_at'], unique=False)
+    except Exception:
+        pass
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reminders_owner_remind', table_name='reminders')
+    op.drop_index('ix_tasks_owner_due', table_name='tasks')
+    op.drop_index('ix_calendar_events_owner_start', table_name='calendar_events')
+    op.drop_index('ix_calendar_items_owner_start', table_name='calendar_items')
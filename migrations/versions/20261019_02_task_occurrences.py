@@ -0,0 +1,35 @@
+"""materialized occurrences of recurring tasks
+
+Revision ID: 20261019_02
+Revises: 20261019_01
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_02'
+down_revision = '20261019_01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('occurrences_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_table(
+        'task_occurrences',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('task_id', sa.Integer, sa.ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('owner_id', sa.BigInteger, sa.ForeignKey('users_tg.telegram_id')),
+        sa.Column('occurs_at', sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint('task_id', 'occurs_at', name='uq_task_occurrences_task_at'),
+    )
+    op.create_index('ix_task_occurrences_owner_at', 'task_occurrences', ['owner_id', 'occurs_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_occurrences_owner_at', table_name='task_occurrences')
+    op.drop_table('task_occurrences')
+    op.drop_column('tasks', 'occurrences_until')
@@ -0,0 +1,27 @@
+"""time entries index for free/busy overlap queries
+
+Revision ID: 20261019_03
+Revises: 20261019_02
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = '20261019_03'
+down_revision = '20261019_02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Overlap predicate ``start < :end AND end > :start`` is driven by (owner_id, start)
+    try:
+        op.create_index('ix_time_entries_owner_start', 'time_entries', ['owner_id', 'start_time'], unique=False)
+    except Exception:
+        pass
+
+
+def downgrade() -> None:
+    op.drop_index('ix_time_entries_owner_start', table_name='time_entries')
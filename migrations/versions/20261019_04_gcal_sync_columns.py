@@ -0,0 +1,64 @@
+"""gcal sync: reconcile gcal_links columns, mirror ids on calendar_items
+
+Revision ID: 20261019_04
+Revises: 20261019_03
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_04'
+down_revision = '20261019_03'
+branch_labels = None
+depends_on = None
+
+
+_LINK_COLUMNS = [
+    sa.Column('user_id', sa.String(64), nullable=True),
+    sa.Column('scope', sa.String(1024), nullable=True),
+    sa.Column('token_expiry', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('sync_token', sa.String(1024), nullable=True),
+    sa.Column('channel_id', sa.String(255), nullable=True),
+    sa.Column('resource_id', sa.String(255), nullable=True),
+    sa.Column('channel_expiry', sa.DateTime(timezone=True), nullable=True),
+]
+
+
+def upgrade() -> None:
+    # Columns already written by core/services/sync_gcal.py
+    for col in _LINK_COLUMNS:
+        try:
+            op.add_column('gcal_links', col)
+        except Exception:
+            pass
+    try:
+        op.create_index('ix_gcal_links_user_id', 'gcal_links', ['user_id'])
+    except Exception:
+        pass
+    op.alter_column('gcal_links', 'access_token', type_=sa.String(2048))
+    op.alter_column('gcal_links', 'refresh_token', type_=sa.String(512))
+
+    op.add_column('calendar_items', sa.Column(
+        'gcal_link_id', sa.Integer, sa.ForeignKey('gcal_links.id', ondelete='CASCADE'), nullable=True
+    ))
+    op.add_column('calendar_items', sa.Column('gcal_event_id', sa.String(1024), nullable=True))
+    op.add_column('calendar_items', sa.Column('gcal_etag', sa.String(255), nullable=True))
+    op.create_unique_constraint(
+        'uq_calendar_items_gcal_event', 'calendar_items', ['gcal_link_id', 'gcal_event_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_calendar_items_gcal_event', 'calendar_items', type_='unique')
+    op.drop_column('calendar_items', 'gcal_etag')
+    op.drop_column('calendar_items', 'gcal_event_id')
+    op.drop_column('calendar_items', 'gcal_link_id')
+    try:
+        op.drop_index('ix_gcal_links_user_id', table_name='gcal_links')
+    except Exception:
+        pass
+    for col in reversed(_LINK_COLUMNS):
+        op.drop_column('gcal_links', col.name)
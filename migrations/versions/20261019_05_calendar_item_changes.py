@@ -0,0 +1,44 @@
+"""calendar_item_changes: outbound journal for Google Calendar push
+
+Revision ID: 20261019_05
+Revises: 20261019_04
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_05'
+down_revision = '20261019_04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'calendar_item_changes',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('item_id', sa.Integer, nullable=True),
+        sa.Column('link_id', sa.Integer, sa.ForeignKey('gcal_links.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('event_id', sa.String(1024), nullable=False),
+        sa.Column('op', sa.String(16), nullable=False),
+        sa.Column('payload', sa.JSON, nullable=True),
+        sa.Column('etag', sa.String(255), nullable=True),
+        sa.Column('status', sa.String(16), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        'ix_calendar_item_changes_pending',
+        'calendar_item_changes',
+        ['status', 'next_attempt_at'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_calendar_item_changes_pending', table_name='calendar_item_changes')
+    op.drop_table('calendar_item_changes')
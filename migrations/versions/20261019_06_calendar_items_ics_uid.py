@@ -0,0 +1,28 @@
+"""calendar_items.ics_uid for deduplicated .ics import
+
+Revision ID: 20261019_06
+Revises: 20261019_05
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_06'
+down_revision = '20261019_05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('calendar_items', sa.Column('ics_uid', sa.String(255), nullable=True))
+    op.create_unique_constraint(
+        'uq_calendar_items_ics_uid', 'calendar_items', ['owner_id', 'ics_uid']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_calendar_items_ics_uid', 'calendar_items', type_='unique')
+    op.drop_column('calendar_items', 'ics_uid')
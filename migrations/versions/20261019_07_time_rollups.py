@@ -0,0 +1,41 @@
+"""time_rollups: tracked seconds per owner, day and lineage
+
+Revision ID: 20261019_07
+Revises: 20261019_06
+Create Date: 2026-10-19
+
+Filled by ``python scripts/rebuild_time_rollups.py`` after upgrading.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_07'
+down_revision = '20261019_06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'time_rollups',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('owner_id', sa.BigInteger, sa.ForeignKey('users_tg.telegram_id'), nullable=False),
+        sa.Column('day', sa.Date, nullable=False),
+        sa.Column('area_id', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('project_id', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('task_id', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('activity_type', sa.String(16), nullable=False, server_default='work'),
+        sa.Column('billable', sa.Boolean, nullable=False, server_default=sa.true()),
+        sa.Column('seconds', sa.BigInteger, nullable=False, server_default='0'),
+        sa.UniqueConstraint(
+            'owner_id', 'day', 'area_id', 'project_id', 'task_id', 'activity_type', 'billable',
+            name='uq_time_rollups_key',
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('time_rollups')
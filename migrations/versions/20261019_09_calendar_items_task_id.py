@@ -0,0 +1,29 @@
+"""calendar_items.task_id for blocks created by the planner
+
+Revision ID: 20261019_09
+Revises: 20261019_08
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_09'
+down_revision = '20261019_08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'calendar_items',
+        sa.Column('task_id', sa.Integer(), sa.ForeignKey('tasks.id', ondelete='SET NULL'), nullable=True),
+    )
+    op.create_index('ix_calendar_items_task_id', 'calendar_items', ['task_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_calendar_items_task_id', table_name='calendar_items')
+    op.drop_column('calendar_items', 'task_id')
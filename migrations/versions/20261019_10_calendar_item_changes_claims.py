@@ -0,0 +1,28 @@
+"""calendar_item_changes.claimed_by/claimed_until: push worker leases
+
+Revision ID: 20261019_10
+Revises: 20261019_09
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_10'
+down_revision = '20261019_09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('calendar_item_changes', sa.Column('claimed_by', sa.String(32), nullable=True))
+    op.add_column(
+        'calendar_item_changes', sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('calendar_item_changes', 'claimed_until')
+    op.drop_column('calendar_item_changes', 'claimed_by')
@@ -0,0 +1,61 @@
+"""sync_changes: commit-ordered change log replaces sync_tombstones
+
+Revision ID: 20261019_11
+Revises: 20261019_10
+Create Date: 2026-10-19
+
+Delta sync reads ``sync_changes`` instead of ``updated_at``, so the
+``(owner_id, updated_at)`` indexes added for it are dropped. Clients
+holding an old time-based cursor get a full snapshot once.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_11'
+down_revision = '20261019_10'
+branch_labels = None
+depends_on = None
+
+SYNCED = (
+    'tasks', 'notes', 'reminders', 'calendar_items',
+    'time_entries', 'habits', 'areas', 'projects',
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sync_changes',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('owner_id', sa.BigInteger, nullable=False),
+        sa.Column('entity', sa.String(32), nullable=False),
+        sa.Column('entity_id', sa.Integer, nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        'ix_sync_changes_owner_entity', 'sync_changes', ['owner_id', 'entity', 'id']
+    )
+    op.drop_index('ix_sync_tombstones_owner_deleted', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    for table in SYNCED:
+        op.drop_index(f'ix_{table}_owner_updated', table_name=table)
+
+
+def downgrade() -> None:
+    for table in SYNCED:
+        op.create_index(f'ix_{table}_owner_updated', table, ['owner_id', 'updated_at'])
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('owner_id', sa.BigInteger, nullable=False),
+        sa.Column('entity', sa.String(32), nullable=False),
+        sa.Column('entity_id', sa.Integer, nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        'ix_sync_tombstones_owner_deleted', 'sync_tombstones', ['owner_id', 'deleted_at']
+    )
+    op.drop_index('ix_sync_changes_owner_entity', table_name='sync_changes')
+    op.drop_table('sync_changes')
@@ -0,0 +1,307 @@
+"""Benchmark bot update processing: middleware, routers and services.
+
+Usage: python scripts/bench_bot.py [--updates 2000] [--users 50] [--groups 5]
+       [--concurrency 8] [--db-url sqlite+aiosqlite:///:memory:] [--json]
+       [--log-level WARNING]
+
+Synthetic ``Message``/``CallbackQuery`` updates (commands, FSM dialogs,
+group messages) go through ``dp.feed_update`` of the real dispatcher.
+The Bot session is stubbed, so no request leaves the process; the
+database is seeded from scratch (pass a throwaway Postgres URL to
+measure against Postgres). Reports updates/s, p50/p99 latency per
+update, SQL statements per update and the number of ERROR log records
+(``LoggerMiddleware`` turns handler exceptions into those).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("BOT_USERNAME", "benchbot")
+
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.types import Chat, Message, Update  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from base import Base  # noqa: E402
+from bot.main import setup_dispatcher  # noqa: E402
+from core import db  # noqa: E402
+from core.models import Group, GroupType, Habit, TgUser, UserGroup  # noqa: E402
+
+USER_BASE = 10_000
+GROUP_BASE = -1_000_000
+
+# (weight, messages) per private-chat scenario; FSM dialogs are several messages
+PRIVATE_SCENARIOS = [
+    (6, ["/start"]),
+    (4, ["/contact"]),
+    (4, ["/habit_list"]),
+    (3, ["/note bench note"]),
+    (2, ["/habit_add", "Read", "daily"]),
+    (2, ["/setemail", "bench@example.com"]),
+    (1, ["/cancel"]),
+    (2, ["hello"]),
+]
+GROUP_SCENARIOS = [(3, ["/group"]), (2, ["just chatting"])]
+
+
+class StubSession(BaseSession):
+    """Answers every Bot API call locally and counts them by method."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: Counter = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[method.__api_method__] += 1
+        if method.__returning__ is Message:
+            self._message_id += 1
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(),
+                chat=Chat(id=int(getattr(method, "chat_id", 0) or 0), type="private"),
+                text=getattr(method, "text", None),
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs):  # pragma: no cover - unused
+        raise NotImplementedError
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def _sender(user_id: int) -> Dict[str, Any]:
+    return {
+        "id": user_id,
+        "is_bot": False,
+        "first_name": f"User{user_id}",
+        "username": f"bench{user_id}",
+        "language_code": "ru",
+    }
+
+
+def _message(update_id: int, user_id: int, chat: Dict[str, Any], text: str) -> Dict[str, Any]:
+    msg: Dict[str, Any] = {
+        "message_id": update_id,
+        "date": 1_700_000_000 + update_id,
+        "chat": chat,
+        "from": _sender(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": msg}
+
+
+def build(n_updates: int, users: int = 50, groups: int = 5, seed: int = 42) -> List[Dict[str, Any]]:
+    """Raw updates in arrival order; messages of one dialog keep their order."""
+
+    rnd = random.Random(seed)
+    chats = [("private", USER_BASE + u) for u in range(users)]
+    chats += [("group", GROUP_BASE - g) for g in range(groups)]
+    pending: Dict[int, List[str]] = {}  # rest of the dialog running in a chat
+    updates: List[Dict[str, Any]] = []
+    while len(updates) < n_updates:
+        kind, chat_id = rnd.choice(chats)
+        update_id = len(updates) + 1
+        if kind == "private" and rnd.random() < 0.05:
+            updates.append(
+                {
+                    "update_id": update_id,
+                    "callback_query": {
+                        "id": str(update_id),
+                        "from": _sender(chat_id),
+                        "chat_instance": str(chat_id),
+                        "data": "bench",
+                    },
+                }
+            )
+            continue
+        queue = pending.get(chat_id)
+        if not queue:
+            scenarios = PRIVATE_SCENARIOS if kind == "private" else GROUP_SCENARIOS
+            weights = [w for w, _ in scenarios]
+            queue = pending[chat_id] = list(rnd.choices(scenarios, weights)[0][1])
+        text = queue.pop(0)
+        if kind == "private":
+            chat = {"id": chat_id, "type": "private", "first_name": f"User{chat_id}"}
+            user_id = chat_id
+        else:
+            chat = {"id": chat_id, "type": "group", "title": f"Bench {-chat_id}"}
+            user_id = USER_BASE + rnd.randrange(users)
+        updates.append(_message(update_id, user_id, chat, text))
+    return updates
+
+
+async def seed(session_factory, users: int, groups: int) -> None:
+    async with session_factory() as session:
+        for u in range(users):
+            tid = USER_BASE + u
+            session.add(TgUser(telegram_id=tid, username=f"bench{tid}", first_name=f"User{tid}"))
+        await session.flush()
+        for g in range(groups):
+            gid = GROUP_BASE - g
+            session.add(Group(telegram_id=gid, title=f"Bench {g}", type=GroupType.group, owner_id=USER_BASE))
+        await session.flush()
+        for g in range(groups):
+            for u in range(0, users, 2):
+                session.add(UserGroup(user_id=USER_BASE + u, group_id=GROUP_BASE - g))
+        for u in range(users):
+            for h in range(3):
+                session.add(Habit(owner_id=USER_BASE + u, name=f"habit {h}", frequency="daily", progress={}))
+        await session.commit()
+
+
+@dataclass
+class BenchResult:
+    updates: int
+    seconds: float
+    throughput: float  # updates per second
+    p50_ms: float
+    p99_ms: float
+    queries: int
+    queries_per_update: float
+    api_calls: int
+    errors: int
+
+
+class _ErrorCounter(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run(
+    updates: List[Dict[str, Any]],
+    *,
+    users: int = 50,
+    groups: int = 5,
+    concurrency: int = 8,
+    db_url: str = "sqlite+aiosqlite:///:memory:",
+) -> BenchResult:
+    """Seed a fresh database and push ``updates`` through the dispatcher."""
+
+    engine = create_async_engine(db_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    saved = db.engine, db.async_session
+    db.engine = engine
+    db.async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    session = StubSession()
+    bot_session = db.bot.session
+    db.bot.session = session
+    errors = _ErrorCounter()
+    logging.getLogger().addHandler(errors)
+    queries = 0
+
+    def _count(*args) -> None:
+        nonlocal queries
+        queries += 1
+
+    try:
+        await seed(db.async_session, users, groups)
+        setup_dispatcher()
+        parsed = [Update.model_validate(raw, context={"bot": db.bot}) for raw in updates]
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        latencies: List[float] = []
+        slots = asyncio.Semaphore(concurrency)
+
+        async def feed(update: Update) -> None:
+            try:
+                t0 = time.perf_counter()
+                await db.dp.feed_update(db.bot, update)
+                latencies.append(time.perf_counter() - t0)
+            finally:
+                slots.release()
+
+        started = time.perf_counter()
+        tasks = []
+        for update in parsed:
+            await slots.acquire()  # tasks start in arrival order, like the webhook queue
+            tasks.append(asyncio.create_task(feed(update)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    finally:
+        if event.contains(engine.sync_engine, "before_cursor_execute", _count):
+            event.remove(engine.sync_engine, "before_cursor_execute", _count)
+        logging.getLogger().removeHandler(errors)
+        db.bot.session = bot_session
+        db.engine, db.async_session = saved
+        await engine.dispose()
+
+    n = len(parsed)
+    return BenchResult(
+        updates=n,
+        seconds=round(elapsed, 3),
+        throughput=round(n / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(_percentile(latencies, 0.5) * 1000, 2),
+        p99_ms=round(_percentile(latencies, 0.99) * 1000, 2),
+        queries=queries,
+        queries_per_update=round(queries / n, 2) if n else 0.0,
+        api_calls=sum(session.calls.values()),
+        errors=errors.count,
+    )
+
+
+def main(argv: List[str] | None = None) -> BenchResult:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--db-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--log-level", default="WARNING", help="root log level while running")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    updates = build(args.updates, args.users, args.groups, args.seed)
+    result = asyncio.run(
+        run(
+            updates,
+            users=args.users,
+            groups=args.groups,
+            concurrency=args.concurrency,
+            db_url=args.db_url,
+        )
+    )
+    if args.json:
+        print(json.dumps(asdict(result)))
+    else:
+        print(
+            f"updates={result.updates} concurrency={args.concurrency} "
+            f"time={result.seconds:.2f} s throughput={result.throughput:.0f}/s "
+            f"p50={result.p50_ms:.1f} ms p99={result.p99_ms:.1f} ms "
+            f"queries/update={result.queries_per_update:.2f} "
+            f"api_calls={result.api_calls} errors={result.errors}"
+        )
+    return result
+
+
+if __name__ == "__main__":
+    main()
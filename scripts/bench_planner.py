@@ -0,0 +1,134 @@
+"""Benchmark the time-blocking planner on synthetic data.
+
+Usage: python scripts/bench_planner.py [tasks] [days]
+
+Times the pure ``plan()`` and then ``PlannerService.propose`` and
+``apply`` against an in-memory SQLite database with the same tasks and
+meetings; ``apply`` creates one calendar item per block through
+``CalendarItemRepository``, so its SQL statement count is reported too.
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import time as _time
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from base import Base  # noqa: E402
+from core.models import Area, CalendarEvent, Task  # noqa: E402
+from core.services.freebusy_service import Interval, IntervalTree  # noqa: E402
+from core.services.planner_service import (  # noqa: E402
+    PlannerService,
+    PlanTask,
+    plan,
+    working_slots,
+)
+
+
+def build(n_tasks: int, days: int, seed: int = 42):
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 6, 0, 0)
+    busy = []
+    for d in range(days):
+        day = start + timedelta(days=d)
+        for _ in range(6):  # a few meetings a day
+            s = day + timedelta(hours=rnd.randint(8, 17), minutes=rnd.choice([0, 30]))
+            busy.append(Interval(s, s + timedelta(minutes=rnd.choice([30, 60, 90])), "event", len(busy)))
+    tasks = [
+        PlanTask(
+            id=i,
+            title=f"Task {i}",
+            minutes=rnd.choice([15, 30, 45, 60, 90]),
+            cost=rnd.randint(1, 5),
+            priority=rnd.random(),
+            due=start + timedelta(days=rnd.randint(1, days + 3)) if rnd.random() < 0.6 else None,
+        )
+        for i in range(n_tasks)
+    ]
+    slots = working_slots(IntervalTree(busy), start, days, time(9, 0), time(18, 0))
+    return tasks, slots
+
+
+async def bench_service(n_tasks: int, days: int, seed: int = 42) -> dict:
+    """Seed SQLite like :func:`build` and time ``propose`` and ``apply``."""
+
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 6, 0, 0)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    statements = []
+    async with sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)() as session:
+        area = Area(owner_id=1, name="Work", mp_path="work.")
+        session.add(area)
+        await session.flush()
+        for d in range(days):
+            day = start + timedelta(days=d)
+            for _ in range(6):
+                s = day + timedelta(hours=rnd.randint(8, 17), minutes=rnd.choice([0, 30]))
+                end = s + timedelta(minutes=rnd.choice([30, 60, 90]))
+                session.add(CalendarEvent(owner_id=1, title="Meeting", start_at=s, end_at=end))
+        session.add_all(
+            Task(
+                owner_id=1,
+                title=f"Task {i}",
+                area_id=area.id,
+                estimate_minutes=rnd.choice([15, 30, 45, 60, 90]),
+                cognitive_cost=rnd.randint(1, 5),
+                neural_priority=rnd.random(),
+            )
+            for i in range(n_tasks)
+        )
+        await session.commit()
+
+        service = PlannerService(session)
+        t0 = _time.perf_counter()
+        result = await service.propose(1, days=days, start=start, daily_budget=40)
+        t1 = _time.perf_counter()
+        event.listen(
+            engine.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        created = await service.apply(1, result)
+        await session.commit()
+        t2 = _time.perf_counter()
+    await engine.dispose()
+    return {
+        "propose_ms": (t1 - t0) * 1000,
+        "apply_ms": (t2 - t1) * 1000,
+        "created": created,
+        "queries": len(statements),
+    }
+
+
+def main() -> None:
+    n_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    tasks, slots = build(n_tasks, days)
+    t0 = _time.perf_counter()
+    result = plan(tasks, slots, daily_budget=40)
+    elapsed = _time.perf_counter() - t0
+    print(
+        f"tasks={n_tasks} days={days} slots={len(slots)} "
+        f"placed={len(result.placements)} unplaced={len(result.unplaced)} "
+        f"time={elapsed * 1000:.1f} ms"
+    )
+    logging.getLogger().setLevel(logging.WARNING)  # SQL and aiosqlite debug noise
+    service = asyncio.run(bench_service(n_tasks, days))
+    print(
+        f"propose={service['propose_ms']:.1f} ms apply={service['apply_ms']:.1f} ms "
+        f"created={service['created']} queries={service['queries']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Export a user's records as CSV or NDJSON.
+
+Usage: python scripts/export_data.py KIND --owner TELEGRAM_ID
+       [--format ndjson|csv] [--gzip] [--output FILE] [--batch-size 1000]
+
+KIND is one of time_entries, tasks, notes, calendar_items, habits.
+Rows are streamed from the database and written chunk by chunk, so
+memory does not grow with the export; without ``--output`` the data
+goes to stdout.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.services.export_service import EXPORTS, ExportService  # noqa: E402
+
+
+async def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("--owner", type=int, required=True)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    service = ExportService(batch_size=args.batch_size)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async for chunk in service.stream(args.kind, args.owner, args.format, gzip=args.gzip):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+    stats = service.stats
+    print(
+        f"rows={stats.rows} bytes={stats.bytes} time={stats.seconds:.2f} s",
+        file=sys.stderr,
+    )
+    return stats.rows
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
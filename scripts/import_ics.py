@@ -0,0 +1,70 @@
+"""Import an .ics file into calendar items of a Telegram user.
+
+Usage: python scripts/import_ics.py FILE --owner TELEGRAM_ID (--area ID | --project ID)
+       [--tz Europe/Moscow] [--batch-size 500]
+
+The file is read in chunks and events are upserted by UID, so a large
+calendar imports in constant memory and re-running updates items.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.services.ics_import import IcsImportService, ImportResult  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def _read(path: Path):
+    with path.open("rb") as fh:
+        while chunk := fh.read(CHUNK):
+            yield chunk
+
+
+async def main(argv: list[str] | None = None) -> ImportResult:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--owner", type=int, required=True)
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--area", type=int)
+    scope.add_argument("--project", type=int)
+    parser.add_argument("--tz", default="UTC", help="zone for floating times")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+
+    def progress(r: ImportResult) -> None:
+        rate = r.parsed / max(time.perf_counter() - t0, 1e-9)
+        print(
+            f"\rparsed={r.parsed} created={r.created} updated={r.updated} "
+            f"skipped={r.skipped} ({rate:.0f} ev/s)",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    async with IcsImportService(batch_size=args.batch_size) as svc:
+        result = await svc.import_stream(
+            _read(args.file),
+            owner_id=args.owner,
+            area_id=args.area,
+            project_id=args.project,
+            default_tz=args.tz,
+            on_progress=progress,
+        )
+    print(file=sys.stderr)
+    print(
+        f"done in {time.perf_counter() - t0:.1f}s: parsed={result.parsed} "
+        f"created={result.created} updated={result.updated} skipped={result.skipped}"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Import finished time entries of a Telegram user from CSV or NDJSON.
+
+Usage: python scripts/import_time_entries.py FILE --owner TELEGRAM_ID
+       [--format csv|ndjson] [--batch-size 1000]
+
+Columns/keys: start_time, end_time (ISO 8601, UTC unless an offset is
+given), description, task_id, project_id, area_id, activity_type,
+billable. The file is read in chunks; rows that are invalid or overlap
+existing entries are skipped and reported with their line number.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.services.time_import import TimeImportResult, TimeImportService  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def _read(path: Path):
+    with path.open("rb") as fh:
+        while chunk := fh.read(CHUNK):
+            yield chunk
+
+
+async def main(argv: list[str] | None = None) -> TimeImportResult:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--owner", type=int, required=True)
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+    fmt = args.format or ("ndjson" if args.file.suffix in (".ndjson", ".jsonl") else "csv")
+
+    t0 = time.perf_counter()
+
+    def progress(r: TimeImportResult) -> None:
+        rate = r.rows / max(time.perf_counter() - t0, 1e-9)
+        print(
+            f"\rrows={r.rows} created={r.created} invalid={r.invalid} "
+            f"overlaps={r.overlaps} ({rate:.0f} rows/s)",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    async with TimeImportService(batch_size=args.batch_size) as svc:
+        result = await svc.import_stream(_read(args.file), owner_id=args.owner, fmt=fmt, on_progress=progress)
+    print(file=sys.stderr)
+    for line, reason in result.errors:
+        print(f"line {line}: {reason}", file=sys.stderr)
+    print(
+        f"done in {time.perf_counter() - t0:.1f}s: rows={result.rows} created={result.created} "
+        f"invalid={result.invalid} overlaps={result.overlaps}"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
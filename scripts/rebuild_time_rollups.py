@@ -0,0 +1,34 @@
+"""Recompute daily time rollups from time entries.
+
+Usage: python scripts/rebuild_time_rollups.py [--owner TELEGRAM_ID] [--batch-size 1000]
+
+Needed once after the ``time_rollups`` migration and whenever entries
+were changed outside :class:`TimeService` (e.g. by hand in SQL).
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.services.time_rollup import TimeRollupService  # noqa: E402
+
+
+async def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--owner", type=int, help="only this owner (default: everyone)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    async with TimeRollupService() as service:
+        rows = await service.rebuild(args.owner, batch_size=args.batch_size)
+    print(f"rollup rows={rows} time={time.perf_counter() - t0:.2f} s")
+    return rows
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
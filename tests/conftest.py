@@ -9,3 +9,15 @@ if str(ROOT) not in sys.path:
 # Ensure required env vars for tests
 os.environ.setdefault("TELEGRAM_BOT_TOKEN", "TEST_TOKEN")
 os.environ.setdefault("BOT_USERNAME", "testbot")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _reset_timer_registry():
+    """Every test starts with a fresh database, so cached timers are stale."""
+    from core.services.timer_registry import timer_registry
+
+    timer_registry.clear()
+    yield
+    timer_registry.clear()
@@ -0,0 +1,96 @@
+"""In-process stand-ins for external services used by the tests."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict
+
+
+class FakeRedis:
+    """In-process stand-in for ``redis.asyncio.Redis`` (FSM and timer-registry subset)."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._data: Dict[str, tuple[Any, float | None]] = {}
+
+    def _expires(self, ex) -> float | None:
+        if ex is None:
+            return None
+        seconds = ex.total_seconds() if hasattr(ex, "total_seconds") else ex
+        return self._clock() + seconds
+
+    def _alive(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= self._clock():
+            del self._data[key]
+            return None
+        return item
+
+    async def get(self, key: str):
+        item = self._alive(key)
+        return item[0] if item else None
+
+    async def getex(self, key: str, ex=None):
+        item = self._alive(key)
+        if item is None:
+            return None
+        if ex is not None:
+            self._data[key] = (item[0], self._expires(ex))
+        return item[0]
+
+    async def set(self, key: str, value, ex=None) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        self._data[key] = (value, self._expires(ex))
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(k, None) is not None for k in keys)
+
+    async def incr(self, key: str) -> int:
+        item = self._alive(key)
+        value = int(item[0]) + 1 if item else 1
+        self._data[key] = (str(value).encode(), item[1] if item else None)
+        return value
+
+    async def expire(self, key: str, ex) -> bool:
+        item = self._alive(key)
+        if item is None:
+            return False
+        self._data[key] = (item[0], self._expires(ex))
+        return True
+
+    async def hset(self, key: str, field=None, value=None, mapping=None) -> int:
+        item = self._alive(key)
+        hash_ = dict(item[0]) if item else {}
+        pairs = dict(mapping or {})
+        if field is not None:
+            pairs[field] = value
+        added = sum(f.encode() not in hash_ for f in pairs)
+        hash_.update({f.encode(): v.encode() if isinstance(v, str) else v for f, v in pairs.items()})
+        self._data[key] = (hash_, item[1] if item else None)
+        return added
+
+    async def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        item = self._alive(key)
+        return dict(item[0]) if item else {}
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        item = self._alive(key)
+        if item is None:
+            return 0
+        removed = sum(item[0].pop(f.encode(), None) is not None for f in fields)
+        if not item[0]:
+            del self._data[key]
+        return removed
+
+    async def ttl(self, key: str) -> int:
+        item = self._alive(key)
+        if item is None:
+            return -2
+        return -1 if item[1] is None else int(item[1] - self._clock())
+
+    async def aclose(self, close_connection_pool: bool = True) -> None:
+        self._data.clear()
@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import decorators
+from base import Base
+from core import db
+from core.models import Group, TgUser, UserGroup, UserRole
+from core.services.access_cache import MISSING, AccessCache, access_cache
+from core.services.telegram_user_service import TelegramUserService
+
+
+@pytest_asyncio.fixture
+async def queries(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(db, "engine", engine)
+    monkeypatch.setattr(
+        db, "async_session", sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    )
+    monkeypatch.setenv("ADMIN_CHAT_ID", "0")
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    access_cache.clear()
+    yield statements
+    access_cache.clear()
+    await engine.dispose()
+
+
+def _message(user_id: int = 1, chat_id: int = -100):
+    return SimpleNamespace(
+        from_user=SimpleNamespace(
+            id=user_id,
+            username=f"user{user_id}",
+            first_name="First",
+            last_name=None,
+            language_code="en",
+            is_premium=False,
+        ),
+        chat=SimpleNamespace(id=chat_id, title="team", type="group"),
+        answer=AsyncMock(),
+    )
+
+
+def test_cache_expires_and_evicts():
+    now = [0.0]
+    cache = AccessCache(ttl=10, role_ttl=10, max_entries=2, clock=lambda: now[0])
+    cache.set_role(1, "admin")
+    cache.set_member(1, -5)
+    assert cache.role(1) == "admin" and cache.is_member(1, -5)
+    cache.set_role(2, "single")  # evicts the oldest entry
+    assert cache.role(1) is MISSING
+    now[0] = 11
+    assert cache.role(2) is MISSING and not cache.is_member(1, -5)
+
+
+def test_roles_expire_before_memberships():
+    # roles change in another process; only the TTL bounds a stale one
+    now = [0.0]
+    cache = AccessCache(ttl=300, role_ttl=30, clock=lambda: now[0])
+    cache.set_role(1, "admin")
+    cache.set_member(1, -5)
+    now[0] = 31
+    assert cache.role(1) is MISSING
+    assert cache.is_member(1, -5)
+
+
+@pytest.mark.asyncio
+async def test_repeat_commands_skip_database(queries):
+    calls = []
+
+    async def handler(message):
+        calls.append(message.from_user.id)
+
+    guarded = decorators.group_required(decorators.role_required(UserRole.single)(handler))
+    await guarded(_message())
+    assert queries  # first message registers user, group and membership
+    queries.clear()
+    for _ in range(3):
+        await guarded(_message())
+    assert queries == [] and calls == [1, 1, 1, 1]
+
+    async with db.async_session() as session:
+        group = (await session.execute(select(Group))).scalar_one()
+        assert group.participants_count == 1
+        members = await session.scalar(select(func.count()).select_from(UserGroup))
+        assert members == 1
+
+
+@pytest.mark.asyncio
+async def test_role_change_invalidates_cache(queries):
+    calls = []
+
+    async def handler(message):
+        calls.append(message.from_user.id)
+
+    admin_only = decorators.role_required(UserRole.admin)(handler)
+    message = _message(chat_id=7)
+    await admin_only(message)
+    assert calls == [] and access_cache.role(1) == UserRole.single.name
+
+    async with TelegramUserService() as service:
+        assert await service.update_user_role(1, UserRole.admin)
+    assert access_cache.role(1) is MISSING
+    await admin_only(message)
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_upserts_are_idempotent(queries):
+    async with TelegramUserService() as service:
+        assert await service.upsert_user(5, first_name="A") == UserRole.single.name
+        assert await service.upsert_user(5, first_name="B") == UserRole.single.name
+        assert await service.ensure_group_member(5, -9, title="g")
+        assert not await service.ensure_group_member(5, -9, title="g")
+    async with db.async_session() as session:
+        assert await session.scalar(select(func.count()).select_from(TgUser)) == 1
+        group = (await session.execute(select(Group))).scalar_one()
+        assert (group.title, group.participants_count) == ("g", 1)
+
+
+def test_group_required_is_a_plain_decorator():
+    async def handler(message):
+        return "ok"
+
+    wrapped = decorators.group_required(handler)
+    assert asyncio.iscoroutinefunction(wrapped) and wrapped.__name__ == "handler"
@@ -0,0 +1,31 @@
+import pytest
+
+import bot.main as bot_main
+from scripts.bench_bot import build, run
+
+
+def test_build_keeps_dialog_order():
+    updates = build(300, users=5, groups=2, seed=1)
+    assert [u["update_id"] for u in updates] == list(range(1, 301))
+    assert updates == build(300, users=5, groups=2, seed=1)
+    by_chat = {}
+    for u in updates:
+        if "message" in u:
+            by_chat.setdefault(u["message"]["chat"]["id"], []).append(u["message"]["text"])
+    assert any(chat < 0 for chat in by_chat)  # group traffic
+    for texts in by_chat.values():
+        for i, text in enumerate(texts[:-2]):
+            if text == "/habit_add":
+                assert texts[i + 1 : i + 3] == ["Read", "daily"]
+
+
+@pytest.mark.asyncio
+async def test_bench_runs_updates_through_dispatcher(monkeypatch):
+    monkeypatch.setenv("ADMIN_CHAT_ID", "0")
+    result = await run(build(150, users=10, groups=0), users=10, groups=0, concurrency=4)
+    assert result.updates == 150 and result.errors == 0
+    assert result.api_calls >= 100  # most updates answer
+    assert result.queries_per_update > 0
+    assert 0 < result.p50_ms <= result.p99_ms
+    assert result.throughput > 0
+    assert bot_main._configured
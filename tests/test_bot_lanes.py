@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, Update
+
+from bot.lanes import ChatLaneMiddleware, install
+
+
+def _update(update_id: int, chat_id: int, text: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1735689600,
+            "chat": {"id": chat_id, "type": "private", "first_name": "u"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "u"},
+            "text": text,
+        },
+    })
+
+
+def _dispatcher(lanes: ChatLaneMiddleware, delays: dict[int, float], log: list, peak: list):
+    router = Router()
+    active = []
+
+    @router.message()
+    async def handle(message: Message):
+        active.append(1)
+        peak.append(len(active))
+        log.append(("start", message.chat.id, message.text))
+        await asyncio.sleep(delays.get(message.chat.id, 0))
+        log.append(("end", message.chat.id, message.text))
+        active.pop()
+
+    dp = Dispatcher()
+    install(dp, lanes)
+    dp.include_router(router)
+    return dp
+
+
+async def _feed_as_polling(dp, updates):
+    """Each update in its own task, as aiogram polling does."""
+
+    bot = Bot("123456:" + "A" * 35)
+    await asyncio.gather(*(asyncio.create_task(dp.feed_update(bot, u)) for u in updates))
+
+
+@pytest.mark.asyncio
+async def test_serial_per_chat_parallel_across_chats():
+    lanes = ChatLaneMiddleware(max_concurrency=8)
+    log, peak = [], []
+    dp = _dispatcher(lanes, {1: 0.03}, log, peak)
+    updates = [_update(i, 1, f"slow{i}") for i in range(3)]
+    updates += [_update(10 + i, 2, f"fast{i}") for i in range(3)]
+    await _feed_as_polling(dp, updates)
+
+    slow = [(kind, text) for kind, chat, text in log if chat == 1]
+    assert slow == [
+        ("start", "slow0"), ("end", "slow0"),
+        ("start", "slow1"), ("end", "slow1"),
+        ("start", "slow2"), ("end", "slow2"),
+    ]
+    fast_done = max(i for i, e in enumerate(log) if e[:2] == ("end", 2))
+    assert fast_done < log.index(("end", 1, "slow0"))  # not stuck behind chat 1
+    snap = lanes.snapshot()
+    assert snap["processed"] == 6 and snap["lanes"] == 0 and snap["max_lane_depth"] == 3
+    assert snap["handler_p99_ms"] >= 30
+
+
+@pytest.mark.asyncio
+async def test_global_limit_and_lane_bound():
+    lanes = ChatLaneMiddleware(max_concurrency=2, lane_size=2)
+    log, peak = [], []
+    dp = _dispatcher(lanes, {c: 0.01 for c in range(10)}, log, peak)
+    updates = [_update(c, c, "hi") for c in range(6)]  # 6 chats
+    updates += [_update(100 + i, 0, f"flood{i}") for i in range(3)]  # chat 0: 4 queued
+    await _feed_as_polling(dp, updates)
+    assert max(peak) == 2
+    assert lanes.stats["dropped"] == 2
+    assert [t for kind, chat, t in log if chat == 0 and kind == "start"] == ["hi", "flood0"]
+
+
+class Flow(StatesGroup):
+    step = State()
+
+
+@pytest.mark.asyncio
+async def test_fsm_state_is_read_inside_the_lane():
+    router = Router()
+    log = []
+
+    @router.message(Command("start"))
+    async def start(message: Message, state: FSMContext):
+        await asyncio.sleep(0.02)  # the next message arrives meanwhile
+        await state.set_state(Flow.step)
+        log.append("start")
+
+    @router.message(StateFilter(Flow.step))
+    async def step(message: Message, state: FSMContext):
+        await state.clear()
+        log.append("step-in-state")
+
+    @router.message()
+    async def fallback(message: Message):
+        log.append("fallback")
+
+    dp = Dispatcher()
+    install(dp, ChatLaneMiddleware(max_concurrency=8))
+    dp.include_router(router)
+    await _feed_as_polling(dp, [_update(1, 1, "/start"), _update(2, 1, "answer")])
+    assert log == ["start", "step-in-state"]
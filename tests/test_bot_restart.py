@@ -20,14 +20,21 @@ def test_bot_reports_restart(monkeypatch):
     monkeypatch.setattr(bot_main, "TelegramUserService", lambda: fake_service)
 
     fake_dp = SimpleNamespace(
-        message=SimpleNamespace(middleware=lambda *a, **k: None),
-        callback_query=SimpleNamespace(middleware=lambda *a, **k: None),
+        update=SimpleNamespace(outer_middleware=lambda *a, **k: None),
+        message=SimpleNamespace(
+            middleware=lambda *a, **k: None, outer_middleware=lambda *a, **k: None
+        ),
+        callback_query=SimpleNamespace(
+            middleware=lambda *a, **k: None, outer_middleware=lambda *a, **k: None
+        ),
         include_router=lambda *a, **k: None,
         start_polling=AsyncMock(),
     )
     monkeypatch.setattr(bot_main, "dp", fake_dp)
+    monkeypatch.setattr(bot_main, "_configured", False)
     monkeypatch.setattr(bot_main, "bot", object())
     monkeypatch.setattr(bot_main, "LoggerMiddleware", lambda *a, **k: None)
+    monkeypatch.setattr(bot_main, "install_lanes", lambda *a, **k: None)
 
     asyncio.run(bot_main.main())
 
@@ -2,8 +2,18 @@ import asyncio
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
+import pytest
+
 import decorators
 from core.models import UserRole
+from core.services.access_cache import access_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_access_cache():
+    access_cache.clear()
+    yield
+    access_cache.clear()
 
 
 def make_message():
@@ -38,8 +48,8 @@ def test_role_required_allows(monkeypatch):
             pass
         async def get_log_settings(self):
             return SimpleNamespace(chat_id=42)
-        async def get_or_create_user(self, *args, **kwargs):
-            return SimpleNamespace(role=UserRole.admin.name), False
+        async def upsert_user(self, *args, **kwargs):
+            return UserRole.admin.name
 
     monkeypatch.setattr(decorators, 'TelegramUserService', lambda: FakeService())
 
@@ -69,8 +79,8 @@ def test_role_required_denies(monkeypatch):
             pass
         async def get_log_settings(self):
             return SimpleNamespace(chat_id=42)
-        async def get_or_create_user(self, *args, **kwargs):
-            return SimpleNamespace(role=UserRole.single.name), False
+        async def upsert_user(self, *args, **kwargs):
+            return UserRole.single.name
 
     monkeypatch.setattr(decorators, 'TelegramUserService', lambda: FakeService())
 
@@ -101,8 +111,8 @@ def test_role_required_allows_in_log_chat(monkeypatch):
             pass
         async def get_log_settings(self):
             return SimpleNamespace(chat_id=42)
-        async def get_or_create_user(self, *args, **kwargs):
-            return SimpleNamespace(role=UserRole.single.name), False
+        async def upsert_user(self, *args, **kwargs):
+            return UserRole.single.name
 
     monkeypatch.setattr(decorators, 'TelegramUserService', lambda: FakeService())
 
@@ -130,17 +140,15 @@ def test_group_required_adds_user(monkeypatch):
             return self
         async def __aexit__(self, exc_type, exc, tb):
             pass
-        async def get_or_create_group(self, *args, **kwargs):
-            return SimpleNamespace(), False
-        async def is_user_in_group(self, *args, **kwargs):
-            return False
-        async def add_user_to_group(self, *args, **kwargs):
-            return True, 'added'
+        async def upsert_user(self, *args, **kwargs):
+            return UserRole.single.name
+        async def ensure_group_member(self, *args, **kwargs):
+            return True
 
     monkeypatch.setattr(decorators, 'TelegramUserService', lambda: FakeService())
 
     async def run():
-        wrapped = await decorators.group_required(handler)
+        wrapped = decorators.group_required(handler)
         await wrapped(message)
 
     asyncio.run(run())
@@ -163,17 +171,15 @@ def test_group_required_add_user_fail(monkeypatch):
             return self
         async def __aexit__(self, exc_type, exc, tb):
             pass
-        async def get_or_create_group(self, *args, **kwargs):
-            return SimpleNamespace(), False
-        async def is_user_in_group(self, *args, **kwargs):
-            return False
-        async def add_user_to_group(self, *args, **kwargs):
-            return False, 'error'
+        async def upsert_user(self, *args, **kwargs):
+            return UserRole.single.name
+        async def ensure_group_member(self, *args, **kwargs):
+            raise RuntimeError('error')
 
     monkeypatch.setattr(decorators, 'TelegramUserService', lambda: FakeService())
 
     async def run():
-        wrapped = await decorators.group_required(handler)
+        wrapped = decorators.group_required(handler)
         await wrapped(message)
 
     asyncio.run(run())
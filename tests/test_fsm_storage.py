@@ -0,0 +1,91 @@
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.handlers.habit import HabitAddStates
+from core.fsm_storage import (
+    IdleTTLRedisStorage,
+    LRUMemoryStorage,
+    create_isolation,
+    create_storage,
+)
+from fakes import FakeRedis
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _key(chat_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=chat_id, user_id=chat_id)
+
+
+@pytest.mark.asyncio
+async def test_lru_storage_caps_and_expires():
+    clock = Clock()
+    storage = LRUMemoryStorage(max_keys=2, ttl=60, clock=clock)
+    assert await storage.get_state(_key(1)) is None
+    assert len(storage) == 0  # reads do not create records
+
+    await storage.set_state(_key(1), HabitAddStates.waiting_for_name)
+    await storage.set_data(_key(2), {"name": "run"})
+    await storage.get_state(_key(1))  # 1 is now most recent
+    await storage.set_data(_key(3), {"name": "read"})
+    assert len(storage) == 2 and storage.evictions == 1
+    assert await storage.get_data(_key(2)) == {}
+    assert await storage.get_state(_key(1)) == HabitAddStates.waiting_for_name.state
+
+    clock.now = 61
+    assert await storage.get_data(_key(3)) == {}
+    await storage.set_state(_key(1), None)
+    assert len(storage) == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_storage_caps_bytes():
+    storage = LRUMemoryStorage(max_keys=100, max_bytes=100, ttl=None)
+    for chat in range(5):
+        await storage.set_data(_key(chat), {"text": "x" * 30})
+    assert len(storage) == 2
+    assert await storage.get_data(_key(4)) == {"text": "x" * 30}
+
+
+@pytest.mark.asyncio
+async def test_redis_storage_ttl_restarts_on_activity():
+    clock = Clock()
+    redis = FakeRedis(clock)
+    storage = IdleTTLRedisStorage(redis, state_ttl=100, data_ttl=100)
+    ctx = FSMContext(storage=storage, key=_key(5))
+    await ctx.set_state(HabitAddStates.waiting_for_name)
+    await ctx.update_data(name="walk")
+
+    # another process sees the same flow
+    other = FSMContext(storage=IdleTTLRedisStorage(redis, state_ttl=100, data_ttl=100), key=_key(5))
+    clock.now = 90
+    assert await other.get_state() == HabitAddStates.waiting_for_name.state
+    assert await other.get_data() == {"name": "walk"}
+    clock.now = 180  # 90s since the last read: still alive
+    assert await ctx.get_state() == HabitAddStates.waiting_for_name.state
+    clock.now = 281
+    assert await ctx.get_state() is None
+
+
+def test_create_storage_from_env(monkeypatch):
+    monkeypatch.delenv("FSM_STORAGE", raising=False)
+    assert isinstance(create_storage(), MemoryStorage)
+    monkeypatch.setenv("FSM_STORAGE", "lru")
+    monkeypatch.setenv("FSM_LRU_MAX_KEYS", "7")
+    assert create_storage().max_keys == 7
+    monkeypatch.setenv("FSM_STORAGE", "redis")
+    monkeypatch.setenv("FSM_STATE_TTL", "600")
+    storage = create_storage()
+    assert isinstance(storage, IdleTTLRedisStorage) and storage.state_ttl == 600
+    assert create_isolation(storage) is not None
+    assert create_isolation(MemoryStorage()) is None
+    with pytest.raises(ValueError):
+        create_storage("disk")
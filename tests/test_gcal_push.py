@@ -0,0 +1,232 @@
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import CalendarItem, CalendarItemChange, GCalLink, TgUser
+from core.services.area_service import AreaService
+from core.services.gcal_push import GCalPushWorker, parse_http, split_batch
+from core.services.gcal_tokens import token_manager
+from core.services.para_repository import CalendarItemRepository
+from core.utils import utcnow
+
+
+class BatchStandIn:
+    """Google batch endpoint over an in-memory events store."""
+
+    def __init__(self) -> None:
+        self.events: dict[str, dict] = {}
+        self.batches: list[list[str]] = []
+        self.fail_once: set[str] = set()
+        self.app = FastAPI()
+        self.app.post("/batch/calendar/v3")(self.batch)
+
+    def _etag(self, event_id: str) -> str:
+        self.events[event_id]["version"] += 1
+        return f'"{event_id}-{self.events[event_id]["version"]}"'
+
+    def _handle(self, method: str, path: str, headers: dict, body: str):
+        tail = path.split("/events", 1)[1].strip("/")
+        if method == "POST":
+            data = json.loads(body)
+            eid = data["id"]
+            if eid in self.events:
+                return 409, {}
+            self.events[eid] = dict(data, version=0)
+        else:
+            eid = tail
+            if eid in self.fail_once:
+                self.fail_once.discard(eid)
+                return 503, {}
+            current = self.events.get(eid)
+            if current is None:
+                return 404, {}
+            if "if-match" in headers and headers["if-match"] != current["etag"]:
+                return 412, {}
+            if method == "DELETE":
+                del self.events[eid]
+                return 204, None
+            current.update(json.loads(body))
+        self.events[eid]["etag"] = self._etag(eid)
+        return 200, {"id": eid, "etag": self.events[eid]["etag"]}
+
+    async def batch(self, request: Request):
+        parts = split_batch(await request.body(), request.headers["content-type"])
+        self.batches.append([h["content-id"] for h, _ in parts])
+        out = []
+        for headers, message in parts:
+            start, inner_headers, body = parse_http(message)
+            method, path, _ = start.split(" ")
+            status, payload = self._handle(method, path, inner_headers, body)
+            cid = headers["content-id"].strip("<>")
+            out.append(
+                f"--resp\r\nContent-Type: application/http\r\nContent-ID: <response-{cid}>\r\n\r\n"
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload) if payload is not None else ''}\r\n"
+            )
+        return Response("".join(out) + "--resp--\r\n", media_type="multipart/mixed; boundary=resp")
+
+
+@pytest_asyncio.fixture
+async def setup():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    token_manager.clear()
+    async with async_session() as session:
+        session.add(TgUser(telegram_id=7, first_name="u"))
+        session.add(GCalLink(
+            owner_id=7, calendar_id="primary", access_token="tok",
+            token_expiry=utcnow() + timedelta(hours=1),
+        ))
+        area = await AreaService(session).create_area(owner_id=7, name="Work")
+        await session.commit()
+    stand_in = BatchStandIn()
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=stand_in.app), base_url="http://google.test"
+    )
+    worker = GCalPushWorker(
+        client, batch_url="http://google.test/batch/calendar/v3", base_backoff=0
+    )
+    yield worker, stand_in, area.id
+    token_manager.clear()
+    await client.aclose()
+    await engine.dispose()
+
+
+async def _changes():
+    async with db.async_session() as session:
+        return (await session.execute(select(CalendarItemChange))).scalars().all()
+
+
+async def _item(item_id):
+    async with db.async_session() as session:
+        return await session.get(CalendarItem, item_id)
+
+
+START = datetime(2025, 5, 1, 9)
+
+
+@pytest.mark.asyncio
+async def test_changes_are_collapsed_and_sent_in_one_batch(setup):
+    worker, stand_in, area_id = setup
+    async with CalendarItemRepository() as repo:
+        a = await repo.create(owner_id=7, title="A", start_at=START, area_id=area_id)
+        b = await repo.create(owner_id=7, title="B", start_at=START, area_id=area_id)
+        c = await repo.create(owner_id=7, title="C", start_at=START, area_id=area_id)
+        await repo.update(a.id, title="A2")
+        await repo.delete(c.id)
+    assert len(await _changes()) == 5
+
+    result = await worker.drain_once()
+    assert len(stand_in.batches) == 1 and len(stand_in.batches[0]) == 2
+    assert (result.pushed, result.collapsed) == (2, 3)
+    assert sorted(e["summary"] for e in stand_in.events.values()) == ["A2", "B"]
+    assert await _changes() == []
+    item = await _item(a.id)
+    assert item.gcal_etag == stand_in.events[item.gcal_event_id]["etag"]
+
+    # an update is based on the etag stored above
+    async with CalendarItemRepository() as repo:
+        await repo.update(b.id, title="B2")
+    result = await worker.drain_once()
+    assert result.pushed == 1 and stand_in.events[(await _item(b.id)).gcal_event_id]["summary"] == "B2"
+
+
+@pytest.mark.asyncio
+async def test_conflict_and_retry(setup):
+    worker, stand_in, area_id = setup
+    async with CalendarItemRepository() as repo:
+        a = await repo.create(owner_id=7, title="A", start_at=START, area_id=area_id)
+        b = await repo.create(owner_id=7, title="B", start_at=START, area_id=area_id)
+    await worker.drain_once()
+    a, b = await _item(a.id), await _item(b.id)
+
+    stand_in.events[a.gcal_event_id]["etag"] = '"edited-in-google"'
+    stand_in.fail_once.add(b.gcal_event_id)
+    async with CalendarItemRepository() as repo:
+        await repo.update(a.id, title="A local")
+        await repo.update(b.id, title="B local")
+    result = await worker.drain_once()
+    assert (result.conflicts, result.retried, result.pushed) == (1, 1, 0)
+    changes = {c.event_id: c for c in await _changes()}
+    assert changes[a.gcal_event_id].status == "conflict"
+    assert (changes[b.gcal_event_id].status, changes[b.gcal_event_id].attempts) == ("pending", 1)
+
+    result = await worker.drain_once()
+    assert result.pushed == 1 and result.sent == 1
+    assert stand_in.events[b.gcal_event_id]["summary"] == "B local"
+    assert stand_in.events[a.gcal_event_id]["summary"] == "A"
+
+
+@pytest.mark.asyncio
+async def test_workers_do_not_send_claimed_changes(setup):
+    worker, stand_in, area_id = setup
+    other = GCalPushWorker(
+        worker.client, batch_url="http://google.test/batch/calendar/v3", base_backoff=0
+    )
+    async with CalendarItemRepository() as repo:
+        a = await repo.create(owner_id=7, title="A", start_at=START, area_id=area_id)
+    async with db.async_session() as session:
+        # the other worker is busy sending this event
+        rows = await other._claim(session, utcnow())
+    assert [r.item_id for r in rows] == [a.id]
+    async with CalendarItemRepository() as repo:
+        await repo.update(a.id, title="A2")
+
+    result = await worker.drain_once()
+    assert result.sent == 0 and stand_in.batches == []
+    assert [c.claimed_by for c in await _changes()] == [other.worker_id, None]
+
+    result = await other.drain_once()  # picks up its own claim and the newer row
+    assert result.sent == 1 and len(stand_in.batches) == 1
+    assert [e["summary"] for e in stand_in.events.values()] == ["A2"]
+    assert await _changes() == []
+    assert (await worker.drain_once()).sent == 0 and len(stand_in.batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_claim_is_taken_over(setup):
+    worker, stand_in, area_id = setup
+    dead = GCalPushWorker(worker.client, lease=0)
+    async with CalendarItemRepository() as repo:
+        await repo.create(owner_id=7, title="A", start_at=START, area_id=area_id)
+    async with db.async_session() as session:
+        await dead._claim(session, utcnow() - timedelta(seconds=1))
+    result = await worker.drain_once()
+    assert result.pushed == 1 and await _changes() == []
+
+
+@pytest.mark.asyncio
+async def test_rows_in_back_off_do_not_block_due_ones(setup):
+    worker, stand_in, area_id = setup
+    worker.max_changes = 3
+    async with CalendarItemRepository() as repo:
+        for i in range(5):
+            await repo.create(owner_id=7, title=f"later {i}", start_at=START, area_id=area_id)
+    async with db.async_session() as session:
+        for change in (await session.execute(select(CalendarItemChange))).scalars():
+            change.next_attempt_at = utcnow() + timedelta(minutes=10)
+        await session.commit()
+    async with CalendarItemRepository() as repo:
+        due = await repo.create(owner_id=7, title="now", start_at=START, area_id=area_id)
+
+    async with db.async_session() as session:
+        rows = await worker._claim(session, utcnow())
+        assert [r.item_id for r in rows] == [due.id]
+        await worker._release(session)
+    result = await worker.drain_once()
+    assert result.pushed == 1
+    assert [e["summary"] for e in stand_in.events.values()] == ["now"]
+    assert len(await _changes()) == 5
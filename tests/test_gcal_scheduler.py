@@ -0,0 +1,134 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import GCalLink, TgUser
+from core.services.gcal_scheduler import GCalSyncScheduler
+from core.utils import utcnow
+
+
+class FakeEngine:
+    def __init__(self, failures: dict | None = None) -> None:
+        self.calls: list[int] = []
+        self.active = 0
+        self.max_active = 0
+        self.failures = failures or {}
+
+    async def sync(self, link_id: int):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            self.calls.append(link_id)
+            status = self.failures.get(link_id)
+            if status:
+                request = httpx.Request("GET", "http://google.test")
+                response = httpx.Response(status, request=request, headers={"Retry-After": "120"})
+                raise httpx.HTTPStatusError("err", request=request, response=response)
+        finally:
+            self.active -= 1
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest_asyncio.fixture
+async def links():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with async_session() as session:
+        session.add(TgUser(telegram_id=7, first_name="u"))
+        objs = [
+            GCalLink(owner_id=7, calendar_id=f"cal{i}", access_token="tok",
+                     channel_id=f"ch{i}", channel_expiry=utcnow() + timedelta(days=i))
+            for i in range(6)
+        ]
+        session.add_all(objs)
+        await session.commit()
+    yield [o.id for o in objs]
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_bounded_concurrency_and_backoff(links):
+    fake = FakeEngine(failures={links[1]: 429})
+    clock = Clock()
+    renewed = []
+
+    async def watcher(link, renew=False):
+        renewed.append((link.id, renew))
+
+    sched = GCalSyncScheduler(fake, concurrency=2, interval=60, watcher=watcher, clock=clock)
+    started = await sched.run_once()
+    assert sorted(started) == sorted(links)
+    assert fake.max_active == 2
+    # channels expiring within 12h: ch0 only
+    assert renewed == [(links[0], True)]
+
+    clock.now += 61
+    fake.failures.clear()
+    started = await sched.run_once()
+    assert links[1] not in started  # Retry-After: 120 still in effect
+    assert len(started) == 5
+    clock.now += 120
+    assert links[1] in await sched.run_once()
+
+
+@pytest.mark.asyncio
+async def test_webhook_burst_coalesces_and_goes_first(links):
+    fake = FakeEngine()
+    clock = Clock()
+    sched = GCalSyncScheduler(fake, concurrency=1, interval=3600, clock=clock,
+                              watcher=lambda *a, **k: asyncio.sleep(0))
+    await sched.run_once()
+    fake.calls.clear()
+
+    for _ in range(10):
+        assert await sched.notify_channel("ch3") == links[3]
+        clock.now += 0.1
+    sched.notify(links[5])
+    assert await sched.notify_channel("unknown") is None
+    await sched.run_once()
+    assert fake.calls == [links[5], links[3]]
+    assert sched.stats["coalesced"] == 9
+    await sched.run_once()
+    assert fake.calls == [links[5], links[3]]
+
+
+@pytest.mark.asyncio
+async def test_ping_during_sync_wakes_the_next_run(links):
+    class PingingEngine(FakeEngine):
+        async def sync(self, link_id: int):
+            await super().sync(link_id)
+            if self.calls.count(link_id) == 1 and link_id == links[2]:
+                sched.notify(link_id)  # Google changed it again meanwhile
+
+    fake = PingingEngine()
+    sched = GCalSyncScheduler(fake, concurrency=1, interval=3600, debounce=0, clock=Clock(),
+                              watcher=lambda *a, **k: asyncio.sleep(0))
+    stop = asyncio.Event()
+    task = asyncio.create_task(sched.run(stop_event=stop, tick=60))
+    try:
+        async with asyncio.timeout(2):
+            while fake.calls.count(links[2]) < 2:
+                await asyncio.sleep(0.01)
+    finally:
+        stop.set()
+        await task
+    assert len(fake.calls) == len(links) + 1
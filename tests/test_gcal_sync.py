@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import CalendarItem, GCalLink, TgUser
+from core.services.sync_gcal import GCalSyncEngine
+from core.services.sync_service import SyncService
+from core.utils import utcnow
+
+
+def _event(eid: str, title: str, day: int, **extra):
+    return {
+        "id": eid,
+        "etag": f'"{eid}-{title}"',
+        "summary": title,
+        "start": {"dateTime": f"2025-05-{day:02d}T09:00:00+02:00"},
+        "end": {"dateTime": f"2025-05-{day:02d}T10:00:00+02:00"},
+        **extra,
+    }
+
+
+class GoogleStandIn:
+    """Minimal events.list stand-in with pages and sync tokens."""
+
+    def __init__(self) -> None:
+        self.full_pages = [
+            {"items": [_event("e1", "One", 1), _event("e2", "Two", 2)], "nextPageToken": "p2"},
+            {"items": [_event("e3", "Three", 3)], "nextSyncToken": "s1"},
+        ]
+        self.delta = {
+            "s1": {
+                "items": [
+                    _event("e1", "One moved", 4),
+                    {"id": "e2", "status": "cancelled"},
+                ],
+                "nextSyncToken": "s2",
+            }
+        }
+        self.requests: list[dict] = []
+        self.app = FastAPI()
+        self.app.get("/calendars/{cal_id}/events")(self.events)
+
+    async def events(self, cal_id: str, request: Request):
+        params = dict(request.query_params)
+        self.requests.append(params)
+        assert request.headers["authorization"] == "Bearer tok"
+        token = params.get("syncToken")
+        if token:
+            if token not in self.delta:
+                return JSONResponse({"error": "gone"}, status_code=410)
+            return self.delta[token]
+        assert params["showDeleted"] == "true"
+        return self.full_pages[1] if params.get("pageToken") == "p2" else self.full_pages[0]
+
+
+@pytest_asyncio.fixture
+async def setup():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with async_session() as session:
+        session.add(TgUser(telegram_id=7, first_name="u"))
+        link = GCalLink(
+            owner_id=7, calendar_id="primary", access_token="tok",
+            token_expiry=utcnow() + timedelta(hours=1),
+        )
+        session.add(link)
+        await session.commit()
+    stand_in = GoogleStandIn()
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=stand_in.app), base_url="http://google.test"
+    )
+    engine_ = GCalSyncEngine(
+        client, events_url="http://google.test/calendars/{cal_id}/events"
+    )
+    yield engine_, stand_in, link.id
+    await client.aclose()
+    await engine.dispose()
+
+
+async def _items():
+    async with db.async_session() as session:
+        res = await session.execute(select(CalendarItem).order_by(CalendarItem.gcal_event_id))
+        return res.scalars().all()
+
+
+async def _token(link_id: int):
+    async with db.async_session() as session:
+        return (await session.get(GCalLink, link_id)).sync_token
+
+
+@pytest.mark.asyncio
+async def test_full_then_incremental_sync(setup):
+    engine, stand_in, link_id = setup
+    result = await engine.sync(link_id)
+    assert (result.full, result.pages, result.upserted) == (True, 2, 3)
+    items = await _items()
+    assert [(i.gcal_event_id, i.title, i.owner_id) for i in items] == [
+        ("e1", "One", 7), ("e2", "Two", 7), ("e3", "Three", 7)
+    ]
+    assert items[0].start_at.hour == 7  # converted to UTC
+    cancelled_id = items[1].id
+    assert await _token(link_id) == "s1"
+    async with SyncService() as svc:
+        cursor = (await svc.changes(7, entities=["calendar_items"])).cursor
+
+    result = await engine.sync(link_id)
+    assert (result.full, result.upserted, result.deleted) == (False, 1, 1)
+    items = await _items()
+    assert [(i.gcal_event_id, i.title, i.start_at.day) for i in items] == [
+        ("e1", "One moved", 4), ("e3", "Three", 3)
+    ]
+    assert await _token(link_id) == "s2"
+    # bulk upserts and deletes reach delta sync too
+    async with SyncService() as svc:
+        delta = await svc.changes(7, cursor, entities=["calendar_items"])
+    assert [i["title"] for i in delta.changed["calendar_items"]] == ["One moved"]
+    assert delta.deleted == {"calendar_items": [cancelled_id]}
+
+
+@pytest.mark.asyncio
+async def test_expired_token_triggers_full_resync(setup):
+    engine, stand_in, link_id = setup
+    async with db.async_session() as session:
+        link = await session.get(GCalLink, link_id)
+        link.sync_token = "stale"
+        await session.commit()
+    result = await engine.sync(link_id)
+    assert result.full and result.upserted == 3
+    assert await _token(link_id) == "s1"
+    assert stand_in.requests[0]["syncToken"] == "stale"
+
+
+@pytest.mark.asyncio
+async def test_token_not_saved_when_page_fails(setup):
+    engine, stand_in, link_id = setup
+
+    async def broken(cal_id: str, request: Request):
+        if request.query_params.get("pageToken"):
+            return JSONResponse({"error": "boom"}, status_code=500)
+        return stand_in.full_pages[0]
+
+    stand_in.app.router.routes.clear()
+    stand_in.app.get("/calendars/{cal_id}/events")(broken)
+    with pytest.raises(httpx.HTTPStatusError):
+        await engine.sync(link_id)
+    assert await _token(link_id) is None
+    assert len(await _items()) == 2  # first page kept; rerun upserts idempotently
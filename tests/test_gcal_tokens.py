@@ -0,0 +1,97 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import GCalLink
+from core.services.gcal_tokens import GCalTokenManager
+from core.utils import utcnow
+
+
+@pytest_asyncio.fixture
+async def manager():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with async_session() as session:
+        session.add(GCalLink(
+            calendar_id="primary", access_token="old", refresh_token="r",
+            token_expiry=utcnow() - timedelta(minutes=5),
+        ))
+        await session.commit()
+
+    calls = []
+    app = FastAPI()
+
+    @app.post("/token")
+    async def token():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"access_token": f"new{len(calls)}", "expires_in": 3600}
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://oauth.test")
+    mgr = GCalTokenManager(client, token_url="http://oauth.test/token")
+    yield mgr, calls
+    await client.aclose()
+    await engine.dispose()
+
+
+async def _stored():
+    async with db.async_session() as session:
+        return await session.get(GCalLink, 1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_refresh(manager):
+    mgr, calls = manager
+    tokens = await asyncio.gather(*(mgr.get_token(1) for _ in range(10)))
+    assert set(tokens) == {"new1"}
+    assert len(calls) == 1 and mgr.refreshes == 1
+    link = await _stored()
+    assert link.access_token == "new1"
+    assert link.token_expiry > utcnow() + timedelta(minutes=50)
+    # served from memory afterwards
+    assert await mgr.get_token(1) == "new1"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_stored_token_seeds_cache_and_proactive_refresh(manager):
+    mgr, calls = manager
+    link = await _stored()
+    link.access_token = "live"
+    link.token_expiry = utcnow() + timedelta(minutes=5)
+    assert await mgr.get_token(1, link) == "live"
+    assert calls == []
+    # within the proactive window -> refreshed in background
+    assert await mgr.refresh_expiring() == 1
+    assert await mgr.get_token(1) == "new1"
+    assert await mgr.refresh_expiring() == 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_token_is_refreshed_not_reseeded(manager):
+    mgr, calls = manager
+    link = await _stored()
+    link.access_token = "revoked"
+    link.token_expiry = utcnow() + timedelta(hours=1)
+    assert await mgr.get_token(1, link) == "revoked"
+    await mgr.expire(1)  # Google answered 401
+    assert (await _stored()).token_expiry is None
+    # the caller's link still looks fresh, but must not be reused
+    assert await mgr.get_token(1, link) == "new1"
+    assert len(calls) == 1
+    # a refreshed token may seed the cache from stored columns again
+    mgr.clear()
+    fresh = await _stored()
+    assert await mgr.get_token(1, fresh) == "new1" and len(calls) == 1
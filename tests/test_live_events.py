@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from core.models import TgUser
+from core.services import live_events
+from core.services.live_events import EventBroker
+from core.services.reminder_service import ReminderService
+from core.services.task_service import TaskService
+from core.services.time_service import TimeService
+
+
+@pytest_asyncio.fixture
+async def factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as session:
+        session.add_all([TgUser(telegram_id=1, first_name="u"), TgUser(telegram_id=2, first_name="v")])
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = EventBroker(queue_size=3)
+    monkeypatch.setattr(live_events, "broker", broker)
+    return broker
+
+
+def _drain(sub):
+    out = []
+    while not sub.queue.empty():
+        out.append(sub.queue.get_nowait())
+    return out
+
+
+@pytest.mark.asyncio
+async def test_events_published_after_commit_only(factory, broker):
+    mine, other = broker.subscribe(1), broker.subscribe(2)
+    async with factory() as session:
+        task = await TaskService(session).create_task(owner_id=1, title="Write")
+        entry = await TimeService(session).start_timer(owner_id=1, task_id=task.id)
+        assert _drain(mine) == []
+        await session.commit()
+    events = _drain(mine)
+    assert [e.type for e in events] == ["task.created", "timer.started"]
+    assert events[1].data["task_id"] == task.id
+    assert json.loads(events[1].sse().split("data: ")[1])["start_time"] == entry.start_time.isoformat()
+
+    async with factory() as session:
+        await ReminderService(session).create_reminder(1, "call", datetime(2026, 5, 1))
+        await TimeService(session).stop_timer(entry.id)
+        await session.rollback()
+    assert _drain(mine) == [] and _drain(other) == []
+
+
+@pytest.mark.asyncio
+async def test_stream_heartbeat_and_lag(broker):
+    stream = broker.stream(1, heartbeat=0.01)
+    assert "event: ready\ndata: {\"shared\": false}" in await stream.__anext__()
+    assert await stream.__anext__() == ": ping\n\n"
+    for i in range(5):
+        broker.publish(1, "task.updated", {"id": i})
+    assert await stream.__anext__() == "event: lagged\ndata: {}\n\n"
+    chunk = await stream.__anext__()
+    assert "event: task.updated" in chunk and '"id": 2' in chunk
+    assert broker.stats["dropped"] == 2
+    await stream.aclose()
+    assert broker.subscribers == 0
+
+
+class _Hub:
+    """Minimal shared pub/sub standing in for Redis."""
+
+    def __init__(self):
+        self.queues = []
+
+    async def publish(self, channel, message):
+        for q in self.queues:
+            q.put_nowait({"type": "message", "data": message})
+
+    def pubsub(self):
+        hub, queue = self, asyncio.Queue()
+
+        class PubSub:
+            async def subscribe(self, channel):
+                hub.queues.append(queue)
+
+            async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+                try:
+                    return await asyncio.wait_for(queue.get(), 0.01)
+                except asyncio.TimeoutError:
+                    return None
+
+            async def unsubscribe(self, channel):
+                hub.queues.remove(queue)
+
+            async def aclose(self):
+                pass
+
+        return PubSub()
+
+
+@pytest.mark.asyncio
+async def test_redis_relay_between_processes():
+    hub = _Hub()
+    web, bot = EventBroker(redis=hub), EventBroker(redis=hub)
+    stop = asyncio.Event()
+    relays = [asyncio.create_task(b.relay(stop_event=stop)) for b in (web, bot)]
+    await asyncio.sleep(0.02)
+    sub = web.subscribe(1)
+    bot.publish(1, "reminder.fired", {"id": 5})
+    event = await sub.next(1.0)
+    assert (event.type, event.data) == ("reminder.fired", {"id": 5})
+    await asyncio.sleep(0.05)
+    assert sub.queue.empty()  # own messages are not relayed twice
+    stop.set()
+    await asyncio.gather(*relays)
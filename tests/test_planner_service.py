@@ -0,0 +1,99 @@
+import time as _time
+from datetime import datetime, time, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from core.models import CalendarEvent, CalendarItem
+from core.services.area_service import AreaService
+from core.services.planner_service import PlannerService, PlanTask, plan
+from core.services.task_service import TaskService
+from scripts.bench_planner import build
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with async_session() as sess:
+        yield sess
+
+
+DAY = datetime(2025, 1, 6)
+
+
+def test_plan_deadline_priority_and_budget():
+    slots = [
+        (DAY.replace(hour=9), DAY.replace(hour=11)),
+        (DAY.replace(hour=9) + timedelta(days=1), DAY.replace(hour=12) + timedelta(days=1)),
+    ]
+    tasks = [
+        PlanTask(1, "later", 60, cost=1, priority=0.9),
+        PlanTask(2, "urgent", 60, cost=1, due=DAY.replace(hour=10)),
+        PlanTask(3, "heavy", 60, cost=5),
+        PlanTask(4, "huge", 240),
+        PlanTask(5, "missed", 30, due=DAY.replace(hour=9, minute=15)),
+    ]
+    result = plan(tasks, slots, daily_budget=5)
+    assert [(p.task_id, p.start) for p in result.placements] == [
+        (2, DAY.replace(hour=9)),
+        (1, DAY.replace(hour=10)),
+        (3, DAY.replace(hour=9) + timedelta(days=1)),
+    ]
+    assert result.unplaced == {4: "too_long", 5: "deadline"}
+
+
+def test_plan_week_of_hundreds_of_tasks_is_fast():
+    tasks, slots = build(800, 7)
+    t0 = _time.perf_counter()
+    result = plan(tasks, slots, daily_budget=40)
+    assert _time.perf_counter() - t0 < 0.5
+    assert len(result.placements) + len(result.unplaced) == 800
+    ends = sorted((p.start, p.end) for p in result.placements)
+    assert all(a[1] <= b[0] for a, b in zip(ends, ends[1:]))
+
+
+@pytest.mark.asyncio
+async def test_propose_and_apply(session):
+    start = DAY.replace(hour=8)
+    area = await AreaService(session).create_area(owner_id=1, name="Work")
+    tasks = TaskService(session)
+    await tasks.create_task(owner_id=1, title="Write", area_id=area.id, estimate_minutes=90)
+    await tasks.create_task(owner_id=1, title="No scope", estimate_minutes=30)
+    session.add(CalendarEvent(owner_id=1, title="Standup", start_at=DAY.replace(hour=9), end_at=DAY.replace(hour=10)))
+    await session.flush()
+
+    service = PlannerService(session)
+    result = await service.propose(1, days=1, start=start, work_start=time(9), work_end=time(12))
+    assert [(p.title, p.start, p.end) for p in result.placements] == [
+        ("Write", DAY.replace(hour=10), DAY.replace(hour=11, minute=30))
+    ]
+    assert list(result.unplaced.values()) == ["no_scope"]
+    assert await service.apply(1, result) == 1
+    items = (await session.execute(select(CalendarItem))).scalars().all()
+    assert [(i.title, i.area_id, i.task_id) for i in items] == [("Write", area.id, result.placements[0].task_id)]
+
+    # applying the same plan again, or planning again, does not duplicate the block
+    assert await service.apply(1, result) == 0
+    again = await service.propose(1, days=1, start=start, work_start=time(9), work_end=time(12))
+    assert again.placements == [] and again.unplaced[items[0].task_id] == "planned"
+
+
+@pytest.mark.asyncio
+async def test_propose_treats_empty_recurrence_as_one_off(session):
+    area = await AreaService(session).create_area(owner_id=1, name="Work")
+    task = await TaskService(session).create_task(owner_id=1, title="Once", area_id=area.id)
+    task.recurrence = ""
+    await session.flush()
+    result = await PlannerService(session).propose(
+        1, days=1, start=DAY.replace(hour=8), work_start=time(9), work_end=time(12)
+    )
+    assert [p.task_id for p in result.placements] == [task.id]
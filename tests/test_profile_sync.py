@@ -0,0 +1,119 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from core import db
+from core.models import TgUser
+from core.services.profile_sync import ProfileSync, ProfileSyncMiddleware
+from core.services.telegram_user_service import TelegramUserService
+
+OLD = datetime(2020, 1, 1)
+
+
+@pytest_asyncio.fixture
+async def updates(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(db, "engine", engine)
+    monkeypatch.setattr(
+        db, "async_session", sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    )
+    async with db.async_session() as session:
+        for tid in (1, 2, 3):
+            session.add(
+                TgUser(telegram_id=tid, username=f"u{tid}", first_name="Old", updated_at=OLD)
+            )
+        await session.commit()
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement)
+        if statement.startswith("UPDATE")
+        else None,
+    )
+    yield statements
+    await engine.dispose()
+
+
+async def _users():
+    async with db.async_session() as session:
+        rows = (await session.execute(select(TgUser).order_by(TgUser.telegram_id))).scalars()
+        return {u.telegram_id: u for u in rows}
+
+
+@pytest.mark.asyncio
+async def test_unchanged_profiles_are_not_written(updates):
+    sync = ProfileSync()
+    for _ in range(5):
+        for tid in (1, 2, 3):
+            sync.observe(tid, username=f"u{tid}", first_name="Old")
+    assert sync.pending == 3
+    assert await sync.flush() == 0  # values already stored
+    assert len(updates) == 1  # one executemany for the batch
+    users = await _users()
+    assert all(u.updated_at.replace(tzinfo=None) == OLD for u in users.values())
+    assert sync.stats["unchanged"] == 12 and sync.stats["noop"] == 3 and sync.saved == 15
+
+
+@pytest.mark.asyncio
+async def test_changes_are_coalesced_into_one_update(updates):
+    sync = ProfileSync()
+    sync.observe(1, username="u1", first_name="Old")
+    sync.observe(1, username="u1", first_name="New")
+    sync.observe(1, username="u1", first_name="Newer")
+    sync.observe(2, username="renamed", first_name="Old", last_name=None)
+    assert await sync.flush() == 2
+    assert len(updates) == 1
+    users = await _users()
+    assert users[1].first_name == "Newer" and users[2].username == "renamed"
+    assert users[2].updated_at.replace(tzinfo=None) > OLD
+    assert users[3].updated_at.replace(tzinfo=None) == OLD
+    assert sync.stats["coalesced"] == 2 and sync.stats["written"] == 2
+
+
+@pytest.mark.asyncio
+async def test_username_conflict_only_skips_that_user(updates):
+    sync = ProfileSync()
+    sync.observe(1, username="u2", first_name="Old")  # taken by user 2
+    sync.observe(3, username="u3", first_name="Three")
+    assert await sync.flush() == 1
+    users = await _users()
+    assert users[1].username == "u1" and users[3].first_name == "Three"
+    assert sync.stats["failed"] == 1
+    assert sync.observe(1, username="u2", first_name="Old")  # retried later
+
+
+@pytest.mark.asyncio
+async def test_login_refresh_skips_unchanged_profile(updates):
+    async with TelegramUserService() as service:
+        await service.update_from_telegram(1, username="u1", first_name="Old")
+    assert updates == []
+    async with TelegramUserService() as service:
+        await service.update_from_telegram(1, username="u1", first_name="Fresh")
+    assert len(updates) == 1
+    assert (await _users())[1].first_name == "Fresh"
+
+
+@pytest.mark.asyncio
+async def test_middleware_observes_senders():
+    sync = ProfileSync()
+    middleware = ProfileSyncMiddleware(sync)
+    sender = SimpleNamespace(
+        id=7, is_bot=False, username="x", first_name="X", last_name=None, language_code="ru"
+    )
+
+    async def handler(event, data):
+        return "ok"
+
+    event = SimpleNamespace(from_user=sender)
+    assert await middleware(handler, event, {}) == "ok"
+    assert await middleware(handler, event, {}) == "ok"
+    assert sync.pending == 1 and sync.stats["unchanged"] == 1
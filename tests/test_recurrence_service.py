@@ -0,0 +1,88 @@
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from core.models import TaskOccurrence
+from core.services.agenda_service import AgendaService
+from core.services.recurrence_service import RecurrenceService, expand, parse_rule
+from core.services.task_service import TaskService
+from core.utils import utcnow
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with async_session() as sess:
+        yield sess
+
+
+def test_expand_weekly_byday_with_exceptions():
+    rule = parse_rule("FREQ=WEEKLY;BYDAY=MO,WE")
+    start = datetime(2025, 1, 6, 9, 0)  # Monday
+    out = list(expand(rule, start, start, datetime(2025, 1, 20), skip={date(2025, 1, 8)}))
+    assert out == [
+        datetime(2025, 1, 6, 9, 0),
+        datetime(2025, 1, 13, 9, 0),
+        datetime(2025, 1, 15, 9, 0),
+    ]
+
+
+def test_expand_count_until_and_window():
+    start = datetime(2025, 1, 1, 8, 0)
+    rule = parse_rule("daily", {"interval": 2, "count": 3})
+    assert list(expand(rule, start, start, datetime(2026, 1, 1))) == [
+        start, start + timedelta(days=2), start + timedelta(days=4)
+    ]
+    rule = parse_rule("RRULE:FREQ=MONTHLY;UNTIL=20250430")
+    start = datetime(2025, 1, 31, 8, 0)
+    # months without the 31st are skipped
+    assert list(expand(rule, start, start, datetime(2026, 1, 1))) == [
+        start, datetime(2025, 3, 31, 8, 0)
+    ]
+    # a window far from the start jumps straight to the right period
+    rule = parse_rule("daily")
+    out = list(expand(rule, start, datetime(2030, 6, 1), datetime(2030, 6, 3)))
+    assert out == [datetime(2030, 6, 1, 8, 0), datetime(2030, 6, 2, 8, 0)]
+    with pytest.raises(ValueError):
+        parse_rule("FREQ=HOURLY")
+
+
+@pytest.mark.asyncio
+async def test_materialize_and_extend_horizon(session):
+    today = datetime.combine(utcnow().date(), time(9, 0))
+    service = TaskService(session)
+    task = await service.create_task(
+        owner_id=1, title="Standup", due_date=today, recurrence="daily",
+        excluded_dates=[(today + timedelta(days=1)).date().isoformat()],
+    )
+    rows = (await session.execute(
+        select(TaskOccurrence.occurs_at).where(TaskOccurrence.task_id == task.id)
+    )).scalars().all()
+    assert len(rows) == 89
+    assert today + timedelta(days=1) not in rows
+
+    await service.add_schedule_exception(task.id, (today + timedelta(days=2)).date())
+    rec = RecurrenceService(session)
+    assert await rec.extend_horizon(days=95) == 5
+    assert await rec.extend_horizon(days=95) == 0
+    occ = await rec.list_occurrences(1, today, today + timedelta(days=4))
+    assert [o.occurs_at for o in occ] == [today, today + timedelta(days=3)]
+
+    await service.update_task(task.id, recurrence="weekly")
+    occ = await rec.list_occurrences(1, today, today + timedelta(days=15))
+    assert [o.occurs_at for o in occ] == [today, today + timedelta(days=7), today + timedelta(days=14)]
+
+    async with AgendaService(session) as agenda:
+        entries, _ = await agenda.page(1, limit=2)
+    assert [(e.kind, e.id, e.start_at) for e in entries] == [
+        ("task", task.id, today), ("task", task.id, today + timedelta(days=7))
+    ]
@@ -0,0 +1,97 @@
+from datetime import date, datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from core.models import Area, Project, SyncChange, Task, TgUser, TimeEntry, TimeSource
+from core.services.time_import import RecordReader, TimeImportService, sweep_overlaps
+from core.services.time_rollup import TimeRollupService
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with async_session() as sess:
+        yield sess
+
+
+def _row(start_h, end_h):
+    return {"start_time": datetime(2026, 5, 1, start_h), "end_time": datetime(2026, 5, 1, end_h)}
+
+
+def test_sweep_rejects_overlaps_with_existing_and_new_rows():
+    existing = [(datetime(2026, 5, 1, 9), datetime(2026, 5, 1, 10)), (datetime(2026, 5, 1, 14), datetime(2026, 5, 1, 15))]
+    rows = [(1, _row(12, 13)), (2, _row(8, 9)), (3, _row(9, 11)), (4, _row(12, 14)), (5, _row(13, 16)), (6, _row(10, 11))]
+    accepted, rejected = sweep_overlaps(rows, existing)
+    assert [line for line, _ in accepted] == [2, 6, 1]
+    assert sorted(rejected) == [3, 4, 5]
+
+
+def test_reader_handles_chunk_boundaries_and_multiline_csv():
+    data = 'start_time,end_time,description\n2026-05-01T08:00:00,2026-05-01T09:00:00,"two\nlines"\n2026-05-01T10:00:00Z,2026-05-01T11:00+03:00,x'
+    reader = RecordReader("csv")
+    out = []
+    for i in range(0, len(data), 7):
+        out += reader.feed(data[i : i + 7].encode())
+    out += reader.close()
+    assert [line for line, _ in out] == [2, 4]
+    assert out[0][1]["description"] == "two\nlines"
+
+
+@pytest.mark.asyncio
+async def test_import_resolves_lineage_and_updates_rollups(session):
+    session.add_all([TgUser(telegram_id=1, first_name="u"), TgUser(telegram_id=2, first_name="v")])
+    await session.flush()
+    area = Area(owner_id=1, name="Work", mp_path="w.")
+    foreign = Area(owner_id=2, name="Other", mp_path="o.")
+    session.add_all([area, foreign])
+    await session.flush()
+    project = Project(owner_id=1, name="P", area_id=area.id)
+    session.add(project)
+    await session.flush()
+    task = Task(owner_id=1, title="T", project_id=project.id, area_id=area.id)
+    session.add(task)
+    session.add(TimeEntry(owner_id=1, start_time=datetime(2026, 5, 1, 12), end_time=datetime(2026, 5, 1, 13)))
+    await session.flush()
+
+    lines = [
+        f'{{"start_time": "2026-05-01T08:00:00", "end_time": "2026-05-01T09:00:00", "task_id": {task.id}}}',
+        f'{{"start_time": "2026-05-01T09:00:00", "end_time": "2026-05-01T09:30:00", "project_id": {project.id}, "billable": "no"}}',
+        f'{{"start_time": "2026-05-02T09:00:00", "end_time": "2026-05-02T10:00:00", "area_id": {foreign.id}}}',
+        '{"start_time": "2026-05-01T12:30:00", "end_time": "2026-05-01T14:00:00"}',
+        '{"start_time": "2026-05-01T23:00:00", "end_time": "2026-05-02T01:00:00", "activity_type": "learning"}',
+        '{"start_time": "2026-05-03T10:00:00", "end_time": "2026-05-03T09:00:00"}',
+        "not json",
+        '{"start_time": "2026-05-01T08:30:00", "end_time": "2026-05-01T08:45:00"}',
+    ]
+    svc = TimeImportService(session, batch_size=3)
+    result = await svc.import_stream([("\n".join(lines)).encode()], owner_id=1, fmt="ndjson")
+
+    assert (result.rows, result.created, result.invalid, result.overlaps) == (8, 3, 3, 2)
+    assert [line for line, _ in result.errors] == [3, 4, 6, 7, 8]
+    assert result.batches == 2
+    entries = (
+        await session.execute(
+            select(TimeEntry).where(TimeEntry.source == TimeSource.import_).order_by(TimeEntry.start_time)
+        )
+    ).scalars().all()
+    assert [(e.task_id, e.project_id, e.area_id, e.billable) for e in entries] == [
+        (task.id, project.id, area.id, True),
+        (None, project.id, area.id, False),
+        (None, None, None, True),
+    ]
+    rollups = TimeRollupService(session)
+    assert await rollups.total_seconds(1, day_from=date(2026, 5, 1), day_to=date(2026, 5, 1)) == 3600 + 1800 + 3600
+    assert await rollups.total_seconds(1, day_from=date(2026, 5, 2), day_to=date(2026, 5, 2)) == 3600
+    assert await session.scalar(select(func.count()).select_from(TimeEntry)) == 4
+
+    await session.commit()  # bulk-inserted rows reach the delta-sync log
+    logged = await session.execute(select(SyncChange.entity_id).where(SyncChange.entity == "time_entries"))
+    assert set(logged.scalars()) == set((await session.execute(select(TimeEntry.id))).scalars())
@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from core.models import ActivityType, Task, TimeEntry, TimeRollup
+from core.services.task_service import TaskService
+from core.services.time_rollup import TimeRollupService, split_by_day
+from core.services.time_service import TimeService
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with async_session() as sess:
+        yield sess
+
+
+async def _rows(session):
+    res = await session.execute(
+        select(TimeRollup.day, TimeRollup.task_id, TimeRollup.activity_type, TimeRollup.seconds)
+        .order_by(TimeRollup.day, TimeRollup.task_id)
+    )
+    return [tuple(r) for r in res.all()]
+
+
+def test_split_by_day_crosses_midnight():
+    start = datetime(2026, 3, 1, 23, 30, 0, 500000)
+    pieces = split_by_day(start, datetime(2026, 3, 3, 0, 15))
+    assert pieces == [
+        (date(2026, 3, 1), 1799),
+        (date(2026, 3, 2), 86400),
+        (date(2026, 3, 3), 900),
+    ]
+    assert sum(s for _, s in pieces) == int((datetime(2026, 3, 3, 0, 15) - start).total_seconds())
+    assert split_by_day(start, start) == []
+
+
+@pytest.mark.asyncio
+async def test_stop_assign_and_edit_keep_rollups_in_sync(session):
+    service = TimeService(session)
+    entry = await service.start_timer(owner_id=1, description="Night shift")
+    assert await _rows(session) == []  # running entries are not rolled up
+
+    await service.stop_timer(entry.id)
+    await service.update_entry(
+        entry.id,
+        owner_id=1,
+        start_time=datetime(2026, 3, 1, 22, 0),
+        end_time=datetime(2026, 3, 2, 1, 0),
+    )
+    first_task = entry.task_id
+    assert await _rows(session) == [
+        (date(2026, 3, 1), first_task, "work", 7200),
+        (date(2026, 3, 2), first_task, "work", 3600),
+    ]
+
+    other = Task(owner_id=1, title="Other")
+    session.add(other)
+    await session.flush()
+    await service.assign_task(entry.id, other.id, owner_id=1)
+    await service.update_entry(entry.id, owner_id=1, activity_type=ActivityType.learning)
+    assert await _rows(session) == [
+        (date(2026, 3, 1), other.id, "learning", 7200),
+        (date(2026, 3, 2), other.id, "learning", 3600),
+    ]
+    assert await TaskService(session).total_tracked_minutes(other.id) == 180
+    assert await TaskService(session).total_tracked_minutes(first_task) == 0
+
+    with pytest.raises(ValueError):
+        await service.update_entry(entry.id, owner_id=1, end_time=datetime(2026, 3, 1, 21, 0))
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_incremental(session):
+    service = TimeService(session)
+    base = datetime(2026, 1, 1, 20, 0)
+    for i in range(30):
+        entry = await service.start_timer(owner_id=1 + i % 2, description=f"t{i % 3}")
+        await service.update_entry(
+            entry.id,
+            owner_id=entry.owner_id,
+            start_time=base + timedelta(hours=7 * i),
+            end_time=base + timedelta(hours=7 * i, minutes=90 + i),
+            billable=i % 4 != 0,
+        )
+    incremental = await _rows(session)
+    rollups = TimeRollupService(session)
+    total = await rollups.total_seconds(1)
+
+    # drift (e.g. a manual SQL fix) is repaired by a rebuild
+    session.add(TimeEntry(owner_id=1, start_time=base, end_time=base + timedelta(hours=1)))
+    await session.flush()
+    assert await rollups.rebuild(owner_id=1, batch_size=7) > 0
+    assert await rollups.total_seconds(1) == total + 3600
+    await rollups.rebuild()
+    assert len(await _rows(session)) == len(incremental) + 1
+    assert await rollups.by_day(2, date(2026, 1, 1), date(2026, 1, 2)) != []
+
+
+@pytest.mark.asyncio
+async def test_deleting_task_removes_its_rolled_up_time(session):
+    service = TimeService(session)
+    tasks = TaskService(session)
+    kept = await tasks.create_task(owner_id=1, title="Kept")
+    gone = await tasks.create_task(owner_id=1, title="Gone")
+    for task, hours in ((kept, 1), (gone, 1), (gone, 2)):
+        entry = await service.start_timer(owner_id=1, task_id=task.id)
+        await service.stop_timer(entry.id)
+        await service.update_entry(
+            entry.id,
+            owner_id=1,
+            start_time=datetime(2026, 3, 1, 9, 0),
+            end_time=datetime(2026, 3, 1, 9 + hours, 0),
+        )
+    rollups = TimeRollupService(session)
+    assert await rollups.total_seconds(1) == 4 * 3600
+
+    assert await tasks.delete_task(gone.id)
+    assert await session.scalar(select(func.count()).select_from(TimeEntry)) == 1
+    assert await rollups.total_seconds(1) == 3600
+    assert await _rows(session) == [(date(2026, 3, 1), kept.id, "work", 3600)]
@@ -0,0 +1,146 @@
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from core.models import Task, TgUser, TimeEntry
+from core.services import timer_registry as registry_module
+from core.services.time_service import TimeService
+from core.services.timer_registry import (
+    MemoryTimerBackend,
+    RedisTimerBackend,
+    RunningTimer,
+    TimerRegistry,
+)
+from fakes import FakeRedis
+
+
+@pytest_asyncio.fixture
+async def factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:?cache=shared")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as session:
+        session.add(TgUser(telegram_id=1, first_name="u"))
+        session.add(Task(owner_id=1, title="T"))
+        await session.commit()
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+    factory.queries = queries
+    yield factory
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def registry(request, monkeypatch):
+    if request.param == "memory":
+        reg = TimerRegistry(MemoryTimerBackend(ttl=60))
+    else:
+        reg = TimerRegistry(RedisTimerBackend(FakeRedis(), ttl=60))
+    monkeypatch.setattr(registry_module, "timer_registry", reg)
+    monkeypatch.setattr("core.services.time_service.timer_registry", reg)
+    return reg
+
+
+async def _settle(reg):
+    if isinstance(reg.backend, RedisTimerBackend):
+        await reg.backend.drain()
+
+
+def _selects(factory):
+    return [q for q in factory.queries if "FROM time_entries" in q]
+
+
+@pytest.mark.asyncio
+async def test_start_stop_resume_update_registry_after_commit(factory, registry):
+    async with factory() as session:
+        assert await TimeService(session).running_timer(1) is None  # miss -> DB
+    factory.queries.clear()
+    async with factory() as session:
+        assert await TimeService(session).running_timer(1) is None
+    assert _selects(factory) == []
+
+    async with factory() as session:
+        entry = await TimeService(session).resume_task(owner_id=1, task_id=1)
+        await session.commit()
+    await _settle(registry)
+    factory.queries.clear()
+    async with factory() as session:
+        running = await TimeService(session).running_timer(1)
+        assert (running.id, running.task_id) == (entry.id, 1)
+        assert await TimeService(session).running_timer(1, task_id=2) is None
+    assert _selects(factory) == []
+
+    async with factory() as session:
+        await TimeService(session).stop_timer(entry.id)
+        await session.commit()
+    await _settle(registry)
+    factory.queries.clear()
+    async with factory() as session:
+        assert await TimeService(session).running_timer(1) is None
+    assert _selects(factory) == []
+    assert registry.stats["hits"] >= 4
+
+
+@pytest.mark.asyncio
+async def test_start_checks_database_not_registry(factory, registry):
+    async with factory() as session:
+        assert await TimeService(session).running_timer(1) is None  # cached: no timer
+    async with factory() as session:
+        # started by another process: this registry never hears about it
+        await session.execute(insert(TimeEntry).values(owner_id=1, task_id=1, start_time=datetime(2026, 1, 1)))
+        await session.commit()
+    async with factory() as session:
+        assert await TimeService(session).running_timer(1) is None  # stale until TTL
+        with pytest.raises(ValueError):
+            await TimeService(session).start_timer(owner_id=1, create_task_if_missing=False)
+
+
+@pytest.mark.asyncio
+async def test_rollback_discards_and_own_session_reads_database(factory, registry):
+    async with factory() as session:
+        assert await TimeService(session).running_timer(1) is None
+    async with factory() as session:
+        svc = TimeService(session)
+        entry = await svc.start_timer(owner_id=1, create_task_if_missing=False)
+        # uncommitted change in this session: the registry is bypassed
+        assert (await svc.running_timer(1)).id == entry.id
+        await session.rollback()
+    await _settle(registry)
+    async with factory() as session:
+        assert await TimeService(session).running_timer(1) is None
+
+
+@pytest.mark.asyncio
+async def test_fill_skipped_when_commit_races_with_load():
+    backend = MemoryTimerBackend(ttl=60)
+    reg = TimerRegistry(backend)
+    timer = RunningTimer(id=7, owner_id=1, start_time=datetime(2026, 1, 1))
+
+    async def load():
+        reg.commit([("start", timer)])  # committed after the DB read began
+        return []
+
+    assert await reg.running(1, load) == []
+    assert await backend.get(1) is None  # stale result not cached
+    assert RunningTimer.from_json(timer.to_json()) == timer
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_commit_counters_stay_bounded():
+    backend = MemoryTimerBackend(ttl=60, max_owners=10)
+    token = await backend.token(1)
+    for owner in range(1, 1001):
+        backend.commit([("start", RunningTimer(id=owner, owner_id=owner, start_time=datetime(2026, 1, 1)))])
+        backend.commit([("stop", (owner, owner))])
+    assert len(backend._changed) == 10
+    # owner 1 changed after the token was taken, and is no longer tracked
+    await backend.fill(1, [], token)
+    assert await backend.get(1) is None
+    await backend.fill(1, [], await backend.token(1))
+    assert await backend.get(1) == []
@@ -0,0 +1,135 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import TgUser, CalendarEvent, CalendarItem, Reminder
+from core.services.area_service import AreaService
+from core.services.task_service import TaskService
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+async def _seed(owner: int):
+    base = datetime(2025, 1, 10, 9, 0)
+    async with db.async_session() as session:  # type: ignore
+        async with session.begin():
+            session.add(TgUser(telegram_id=owner, first_name="tg"))
+    async with AreaService() as asvc:
+        health = await asvc.create_area(owner_id=owner, name='Health')
+        sleep = await asvc.create_area(owner_id=owner, name='Sleep', parent_id=health.id)
+        work = await asvc.create_area(owner_id=owner, name='Work')
+    async with TaskService() as tsvc:
+        task = await tsvc.create_task(
+            owner_id=owner, title='Lights off', area_id=sleep.id,
+            due_date=base + timedelta(hours=3),
+        )
+        await tsvc.create_task(owner_id=owner, title='No due date', area_id=sleep.id)
+    async with db.async_session() as session:  # type: ignore
+        async with session.begin():
+            session.add(CalendarEvent(owner_id=owner, title='Standup', start_at=base))
+            session.add(CalendarItem(
+                owner_id=owner, title='Gym', start_at=base + timedelta(hours=1),
+                area_id=health.id,
+            ))
+            session.add(CalendarItem(
+                owner_id=owner, title='Report', start_at=base + timedelta(hours=2),
+                area_id=work.id,
+            ))
+            session.add(Reminder(
+                owner_id=owner, message='Pills', remind_at=base + timedelta(hours=4),
+                task_id=task.id,
+            ))
+            session.add(CalendarItem(
+                owner_id=owner + 1, title='Foreign', start_at=base,
+                area_id=work.id,
+            ))
+    return health
+
+
+@pytest.mark.asyncio
+async def test_agenda_merges_sources_in_order(client: AsyncClient):
+    await _seed(301)
+    cookies = {"telegram_id": "301"}
+    resp = await client.get("/api/v1/calendar/agenda/merged", cookies=cookies)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [(e['kind'], e['title']) for e in data['items']] == [
+        ('event', 'Standup'),
+        ('item', 'Gym'),
+        ('item', 'Report'),
+        ('task', 'Lights off'),
+        ('reminder', 'Pills'),
+    ]
+    assert data['next_cursor'] is None
+
+
+@pytest.mark.asyncio
+async def test_agenda_cursor_pagination(client: AsyncClient):
+    await _seed(302)
+    cookies = {"telegram_id": "302"}
+    titles = []
+    cursor = None
+    for _ in range(5):
+        url = "/api/v1/calendar/agenda/merged?limit=2"
+        if cursor:
+            url += f"&cursor={cursor}"
+        resp = await client.get(url, cookies=cookies)
+        assert resp.status_code == 200
+        data = resp.json()
+        titles += [e['title'] for e in data['items']]
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert titles == ['Standup', 'Gym', 'Report', 'Lights off', 'Pills']
+
+    resp = await client.get(
+        "/api/v1/calendar/agenda/merged?cursor=bogus", cookies=cookies
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_agenda_area_subtree_and_range(client: AsyncClient):
+    health = await _seed(303)
+    cookies = {"telegram_id": "303"}
+    resp = await client.get(
+        f"/api/v1/calendar/agenda/merged?area_id={health.id}&include_sub=1",
+        cookies=cookies,
+    )
+    assert resp.status_code == 200
+    assert [e['title'] for e in resp.json()['items']] == ['Gym', 'Lights off', 'Pills']
+
+    resp = await client.get(
+        f"/api/v1/calendar/agenda/merged?area_id={health.id}", cookies=cookies
+    )
+    assert [e['title'] for e in resp.json()['items']] == ['Gym']
+
+    resp = await client.get(
+        "/api/v1/calendar/agenda/merged",
+        params={"from": "2025-01-10T10:30:00", "to": "2025-01-10T12:30:00"},
+        cookies=cookies,
+    )
+    assert [e['title'] for e in resp.json()['items']] == ['Report', 'Lights off']
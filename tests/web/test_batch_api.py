@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+import web.dependencies as dependencies
+from core.models import TgUser
+from web.config import S
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with db.async_session() as session:
+        session.add(TgUser(telegram_id=1, first_name="u"))
+        await session.commit()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        ac.cookies.set("telegram_id", "1")
+        yield ac
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_subrequests_with_one_auth(client, monkeypatch):
+    lookups = []
+    original = dependencies.TelegramUserService.get_user_by_telegram_id
+
+    async def counted(self, telegram_id):
+        lookups.append(telegram_id)
+        return await original(self, telegram_id)
+
+    monkeypatch.setattr(dependencies.TelegramUserService, "get_user_by_telegram_id", counted)
+    resp = await client.post(
+        "/api/v1/batch",
+        json={
+            "requests": [
+                {"id": "create", "method": "POST", "path": "/api/v1/tasks", "body": {"title": "a"}},
+                {"id": "list", "path": "/api/v1/tasks", "depends_on": ["create"]},
+                {"id": "running", "path": "/api/v1/time/running"},
+                {"id": "missing", "path": "/api/v1/tasks/999/done", "method": "POST"},
+                {"id": "bad", "method": "POST", "path": "/api/v1/tasks", "body": {}},
+                {"id": "after_bad", "path": "/api/v1/tasks", "depends_on": ["bad"]},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    out = {r["id"]: r for r in resp.json()["responses"]}
+    assert list(out) == ["create", "list", "running", "missing", "bad", "after_bad"]
+    assert out["create"]["status"] == 201 and out["create"]["body"]["title"] == "a"
+    assert [t["title"] for t in out["list"]["body"]] == ["a"]
+    assert out["running"] == {"id": "running", "status": 200, "headers": {"content-type": "application/json"}, "body": None}
+    assert out["missing"]["status"] == 404
+    assert out["bad"]["status"] == 422
+    assert out["after_bad"]["status"] == 424
+    assert lookups == [1, 1]  # ban check and dependency of the batch; sub-requests reuse it
+
+
+@pytest.mark.asyncio
+async def test_batch_limits(client, monkeypatch):
+    assert (await client.post("/api/v1/batch", json={"requests": []})).json() == {"responses": []}
+
+    monkeypatch.setattr(S.env, "BATCH_MAX_REQUESTS", 2)
+    many = [{"id": str(i), "path": "/api/v1/tasks"} for i in range(3)]
+    assert (await client.post("/api/v1/batch", json={"requests": many})).status_code == 413
+
+    for requests in (
+        [{"id": "a", "path": "/api/v1/tasks"}, {"id": "a", "path": "/api/v1/notes"}],
+        [{"id": "a", "path": "/api/v1/batch", "method": "POST"}],
+        [{"id": "a", "path": "/api/v1/events"}],
+        [{"id": "a", "path": "/api/v1/export/time_entries?format=ndjson"}],
+        [{"id": "a", "path": "/tasks"}],
+        [{"id": "a", "path": "/api/v1/tasks", "depends_on": ["b"]}],
+        [
+            {"id": "a", "path": "/api/v1/tasks", "depends_on": ["b"]},
+            {"id": "b", "path": "/api/v1/tasks", "depends_on": ["a"]},
+        ],
+    ):
+        assert (await client.post("/api/v1/batch", json={"requests": requests})).status_code == 400
+
+    slow_started = asyncio.Event()
+
+    async def slow(*args, **kwargs):
+        slow_started.set()
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(S.env, "BATCH_TIMEOUT", 0.2)
+    monkeypatch.setattr("web.routes.api.batch._dispatch", slow)
+    resp = await client.post("/api/v1/batch", json={"requests": [{"id": "a", "path": "/api/v1/tasks"}]})
+    assert resp.json()["responses"][0]["status"] == 504
+
+    client.cookies.clear()
+    assert (await client.post("/api/v1/batch", json={"requests": []})).status_code == 401
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import Area, CalendarEvent, Reminder, Task, TgUser, UserFavorite, WebUser
+from core.services.time_service import TimeService
+from core.utils import utcnow
+import web.routes.api.bootstrap as bootstrap_module
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_sections_and_versions(client, monkeypatch):
+    now = utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    async with db.async_session() as session:
+        session.add_all([
+            TgUser(telegram_id=1, first_name="u"),
+            TgUser(telegram_id=2, first_name="v"),
+            WebUser(id=5, username="u"),
+        ])
+        await session.flush()
+        area = Area(owner_id=1, name="Work")
+        session.add_all([
+            area,
+            Task(owner_id=1, title="today", due_date=now),
+            Task(owner_id=1, title="tomorrow", due_date=now + timedelta(days=1)),
+            Task(owner_id=2, title="theirs", due_date=now),
+            Reminder(owner_id=1, message="call", remind_at=now),
+            CalendarEvent(owner_id=1, title="meet", start_at=now),
+            UserFavorite(owner_id=5, label="Tasks", path="/tasks", position=1),
+        ])
+        await session.flush()
+        await TimeService(session).start_timer(owner_id=1)
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+    client.cookies.set("web_user_id", "5")
+
+    body = (await client.get("/api/v1/bootstrap")).json()
+    assert set(body["versions"]) == set(bootstrap_module.SECTIONS) == set(body["data"])
+    data = body["data"]
+    assert data["profile"]["telegram_id"] == 1 and data["profile"]["web_user_id"] == 5
+    assert [t["title"] for t in data["tasks"]] == ["today"]
+    assert data["tasks"][0]["time"] == "12:00"
+    assert [r["title"] for r in data["reminders"]] == ["call"]
+    assert [e["title"] for e in data["events"]] == ["meet"]
+    assert data["timer"]["end_time"] is None
+    assert [f["path"] for f in data["favorites"]] == ["/tasks"]
+    assert [a["name"] for a in data["areas"]] == ["Work"]
+    assert body["errors"] == []
+
+    known = ",".join(f"{k}:{v}" for k, v in body["versions"].items() if k != "tasks")
+    async with db.async_session() as session:
+        session.add(Task(owner_id=1, title="later", due_date=now + timedelta(minutes=30)))
+        await session.commit()
+    again = (await client.get("/api/v1/bootstrap", params={"known": known})).json()
+    assert list(again["data"]) == ["tasks"]
+    assert [t["title"] for t in again["data"]["tasks"]] == ["today", "later"]
+    assert again["versions"]["areas"] == body["versions"]["areas"]
+
+    async def broken(tg, web):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(bootstrap_module.SECTIONS, "habits", broken)
+    partial = (await client.get("/api/v1/bootstrap", params={"sections": "habits,timer"})).json()
+    assert partial["errors"] == ["habits"] and list(partial["data"]) == ["timer"]
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_requires_auth_and_known_sections(client):
+    assert (await client.get("/api/v1/bootstrap")).status_code == 401
+    async with db.async_session() as session:
+        session.add(TgUser(telegram_id=1, first_name="u"))
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+    assert (await client.get("/api/v1/bootstrap", params={"sections": "wallet"})).status_code == 400
+    body = (await client.get("/api/v1/bootstrap", params={"sections": "favorites"})).json()
+    assert body["data"] == {"favorites": []}
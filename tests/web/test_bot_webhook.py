@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from httpx import AsyncClient
+
+import bot.webhook as webhook
+from bot.webhook import WebhookUpdateQueue
+from web.config import Settings
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+SECRET = "s3cret"
+
+
+def _update(update_id: int, chat_id: int, text: str) -> dict:
+    """Shape of an update as recorded from Telegram."""
+
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1735689600,
+            "chat": {"id": chat_id, "type": "private", "first_name": "u"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "u"},
+            "text": text,
+        },
+    }
+
+
+@pytest_asyncio.fixture
+async def setup(monkeypatch):
+    monkeypatch.setattr(Settings, "BOT_WEBHOOK_SECRET", property(lambda self: SECRET))
+    seen: list[tuple[int, str]] = []
+    gate = asyncio.Event()
+    gate.set()
+    router = Router()
+
+    @router.message()
+    async def record(message: Message):
+        await gate.wait()
+        seen.append((message.chat.id, message.text))
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    queue = WebhookUpdateQueue(dp, Bot("123456:" + "A" * 35), workers=2, maxsize=2)
+    monkeypatch.setattr(webhook, "_queue", queue)
+    await queue.start()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac, queue, seen, gate
+    gate.set()
+    await queue.stop()
+
+
+def _post(client, payload, secret=SECRET):
+    return client.post(
+        "/api/v1/bot/webhook",
+        json=payload,
+        headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+    )
+
+
+@pytest.mark.asyncio
+async def test_updates_are_queued_and_dispatched(setup):
+    client, queue, seen, _ = setup
+    assert (await _post(client, _update(1, 10, "hi"), secret="wrong")).status_code == 401
+    assert (await _post(client, {"foo": 1})).status_code == 400
+    for i, text in enumerate(["a", "b", "c"], start=2):
+        resp = await _post(client, _update(i, 10 + i % 2, text))
+        assert resp.status_code == 200 and resp.json() == {"ok": True}
+        await queue.join()
+    assert sorted(t for _, t in seen) == ["a", "b", "c"]
+    assert queue.stats["processed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_full_queue_answers_503(setup):
+    client, queue, seen, gate = setup
+    gate.clear()
+    codes = []
+    for i in range(7):
+        codes.append((await _post(client, _update(i, 1 + i % 3, str(i)))).status_code)
+        await asyncio.sleep(0.01)  # let workers pick the update up
+    # two updates in flight, one held by each worker, two queued, the rest rejected
+    assert codes == [200] * 6 + [503]
+    gate.set()
+    await queue.join()
+    assert len(seen) == 6 and queue.stats["rejected"] == 1
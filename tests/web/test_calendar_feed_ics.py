@@ -61,3 +61,71 @@ async def test_feed_contains_event_and_todo(client: AsyncClient):
     text = resp.text
     assert "BEGIN:VEVENT" in text
     assert "BEGIN:VTODO" in text
+
+
+async def _seed_feed(telegram_id: int) -> str:
+    async with db.async_session() as session:  # type: ignore
+        async with session.begin():
+            user = TgUser(telegram_id=telegram_id, first_name="u")
+            session.add(user)
+        async with TelegramUserService(session) as us:
+            token = await us.generate_ics_token(user)
+        await session.commit()
+        async with session.begin():
+            session.add(
+                CalendarItem(
+                    owner_id=telegram_id,
+                    title="Event",
+                    start_at=utcnow(),
+                    end_at=utcnow() + timedelta(hours=1),
+                )
+            )
+    return token
+
+
+@pytest.mark.asyncio
+async def test_feed_conditional_get(client: AsyncClient):
+    from core.services.ics_feed import feed_cache
+
+    feed_cache.clear()
+    token = await _seed_feed(2)
+    url = f"/api/v1/calendar/feed.ics?scope=all&token={token}"
+    resp = await client.get(url)
+    assert resp.status_code == 200
+    etag = resp.headers["etag"]
+    assert resp.headers["last-modified"]
+
+    resp = await client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+    resp = await client.get(
+        url, headers={"If-Modified-Since": resp.headers["last-modified"]}
+    )
+    assert resp.status_code == 304
+
+    # a new item changes the version
+    async with db.async_session() as session:  # type: ignore
+        async with session.begin():
+            session.add(
+                CalendarItem(owner_id=2, title="Later", start_at=utcnow())
+            )
+    resp = await client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert "SUMMARY:Later" in resp.text
+
+
+@pytest.mark.asyncio
+async def test_feed_concurrent_requests_build_once(client: AsyncClient):
+    import asyncio
+    from core.services.ics_feed import feed_cache
+
+    feed_cache.clear()
+    token = await _seed_feed(3)
+    url = f"/api/v1/calendar/feed.ics?scope=all&token={token}"
+    before = feed_cache.builds
+    responses = await asyncio.gather(*(client.get(url) for _ in range(5)))
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.content for r in responses}) == 1
+    assert feed_cache.builds - before == 1
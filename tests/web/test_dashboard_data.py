@@ -15,7 +15,6 @@ from core.models import (
     TaskStatus,
     Reminder,
     CalendarEvent,
-    TimeEntry,
 )
 from web.routes import index
 from web.dependencies import get_current_web_user
@@ -71,11 +70,8 @@ class FakeTimeService:
     async def __aexit__(self, exc_type, exc, tb):
         pass
 
-    async def list_entries(self, owner_id=None):
-        now = utcnow()
-        return [
-            TimeEntry(id=1, owner_id=owner_id, start_time=now - timedelta(hours=2), end_time=now - timedelta(hours=1))
-        ]
+    async def focus_seconds(self, owner_id, since):
+        return 3600.0
 
 
 class FakeTgService:
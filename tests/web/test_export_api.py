@@ -0,0 +1,110 @@
+import csv
+import gzip
+import io
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import Note, Task, TgUser, TimeEntry
+from core.services.export_service import ExportService
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+async def _seed_entries(owner_id: int, n: int) -> None:
+    start = datetime(2026, 1, 1, 8, 0)
+    rows = [
+        {
+            "owner_id": owner_id,
+            "start_time": start + timedelta(minutes=i),
+            "end_time": start + timedelta(minutes=i + 1),
+            "description": f"entry {i} «тест», with comma",
+        }
+        for i in range(n)
+    ]
+    async with db.async_session() as session:
+        await session.execute(TimeEntry.__table__.insert(), rows)
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_export_formats_and_owner_isolation(client):
+    async with db.async_session() as session:
+        session.add_all([TgUser(telegram_id=1, first_name="u"), TgUser(telegram_id=2, first_name="v")])
+        session.add_all([Task(owner_id=1, title="mine"), Task(owner_id=2, title="theirs")])
+        session.add(Note(owner_id=1, content="line1\nline2"))
+        await session.commit()
+    await _seed_entries(1, 3)
+    await _seed_entries(2, 2)
+    client.cookies.set("telegram_id", "1")
+
+    resp = await client.get("/api/v1/export/time_entries")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["description"] for r in rows] == [f"entry {i} «тест», with comma" for i in range(3)]
+    assert {r["owner_id"] for r in rows} == {1}
+    assert rows[0]["start_time"] == "2026-01-01T08:00:00"
+
+    resp = await client.get("/api/v1/export/tasks", params={"format": "csv"})
+    assert resp.headers["content-type"].startswith("text/csv")
+    table = list(csv.DictReader(io.StringIO(resp.text)))
+    assert [r["title"] for r in table] == ["mine"]
+
+    resp = await client.get("/api/v1/export/notes", params={"format": "csv", "gzip": "1"})
+    assert resp.headers["content-type"] == "application/gzip"
+    assert 'filename="notes.csv.gz"' in resp.headers["content-disposition"]
+    table = list(csv.DictReader(io.StringIO(gzip.decompress(resp.content).decode())))
+    assert table[0]["content"] == "line1\nline2"
+
+    assert (await client.get("/api/v1/export/users")).status_code == 404
+    assert (await client.get("/api/v1/export/tasks", params={"format": "xml"})).status_code == 422
+    client.cookies.clear()
+    assert (await client.get("/api/v1/export/tasks")).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_export_memory_does_not_grow_with_rows(client):
+    async def peak(n_rows: int) -> int:
+        service = ExportService(batch_size=500, chunk_size=16 * 1024)
+        tracemalloc.start()
+        size = 0
+        async for chunk in service.stream("time_entries", n_rows, "csv", gzip=True):
+            size += len(chunk)
+        _, top = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert service.stats.rows == n_rows
+        assert size == service.stats.bytes
+        return top
+
+    await _seed_entries(2000, 2000)
+    await _seed_entries(20000, 20000)
+    small = await peak(2000)
+    large = await peak(20000)
+    assert large < small * 2
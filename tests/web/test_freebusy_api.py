@@ -0,0 +1,99 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import TgUser, CalendarEvent, TimeEntry
+from core.services.area_service import AreaService
+from core.services.freebusy_service import Interval, IntervalTree
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+BASE = datetime(2025, 3, 3, 9, 0)
+
+
+def _h(hours: float) -> datetime:
+    return BASE + timedelta(hours=hours)
+
+
+def test_interval_tree_queries():
+    tree = IntervalTree([
+        Interval(_h(0), _h(1), "a", 1),
+        Interval(_h(0.5), _h(2), "b", 2),
+        Interval(_h(3), _h(4), "c", 3),
+        Interval(_h(5), _h(5), "empty", 4),
+    ])
+    assert len(tree) == 3
+    assert [i.id for i in tree.overlapping(_h(1.5), _h(3.5))] == [2, 3]
+    assert tree.overlapping(_h(2), _h(3)) == []
+    assert tree.merged() == [(_h(0), _h(2)), (_h(3), _h(4))]
+    assert tree.gaps(_h(-1), _h(6), timedelta(minutes=90)) == [(_h(4), _h(6))]
+    assert [(a.id, b.id) for a, b in tree.conflicts()] == [(1, 2)]
+
+
+@pytest.mark.asyncio
+async def test_freebusy_endpoint_and_create_conflicts(client: AsyncClient):
+    owner = 401
+    async with db.async_session() as session:  # type: ignore
+        async with session.begin():
+            session.add(TgUser(telegram_id=owner, first_name="tg"))
+            session.add(CalendarEvent(owner_id=owner, title="Standup", start_at=_h(0), end_at=_h(1)))
+            session.add(TimeEntry(owner_id=owner, start_time=_h(0.5), end_time=_h(1.5)))
+            session.add(CalendarEvent(owner_id=owner + 1, title="Foreign", start_at=_h(2), end_at=_h(3)))
+    async with AreaService() as asvc:
+        area = await asvc.create_area(owner_id=owner, name="Work")
+    cookies = {"telegram_id": str(owner)}
+
+    resp = await client.get(
+        "/api/v1/calendar/freebusy",
+        params={"from": _h(-1).isoformat(), "to": _h(4).isoformat(), "min_gap": 30},
+        cookies=cookies,
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [(b["start_at"], b["end_at"]) for b in data["busy"]] == [
+        (_h(0).isoformat(), _h(1.5).isoformat())
+    ]
+    assert [f["start_at"] for f in data["free"]] == [_h(-1).isoformat(), _h(1.5).isoformat()]
+    assert [[c["kind"] for c in pair] for pair in data["conflicts"]] == [["event", "time"]]
+
+    resp = await client.post(
+        "/api/v1/calendar/items",
+        json={
+            "title": "Review", "start_at": _h(1).isoformat(), "end_at": _h(2).isoformat(),
+            "tzid": "UTC", "area_id": area.id,
+        },
+        cookies=cookies,
+    )
+    assert resp.status_code == 201
+    assert [c["kind"] for c in resp.json()["conflicts"]] == ["time"]
+
+    resp = await client.get(
+        "/api/v1/calendar/freebusy",
+        params={"from": _h(4).isoformat(), "to": _h(1).isoformat()},
+        cookies=cookies,
+    )
+    assert resp.status_code == 400
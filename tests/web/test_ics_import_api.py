@@ -0,0 +1,165 @@
+import tracemalloc
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import CalendarItem, TgUser
+from core.services.area_service import AreaService
+from core.services.ics_import import IcsImportService, VEventParser
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+SAMPLE = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\nUID:a@x\r\nDTSTART;TZID=Europe/Moscow:20250501T120000\r\n"
+    "DURATION:PT1H30M\r\nSUMMARY:Lunch\\, with\r\n  friends\r\n"
+    "BEGIN:VALARM\r\nSUMMARY:alarm\r\nEND:VALARM\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:b@x\r\nDTSTART;VALUE=DATE:20250502\r\nDTEND;VALUE=DATE:20250503\r\n"
+    "SUMMARY:Holiday\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:c@x\r\nDTSTART:20250503T080000Z\r\nSTATUS:CANCELLED\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nSUMMARY:no uid\r\nDTSTART:20250503T080000Z\r\nEND:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+).encode()
+
+
+def _generate(n: int):
+    yield b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    for i in range(n):
+        yield (
+            f"BEGIN:VEVENT\r\nUID:ev-{i}@bulk\r\nDTSTART:202501{1 + i % 28:02d}T090000Z\r\n"
+            f"DTEND:202501{1 + i % 28:02d}T100000Z\r\nSUMMARY:Event {i}\r\nEND:VEVENT\r\n"
+        ).encode()
+    yield b"END:VCALENDAR\r\n"
+
+
+def test_parser_handles_folding_params_and_split_chunks():
+    parser = VEventParser()
+    events = []
+    for i in range(0, len(SAMPLE), 7):  # chunk boundaries inside lines
+        events += parser.feed(SAMPLE[i : i + 7])
+    events += parser.close()
+    assert [e.uid for e in events] == ["a@x", "b@x", "c@x", None]
+    lunch, holiday, cancelled, _ = events
+    assert lunch.title == "Lunch, with friends"
+    assert (lunch.start_at, lunch.end_at) == (datetime(2025, 5, 1, 9), datetime(2025, 5, 1, 10, 30))
+    assert (holiday.start_at, holiday.end_at) == (datetime(2025, 5, 2), datetime(2025, 5, 3))
+    assert cancelled.cancelled
+
+
+def test_parser_memory_is_constant():
+    parser = VEventParser()
+    tracemalloc.start()
+    count = 0
+    for chunk in _generate(10_000):
+        count += len(parser.feed(chunk))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert count == 10_000
+    assert peak < 512 * 1024
+
+
+@pytest.mark.asyncio
+async def test_import_batches_and_dedupes_by_uid(client):
+    async with db.async_session() as session:
+        area = await AreaService(session).create_area(owner_id=1, name="Work")
+        await session.commit()
+    progress = []
+    async with IcsImportService(batch_size=400) as svc:
+        result = await svc.import_stream(
+            _generate(1000), owner_id=1, area_id=area.id,
+            on_progress=lambda r: progress.append(r.created),
+        )
+    assert (result.parsed, result.created, result.batches) == (1000, 1000, 3)
+    assert progress == [400, 800, 1000]
+
+    async with IcsImportService() as svc:
+        again = await svc.import_stream(_generate(10), owner_id=1, area_id=area.id)
+    assert (again.created, again.updated) == (0, 10)
+    async with db.async_session() as session:
+        assert await session.scalar(select(func.count(CalendarItem.id))) == 1000
+
+
+@pytest.mark.asyncio
+async def test_import_endpoint(client):
+    async with db.async_session() as session:
+        session.add(TgUser(telegram_id=1, first_name="u"))
+        area = await AreaService(session).create_area(owner_id=1, name="Work")
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+    files = {"file": ("cal.ics", SAMPLE, "text/calendar")}
+    resp = await client.post(f"/api/v1/calendar/items/import?area_id={area.id}", files=files)
+    assert resp.status_code == 200
+    assert resp.json() == {"parsed": 4, "created": 2, "updated": 0, "skipped": 2, "batches": 1}
+    resp = await client.post("/api/v1/calendar/items/import", files=files)
+    assert resp.status_code == 400
+    async with db.async_session() as session:
+        titles = (await session.execute(select(CalendarItem.title))).scalars().all()
+    assert sorted(titles) == ["Holiday", "Lunch, with friends"]
+
+
+RECURRING = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    # override of the third occurrence comes before its series
+    "BEGIN:VEVENT\r\nUID:s@x\r\nRECURRENCE-ID:{d3}T090000Z\r\nDTSTART:{d3}T150000Z\r\n"
+    "DTEND:{d3}T160000Z\r\nSUMMARY:Moved\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:s@x\r\nDTSTART:{d1}T090000Z\r\nDTEND:{d1}T093000Z\r\n"
+    "RRULE:FREQ=DAILY;COUNT=5\r\nEXDATE:{d2}T090000Z\r\nSUMMARY:Standup\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:s@x\r\nRECURRENCE-ID:{d4}T090000Z\r\nDTSTART:{d4}T090000Z\r\n"
+    "STATUS:CANCELLED\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:h@x\r\nDTSTART:{d1}T090000Z\r\nRRULE:FREQ=HOURLY\r\nEND:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+@pytest.mark.asyncio
+async def test_import_expands_rrule_and_applies_overrides(client):
+    from datetime import timedelta
+    from core.utils import utcnow
+
+    days = [(utcnow() + timedelta(days=i)).strftime("%Y%m%d") for i in range(1, 6)]
+    ics = RECURRING.format(d1=days[0], d2=days[1], d3=days[2], d4=days[3]).encode()
+    async with db.async_session() as session:
+        area = await AreaService(session).create_area(owner_id=1, name="Work")
+        await session.commit()
+    for batch_size in (500, 1):  # re-import is idempotent, also when batches are flushed early
+        async with IcsImportService(batch_size=batch_size) as svc:
+            result = await svc.import_stream([ics], owner_id=1, area_id=area.id)
+        assert result.skipped == 1  # unsupported FREQ=HOURLY
+        async with db.async_session() as session:
+            items = (
+                await session.execute(select(CalendarItem).order_by(CalendarItem.start_at))
+            ).scalars().all()
+        # day 2 excluded, day 3 moved, day 4 cancelled
+        assert [(i.title, i.start_at.strftime("%Y%m%d %H")) for i in items] == [
+            ("Standup", f"{days[0]} 09"),
+            ("Moved", f"{days[2]} 15"),
+            ("Standup", f"{days[4]} 09"),
+        ]
+        assert items[0].ics_uid == f"s@x#{days[0]}T090000Z"
+        assert items[1].ics_uid == f"s@x#{days[2]}T090000Z"
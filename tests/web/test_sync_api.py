@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import TgUser
+from core.services.note_service import NoteService
+from core.services.sync_service import SyncService, decode_cursor
+from core.services.task_service import TaskService
+from core.services.time_service import TimeService
+from core.utils import utcnow
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_full_then_delta_sync_with_deletes(client):
+    async with db.async_session() as session:
+        session.add_all([TgUser(telegram_id=1, first_name="u"), TgUser(telegram_id=2, first_name="v")])
+        await session.flush()
+        tasks = TaskService(session)
+        keep = await tasks.create_task(owner_id=1, title="keep")
+        gone = await tasks.create_task(owner_id=1, title="gone")
+        await tasks.create_task(owner_id=2, title="theirs")
+        await TimeService(session).start_timer(owner_id=1, task_id=gone.id)
+        await NoteService(session).create_note(owner_id=1, content="n")
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+
+    full = (await client.get("/api/v1/sync")).json()
+    assert [t["title"] for t in full["changed"]["tasks"]] == ["keep", "gone"]
+    assert len(full["changed"]["notes"]) == 1 and len(full["changed"]["time_entries"]) == 1
+    assert full["deleted"] == {} and not full["more"]
+    cursor = full["cursor"]
+    same = (await client.get("/api/v1/sync", params={"since": cursor})).json()
+    assert same["changed"]["tasks"] == [] and same["cursor"] == cursor
+
+    async with db.async_session() as session:
+        tasks = TaskService(session)
+        await tasks.update_task(keep.id, title="kept")
+        await tasks.delete_task(gone.id)  # cascades to its time entry
+        await session.commit()
+    delta = (await client.get("/api/v1/sync", params={"since": cursor})).json()
+    assert [t["title"] for t in delta["changed"]["tasks"]] == ["kept"]
+    assert delta["changed"]["notes"] == []
+    assert delta["deleted"] == {"tasks": [gone.id], "time_entries": [1]}
+    assert decode_cursor(delta["cursor"]) > decode_cursor(cursor)
+
+    async with db.async_session() as session:
+        await SyncService(session).prune(older_than_days=-1)  # drops all but the newest
+        await session.commit()
+    stale = (await client.get("/api/v1/sync", params={"since": cursor, "entities": "tasks"})).json()
+    assert stale["reset"] and list(stale["changed"]) == ["tasks"] and stale["deleted"] == {}
+    # a cursor the log never handed out (e.g. an old time-based one)
+    assert (await client.get("/api/v1/sync", params={"since": "1760000000000000"})).json()["reset"]
+
+    assert (await client.get("/api/v1/sync", params={"since": "abc"})).status_code == 400
+    assert (await client.get("/api/v1/sync", params={"entities": "users"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_long_transaction_is_not_skipped(client):
+    async with db.async_session() as session:
+        session.add(TgUser(telegram_id=1, first_name="u"))
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+
+    slow = db.async_session()
+    task = await TaskService(slow).create_task(owner_id=1, title="slow")
+    task.updated_at = utcnow() - timedelta(minutes=10)  # stamped long before its commit
+    await slow.flush()
+    async with db.async_session() as session:
+        await TaskService(session).create_task(owner_id=1, title="fast")
+        await session.commit()
+    first = (await client.get("/api/v1/sync", params={"since": "0"})).json()
+    assert [t["title"] for t in first["changed"]["tasks"]] == ["fast"]
+
+    await slow.commit()
+    await slow.close()
+    second = (await client.get("/api/v1/sync", params={"since": first["cursor"]})).json()
+    assert [t["title"] for t in second["changed"]["tasks"]] == ["slow"]
+
+
+@pytest.mark.asyncio
+async def test_sync_pages_share_one_cursor(client):
+    async with db.async_session() as session:
+        session.add(TgUser(telegram_id=1, first_name="u"))
+        await session.flush()
+        for i in range(5):
+            await TaskService(session).create_task(owner_id=1, title=f"t{i}")
+        await NoteService(session).create_note(owner_id=1, content="n")
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+
+    seen, page, cursors = [], None, set()
+    while True:
+        params = {"limit": 2, "entities": "tasks,notes"}
+        if page:
+            params["page"] = page
+        body = (await client.get("/api/v1/sync", params=params)).json()
+        seen += [(kind, row["id"]) for kind, rows in body["changed"].items() for row in rows]
+        cursors.add(body["cursor"])
+        if not body["more"]:
+            break
+        page = body["page"]
+    assert seen == [("tasks", i) for i in range(1, 6)] + [("notes", 1)]
+    assert len(cursors) == 1
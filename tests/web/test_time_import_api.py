@@ -0,0 +1,56 @@
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import TgUser, TimeEntry
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_import_csv_upload(client):
+    async with db.async_session() as session:
+        session.add(TgUser(telegram_id=1, first_name="u"))
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+    body = (
+        "start_time,end_time,description,billable\r\n"
+        "2026-05-01T08:00:00Z,2026-05-01T09:00:00Z,Писал отчёт,1\r\n"
+        "2026-05-01T08:30:00Z,2026-05-01T08:40:00Z,overlap,1\r\n"
+        "2026-05-01T10:00:00,oops,bad,1\r\n"
+    ).encode()
+    resp = await client.post("/api/v1/time/import", files={"file": ("toggl.csv", body, "text/csv")})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert (data["rows"], data["created"], data["invalid"], data["overlaps"]) == (3, 1, 1, 1)
+    assert [e[0] for e in data["errors"]] == [3, 4]
+    async with db.async_session() as session:
+        entries = (await session.execute(select(TimeEntry))).scalars().all()
+    assert [e.description for e in entries] == ["Писал отчёт"]
+
+    client.cookies.clear()
+    resp = await client.post("/api/v1/time/import", files={"file": ("x.csv", body, "text/csv")})
+    assert resp.status_code == 401
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+import core.db as db
+from core.models import ActivityType, TgUser
+from core.services.area_service import AreaService
+from core.services.time_service import TimeService
+
+try:
+    from main import app  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    from main import app  # type: ignore
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:?cache=shared')
+    async_session = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db.engine = engine
+    db.async_session = async_session
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    await engine.dispose()
+
+
+async def _track(service, owner, area_id, start, minutes, activity=ActivityType.work):
+    entry = await service.start_timer(owner_id=owner, create_task_if_missing=False, area_id=area_id)
+    await service.update_entry(
+        entry.id,
+        owner_id=owner,
+        start_time=start,
+        end_time=start + timedelta(minutes=minutes),
+        activity_type=activity,
+    )
+
+
+@pytest.mark.asyncio
+async def test_report_rolls_subareas_into_parents(client):
+    async with db.async_session() as session:
+        session.add_all([TgUser(telegram_id=1, first_name="u"), TgUser(telegram_id=2, first_name="v")])
+        await session.flush()
+        areas = AreaService(session)
+        work = await areas.create_area(owner_id=1, name="Work")
+        dev = await areas.create_area(owner_id=1, name="Dev", parent_id=work.id)
+        ops = await areas.create_area(owner_id=1, name="Ops", parent_id=work.id)
+        home = await areas.create_area(owner_id=1, name="Home")
+        other = await areas.create_area(owner_id=2, name="Work")
+        svc = TimeService(session)
+        monday = datetime(2026, 3, 2, 9, 0)
+        await _track(svc, 1, dev.id, monday, 60)
+        await _track(svc, 1, ops.id, monday + timedelta(days=1), 30, ActivityType.admin)
+        await _track(svc, 1, dev.id, monday + timedelta(days=7), 90, ActivityType.learning)
+        await _track(svc, 1, home.id, monday, 45)
+        await _track(svc, 1, None, monday, 15)
+        await _track(svc, 2, other.id, monday, 600)
+        await session.commit()
+    client.cookies.set("telegram_id", "1")
+    rng = "&date_from=2026-03-01&date_to=2026-03-31"
+
+    resp = await client.get(f"/api/v1/time/report?group_by=area{rng}")
+    assert resp.status_code == 200
+    body = resp.json()
+    totals = dict(zip(body["columns"]["area"], body["columns"]["seconds"]))
+    assert totals == {
+        None: 15 * 60,
+        work.id: 180 * 60,
+        dev.id: 150 * 60,
+        ops.id: 30 * 60,
+        home.id: 45 * 60,
+    }
+    assert body["total_seconds"] == 240 * 60
+    assert body["labels"]["area"][str(dev.id)] == "Dev"
+
+    resp = await client.get(f"/api/v1/time/report?group_by=week,area&area_id={work.id}{rng}")
+    body = resp.json()
+    rows = list(zip(body["columns"]["week"], body["columns"]["area"], body["columns"]["seconds"]))
+    assert rows == [
+        ("2026-03-02", work.id, 90 * 60),
+        ("2026-03-02", dev.id, 60 * 60),
+        ("2026-03-02", ops.id, 30 * 60),
+        ("2026-03-09", work.id, 90 * 60),
+        ("2026-03-09", dev.id, 90 * 60),
+    ]
+    assert body["total_seconds"] == 180 * 60
+
+    resp = await client.get(
+        f"/api/v1/time/report?group_by=activity,area&area_id={work.id}&rollup=false{rng}"
+    )
+    body = resp.json()
+    assert set(zip(*body["columns"].values())) == {
+        ("admin", ops.id, 1800),
+        ("learning", dev.id, 5400),
+        ("work", dev.id, 3600),
+    }
+
+    resp = await client.get("/api/v1/time/report?group_by=day&date_from=2026-03-03&date_to=2026-03-03")
+    assert resp.json()["columns"] == {"day": ["2026-03-03"], "seconds": [1800]}
+
+    assert (await client.get(f"/api/v1/time/report?group_by=hour{rng}")).status_code == 400
+    assert (await client.get(f"/api/v1/time/report?area_id={other.id}{rng}")).status_code == 404
+    assert (
+        await client.get("/api/v1/time/report?date_from=2020-01-01&date_to=2026-01-01")
+    ).status_code == 400
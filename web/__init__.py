@@ -38,6 +38,12 @@ from core.services.notification_service import (
     run_reminder_dispatcher,
     is_scheduler_enabled,
 )
+from core.services.recurrence_service import run_recurrence_worker
+from core.services.sync_service import run_sync_log_pruner
+from core.services.sync_gcal import aclose_client as aclose_gcal_client
+from core.services.gcal_scheduler import gcal_scheduler
+from core.services.gcal_tokens import token_manager as gcal_token_manager
+from core.services.gcal_push import gcal_push
 from . import para_schemas  # noqa: F401
 
 
@@ -49,6 +55,16 @@ async def lifespan(app: FastAPI):
     logger.info("Lifespan startup: begin")
     stop_event = None
     task = None
+    recurrence_task = None
+    sync_log_task = None
+    gcal_task = None
+    gcal_tokens_task = None
+    gcal_push_task = None
+    bot_webhook = None
+    profile_stop = None
+    profile_task = None
+    live_stop = None
+    live_task = None
     try:
         await init_models()
         logger.info("Lifespan startup: init_models() completed")
@@ -71,6 +87,41 @@ async def lifespan(app: FastAPI):
             task = asyncio.create_task(
                 run_reminder_dispatcher(poll_interval=60.0, stop_event=stop_event)
             )
+            # Продлеваем горизонт повторяющихся задач
+            recurrence_task = asyncio.create_task(
+                run_recurrence_worker(poll_interval=3600.0, stop_event=stop_event)
+            )
+            # Чистим старые записи журнала дельта-синхронизации
+            sync_log_task = asyncio.create_task(run_sync_log_pruner(stop_event=stop_event))
+            from web.config import S
+
+            if S.GOOGLE_CLIENT_ID:
+                gcal_task = asyncio.create_task(gcal_scheduler.run(stop_event=stop_event))
+                gcal_tokens_task = asyncio.create_task(
+                    gcal_token_manager.run(stop_event=stop_event)
+                )
+                gcal_push_task = asyncio.create_task(gcal_push.run(stop_event=stop_event))
+
+        from web.config import S
+
+        if S.BOT_MODE == "webhook":
+            import asyncio
+
+            from bot.webhook import start_webhook
+            from core.services.profile_sync import profile_sync
+
+            bot_webhook = await start_webhook()
+            profile_stop = asyncio.Event()
+            profile_task = asyncio.create_task(profile_sync.run(stop_event=profile_stop))
+
+        from core.services.live_events import broker as live_broker
+
+        if live_broker.redis is not None:
+            import asyncio
+
+            # события других процессов (бот, воркеры) для SSE-клиентов этого
+            live_stop = asyncio.Event()
+            live_task = asyncio.create_task(live_broker.relay(stop_event=live_stop))
 
         yield
         logger.info("Lifespan startup: completed")
@@ -80,11 +131,48 @@ async def lifespan(app: FastAPI):
     finally:
         if stop_event:
             stop_event.set()
+        if bot_webhook:
+            await bot_webhook.stop()
+        if profile_stop:
+            profile_stop.set()
+            await profile_task
+        if live_stop:
+            live_stop.set()
+            try:
+                await live_task
+            except Exception:
+                logger.exception("Live events relay raised during shutdown")
         if task:
             try:
                 await task
             except Exception:
                 logger.exception("Reminder dispatcher task raised during shutdown")
+        if recurrence_task:
+            try:
+                await recurrence_task
+            except Exception:
+                logger.exception("Recurrence worker task raised during shutdown")
+        if sync_log_task:
+            try:
+                await sync_log_task
+            except Exception:
+                logger.exception("Sync log pruner task raised during shutdown")
+        if gcal_task:
+            try:
+                await gcal_task
+            except Exception:
+                logger.exception("GCal scheduler task raised during shutdown")
+        if gcal_tokens_task:
+            try:
+                await gcal_tokens_task
+            except Exception:
+                logger.exception("GCal token refresher raised during shutdown")
+        if gcal_push_task:
+            try:
+                await gcal_push_task
+            except Exception:
+                logger.exception("GCal push worker raised during shutdown")
+        await aclose_gcal_client()
         try:
             await engine.dispose()
             logger.info("Lifespan shutdown: engine disposed")
@@ -106,6 +194,11 @@ tags_metadata = [
     {"name": "app-settings", "description": "Application settings API"},
     {"name": "auth", "description": "Authentication API"},
     {"name": "user", "description": "User favorites API"},
+    {"name": "export", "description": "Streaming data export API"},
+    {"name": "events", "description": "Live updates (Server-Sent Events)"},
+    {"name": "sync", "description": "Delta sync for offline-capable clients"},
+    {"name": "bootstrap", "description": "Start payload for the Telegram WebApp"},
+    {"name": "batch", "description": "Several API calls in one request"},
 ]
 
 app = FastAPI(
@@ -19,6 +19,11 @@ class EnvSettings(BaseSettings):
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
 
+    # Пакетные запросы (/api/v1/batch): подзапросов в пакете, одновременно, общий таймаут в секундах
+    BATCH_MAX_REQUESTS: int = 20
+    BATCH_CONCURRENCY: int = 5
+    BATCH_TIMEOUT: float = 10.0
+
     # Branding (ENV defaults)
     APP_BRAND_NAME: str = "LeonidPro"
     WEB_PUBLIC_URL: AnyHttpUrl = "http://localhost:5800"  # type: ignore[assignment]
@@ -27,6 +32,15 @@ class EnvSettings(BaseSettings):
     # Bot
     TELEGRAM_BOT_TOKEN: Optional[str] = None
     BOT_USERNAME: Optional[str] = None  # без @
+    # polling: отдельный процесс bot/main.py; webhook: обновления принимает веб-приложение
+    BOT_MODE: Literal["polling", "webhook"] = "polling"
+    BOT_WEBHOOK_URL: AnyHttpUrl | None = None  # type: ignore[assignment]
+    BOT_WEBHOOK_SECRET: Optional[str] = None
+    BOT_WEBHOOK_WORKERS: int = 4
+    BOT_WEBHOOK_QUEUE_SIZE: int = 1000
+    # порядок внутри чата, параллельность между чатами (bot/lanes.py)
+    BOT_MAX_CONCURRENCY: int = 32
+    BOT_LANE_SIZE: int = 100
 
     ADMIN_CHAT_ID: Optional[str] = None
     ADMIN_TELEGRAM_IDS: str = ""
@@ -188,6 +202,20 @@ class Settings:
             return val
         return str(self._env.GCAL_WEBHOOK_URL) if self._env.GCAL_WEBHOOK_URL else None
 
+    @property
+    def BOT_MODE(self):
+        return self._store.get("telegram.BOT_MODE") or self._env.BOT_MODE
+
+    @property
+    def BOT_WEBHOOK_URL(self):
+        if self._env.BOT_WEBHOOK_URL:
+            return str(self._env.BOT_WEBHOOK_URL)
+        return self.WEB_PUBLIC_URL.rstrip("/") + "/api/v1/bot/webhook"
+
+    @property
+    def BOT_WEBHOOK_SECRET(self):
+        return self._store.get_secret("telegram.BOT_WEBHOOK_SECRET") or self._env.BOT_WEBHOOK_SECRET
+
     @property
     def ADMIN_IDS(self):
         return self._env.ADMIN_TELEGRAM_IDS
@@ -15,6 +15,9 @@ from core.services.telegram_user_service import TelegramUserService
 
 async def get_current_web_user(request: Request) -> Optional[WebUser]:
     """Return current web user based on cookie or Authorization header."""
+    # sub-requests of /api/v1/batch reuse the user resolved for the batch
+    if hasattr(request.state, "web_user"):
+        return request.state.web_user
     raw = request.cookies.get("web_user_id")
     if not raw:
         auth = request.headers.get("Authorization")
@@ -36,6 +39,8 @@ async def get_current_web_user(request: Request) -> Optional[WebUser]:
 
 
 async def get_current_tg_user(request: Request) -> Optional[TgUser]:
+    if hasattr(request.state, "tg_user"):
+        return request.state.tg_user
     raw = request.cookies.get("telegram_id")
     if not raw:
         return None
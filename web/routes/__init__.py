@@ -29,6 +29,12 @@ from .api.app_settings import router as app_settings_api
 from .api.auth_webapp import router as auth_webapp_api
 from .api.user_favorites import router as user_favorites_api
 from .api.integrations_google import router as gcal_api
+from .api.bot_webhook import router as bot_webhook_api
+from .api.export import router as export_api
+from .api.events import router as events_api
+from .api.sync import router as sync_api
+from .api.bootstrap import router as bootstrap_api
+from .api.batch import router as batch_api
 
 # Монтирование под /api/v1
 api_router.include_router(tasks_api, prefix="/tasks", tags=["tasks"])
@@ -48,3 +54,9 @@ api_router.include_router(app_settings_api, prefix="/app-settings", tags=["app-s
 api_router.include_router(auth_webapp_api, prefix="/auth", tags=["auth"])
 api_router.include_router(user_favorites_api, prefix="/user", tags=["user"])
 api_router.include_router(gcal_api, prefix="/integrations/google", tags=["integrations"])
+api_router.include_router(bot_webhook_api, prefix="/bot", tags=["bot"])
+api_router.include_router(export_api, prefix="/export", tags=["export"])
+api_router.include_router(events_api, prefix="/events", tags=["events"])
+api_router.include_router(sync_api, prefix="/sync", tags=["sync"])
+api_router.include_router(bootstrap_api, prefix="/bootstrap", tags=["bootstrap"])
+api_router.include_router(batch_api, prefix="/batch", tags=["batch"])
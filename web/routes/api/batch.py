@@ -0,0 +1,218 @@
+"""Run several API calls in one HTTP request.
+
+``POST /api/v1/batch`` takes a list of sub-requests and dispatches each
+one to the application's router in-process: no network hop and no
+middleware pass per call. The batch itself goes through
+``auth_middleware`` once; the users it resolves are put into the
+sub-request state, where :func:`web.dependencies.get_current_tg_user` and
+:func:`web.dependencies.get_current_web_user` pick them up instead of
+querying again. Cookies and ``Authorization`` of the batch are passed
+on; sub-requests cannot set their own.
+
+Sub-requests run concurrently (at most ``BATCH_CONCURRENCY`` at a time)
+unless they name others in ``depends_on``: those start after their
+dependencies finished and get ``424`` without running if one of them
+failed. Limits: ``BATCH_MAX_REQUESTS`` sub-requests per batch and
+``BATCH_TIMEOUT`` seconds for the whole batch (unfinished ones get
+``504``). Only ``/api/v1`` paths are allowed, except the batch and SSE
+endpoints themselves and the streamed exports: a sub-response is
+collected in memory, which would undo their constant-memory streaming.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Literal
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import BaseModel, Field
+
+from core.logger import logger
+from core.models import TgUser, WebUser
+from web.config import S
+from web.dependencies import get_current_tg_user, get_current_web_user
+
+
+router = APIRouter(tags=["batch"])
+
+API_PREFIX = "/api/v1/"
+FORBIDDEN_PREFIXES = ("/api/v1/batch", "/api/v1/events", "/api/v1/export")
+# passed on from the batch request; sub-requests may not override them
+INHERITED_HEADERS = {b"cookie", b"authorization", b"user-agent", b"accept-language"}
+
+
+class BatchItem(BaseModel):
+    id: str = Field(..., min_length=1, max_length=64)
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., description="e.g. /api/v1/tasks?area_id=3")
+    body: Any = None
+    headers: Dict[str, str] = {}
+    depends_on: List[str] = []
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
+class BatchItemResult(BaseModel):
+    id: str
+    status: int
+    headers: Dict[str, str] = {}
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchItemResult]
+
+
+def _validate(items: List[BatchItem]) -> None:
+    """Raise 4xx for batches that cannot run at all."""
+
+    if len(items) > S.env.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"at most {S.env.BATCH_MAX_REQUESTS} requests per batch",
+        )
+    ids = [item.id for item in items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="duplicate request ids")
+    deps = {item.id: set(item.depends_on) for item in items}
+    for item in items:
+        path = urlsplit(item.path).path
+        if not path.startswith(API_PREFIX) or path.startswith(FORBIDDEN_PREFIXES):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"{item.id}: path not allowed"
+            )
+        if not deps[item.id] <= deps.keys():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"{item.id}: unknown dependency"
+            )
+    # Kahn's algorithm: whatever cannot be ordered is part of a cycle
+    pending = dict(deps)
+    while pending:
+        ready = [i for i, d in pending.items() if not d & pending.keys()]
+        if not ready:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="dependency cycle")
+        for i in ready:
+            del pending[i]
+
+
+async def _dispatch(request: Request, item: BatchItem, state: Dict[str, Any]) -> BatchItemResult:
+    """Call the router with a synthetic ASGI scope and collect the response."""
+
+    url = urlsplit(item.path)
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+    headers = [(k, v) for k, v in request.scope["headers"] if k in INHERITED_HEADERS]
+    headers += [
+        (k.lower().encode("latin-1"), v.encode("latin-1"))
+        for k, v in item.headers.items()
+        if k.lower().encode("latin-1") not in INHERITED_HEADERS | {b"content-length"}
+    ]
+    if body:
+        headers += [(b"content-length", str(len(body)).encode())]
+        if not any(k == b"content-type" for k, _ in headers):
+            headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "app": request.app,
+        "state": {**request.scope.get("state", {}), **state},
+        # HTTPException and validation errors are turned into responses by these
+        "starlette.exception_handlers": request.scope.get("starlette.exception_handlers"),
+    }
+    if scope["starlette.exception_handlers"] is None:
+        del scope["starlette.exception_handlers"]
+
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    start: Dict[str, Any] = {}
+    chunks: List[bytes] = []
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app.router(scope, receive, send)
+    except Exception:
+        logger.exception("batch %s %s failed", item.method, item.path)
+        return BatchItemResult(id=item.id, status=500, body={"detail": "Internal Server Error"})
+
+    raw = b"".join(chunks)
+    response_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in start.get("headers", [])}
+    content_type = response_headers.get("content-type", "")
+    payload: Any = raw.decode("utf-8", "replace") if raw else None
+    if raw and content_type.startswith("application/json"):
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            pass
+    kept = {k: v for k, v in response_headers.items() if k in ("content-type", "location", "etag")}
+    return BatchItemResult(id=item.id, status=start.get("status", 500), headers=kept, body=payload)
+
+
+@router.post("", response_model=BatchResponse, name="api:batch")
+async def run_batch(
+    payload: BatchRequest,
+    request: Request,
+    current_user: TgUser | None = Depends(get_current_tg_user),
+    web_user: WebUser | None = Depends(get_current_web_user),
+):
+    """Run sub-requests in-process and return their responses in order."""
+
+    if not current_user and not web_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    items = payload.requests
+    _validate(items)
+    state = {"tg_user": current_user, "web_user": web_user}
+    limit = asyncio.Semaphore(max(1, S.env.BATCH_CONCURRENCY))
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(item: BatchItem) -> BatchItemResult:
+        for dep in item.depends_on:
+            if (await tasks[dep]).status >= 400:
+                return BatchItemResult(
+                    id=item.id, status=status.HTTP_424_FAILED_DEPENDENCY, body={"detail": f"{dep} failed"}
+                )
+        async with limit:
+            return await _dispatch(request, item, state)
+
+    for item in items:
+        tasks[item.id] = asyncio.create_task(run(item))
+    if tasks:
+        _, unfinished = await asyncio.wait(tasks.values(), timeout=S.env.BATCH_TIMEOUT)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+
+    results = []
+    for item in items:
+        task = tasks[item.id]
+        if task.cancelled():
+            results.append(
+                BatchItemResult(id=item.id, status=status.HTTP_504_GATEWAY_TIMEOUT, body={"detail": "timeout"})
+            )
+        else:
+            results.append(task.result())
+    return BatchResponse(responses=results)
@@ -0,0 +1,212 @@
+"""One-shot start payload for the Telegram WebApp.
+
+Right after ``POST /api/v1/auth/tg-webapp/exchange`` the mini-app needs
+the profile, today's tasks, reminders and events, the running timer,
+habits, favorites and areas. ``GET /api/v1/bootstrap`` authenticates
+once and builds all sections concurrently. An ``AsyncSession`` cannot
+run queries concurrently, so every section reads through its own
+session from the pool.
+
+Each section carries a version: a short hash of its content. A client
+that sends ``known=tasks:<version>,...`` gets only the versions of the
+sections that did not change and data for the rest. A section that
+fails is listed in ``errors``; the client loads it from its own
+endpoint instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from datetime import UTC, datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from core.logger import logger
+from core.models import CalendarEvent, Reminder, Task, TgUser, WebUser
+from core.services.calendar_service import CalendarService
+from core.services.favorite_service import FavoriteService
+from core.services.nexus_service import HabitService
+from core.services.para_service import ParaService
+from core.services.reminder_service import ReminderService
+from core.services.task_service import TaskService
+from core.services.time_service import TimeService
+from core.utils import utcnow
+from web.dependencies import get_current_tg_user, get_current_web_user
+from ..areas import AreaResponse
+from ..calendar import EventTodayItem
+from ..habits import HabitResponse
+from ..reminders import ReminderTodayItem
+from ..tasks import TaskTodayItem
+from ..time_entries import TimeEntryResponse
+
+
+router = APIRouter(tags=["bootstrap"])
+
+Section = Callable[[TgUser, WebUser | None], Awaitable[Any]]
+
+
+class BootstrapResponse(BaseModel):
+    """Versions of all requested sections and data of the changed ones."""
+
+    generated_at: datetime
+    versions: Dict[str, str]
+    data: Dict[str, Any]
+    errors: List[str] = []
+
+
+def _today() -> tuple[datetime, datetime]:
+    start = datetime.combine(utcnow().date(), time.min)
+    return start, start + timedelta(days=1)
+
+
+def _today_item(cls, id: int, title: str, dt: datetime) -> Dict[str, Any]:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    date_s, time_s = dt.date().isoformat(), dt.strftime("%H:%M")
+    return cls(id=id, title=title, date=date_s, time=time_s, due_date=date_s, due_time=time_s).model_dump()
+
+
+async def _profile(tg: TgUser, web: WebUser | None) -> Dict[str, Any]:
+    return {
+        "telegram_id": tg.telegram_id,
+        "username": tg.username,
+        "first_name": tg.first_name,
+        "last_name": tg.last_name,
+        "language_code": tg.language_code,
+        "web_user_id": web.id if web else None,
+        "full_name": web.full_name if web else None,
+        "role": web.role if web else tg.role,
+    }
+
+
+async def _tasks(tg: TgUser, web: WebUser | None) -> List[Dict[str, Any]]:
+    start, end = _today()
+    async with TaskService() as svc:
+        res = await svc.session.execute(
+            select(Task.id, Task.title, Task.due_date)
+            .where(Task.owner_id == tg.telegram_id, Task.due_date >= start, Task.due_date < end)
+            .order_by(Task.due_date, Task.id)
+        )
+        return [_today_item(TaskTodayItem, *row) for row in res.all()]
+
+
+async def _reminders(tg: TgUser, web: WebUser | None) -> List[Dict[str, Any]]:
+    start, end = _today()
+    async with ReminderService() as svc:
+        res = await svc.session.execute(
+            select(Reminder.id, Reminder.message, Reminder.remind_at)
+            .where(
+                Reminder.owner_id == tg.telegram_id,
+                Reminder.remind_at >= start,
+                Reminder.remind_at < end,
+            )
+            .order_by(Reminder.remind_at, Reminder.id)
+        )
+        return [_today_item(ReminderTodayItem, *row) for row in res.all()]
+
+
+async def _events(tg: TgUser, web: WebUser | None) -> List[Dict[str, Any]]:
+    start, end = _today()
+    async with CalendarService() as svc:
+        res = await svc.session.execute(
+            select(CalendarEvent.id, CalendarEvent.title, CalendarEvent.start_at)
+            .where(
+                CalendarEvent.owner_id == tg.telegram_id,
+                CalendarEvent.start_at >= start,
+                CalendarEvent.start_at < end,
+            )
+            .order_by(CalendarEvent.start_at, CalendarEvent.id)
+        )
+        return [_today_item(EventTodayItem, *row) for row in res.all()]
+
+
+async def _timer(tg: TgUser, web: WebUser | None) -> Dict[str, Any] | None:
+    async with TimeService() as svc:
+        entry = await svc.running_timer(owner_id=tg.telegram_id)
+    return TimeEntryResponse.from_model(entry).model_dump() if entry else None
+
+
+async def _habits(tg: TgUser, web: WebUser | None) -> List[Dict[str, Any]]:
+    async with HabitService() as svc:
+        habits = await svc.list(owner_id=tg.telegram_id)
+    return [HabitResponse.from_model(h).model_dump() for h in habits]
+
+
+async def _favorites(tg: TgUser, web: WebUser | None) -> List[Dict[str, Any]]:
+    if web is None:
+        return []
+    async with FavoriteService() as svc:
+        items = await svc.list_favorites(web.id)
+    return [{"id": f.id, "label": f.label, "path": f.path, "position": f.position} for f in items]
+
+
+async def _areas(tg: TgUser, web: WebUser | None) -> List[Dict[str, Any]]:
+    async with ParaService() as svc:
+        areas = await svc.list_areas(owner_id=tg.telegram_id)
+    return [AreaResponse.from_model(a).model_dump() for a in areas]
+
+
+SECTIONS: Dict[str, Section] = {
+    "profile": _profile,
+    "tasks": _tasks,
+    "reminders": _reminders,
+    "events": _events,
+    "timer": _timer,
+    "habits": _habits,
+    "favorites": _favorites,
+    "areas": _areas,
+}
+
+
+def section_version(data: Any) -> str:
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _parse_known(raw: str | None) -> Dict[str, str]:
+    known: Dict[str, str] = {}
+    for part in (raw or "").split(","):
+        name, sep, version = part.strip().partition(":")
+        if sep and name and version:
+            known[name] = version
+    return known
+
+
+@router.get("", response_model=BootstrapResponse, name="api:bootstrap")
+async def bootstrap(
+    sections: str | None = Query(None, description="comma-separated subset, e.g. tasks,timer"),
+    known: str | None = Query(None, description="cached versions, e.g. tasks:1a2b3c,areas:4d5e6f"),
+    current_user: TgUser | None = Depends(get_current_tg_user),
+    web_user: WebUser | None = Depends(get_current_web_user),
+):
+    """Everything the WebApp shows on start in one response."""
+
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    names = [s.strip() for s in sections.split(",") if s.strip()] if sections else list(SECTIONS)
+    unknown = set(names) - set(SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"unknown sections: {', '.join(sorted(unknown))}",
+        )
+    results = await asyncio.gather(
+        *(SECTIONS[name](current_user, web_user) for name in names), return_exceptions=True
+    )
+    cached = _parse_known(known)
+    response = BootstrapResponse(generated_at=utcnow(), versions={}, data={})
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            logger.error("bootstrap section %s failed", name, exc_info=result)
+            response.errors.append(name)
+            continue
+        version = section_version(result)
+        response.versions[name] = version
+        if cached.get(name) != version:
+            response.data[name] = result
+    return response
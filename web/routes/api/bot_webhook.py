@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from bot.lanes import get_lanes
+from bot.webhook import get_update_queue
+from core.models import UserRole, WebUser
+from core.services.profile_sync import profile_sync
+from web.config import S
+from web.dependencies import role_required
+
+router = APIRouter()
+
+
+@router.post("/webhook", include_in_schema=False)
+async def telegram_webhook(request: Request):
+    """Accept a Telegram update and queue it for the dispatcher.
+
+    Answers as soon as the update is queued; 503 when the queue is full
+    (or webhook mode is off) makes Telegram redeliver it later.
+    """
+
+    secret = S.BOT_WEBHOOK_SECRET
+    given = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not secret or not hmac.compare_digest(given.encode(), secret.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    try:
+        raw = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(raw, dict) or "update_id" not in raw:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
+    if not get_update_queue().submit(raw):
+        return JSONResponse({"ok": False}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"ok": True}
+
+
+@router.get("/metrics")
+async def bot_metrics(current_user: WebUser = Depends(role_required(UserRole.admin))):
+    """Update lanes, webhook queue and profile sync counters of this process."""
+
+    queue = get_update_queue()
+    return {
+        "lanes": get_lanes().snapshot(),
+        "webhook": {**queue.stats, "queued": queue.qsize(), "running": queue.running},
+        "profile_sync": profile_sync.snapshot(),
+    }
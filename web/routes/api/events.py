@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from core.models import TgUser
+from core.services import live_events
+from ...dependencies import get_current_tg_user
+
+
+router = APIRouter(tags=["events"])
+
+
+@router.get("", name="api:events")
+async def event_stream(
+    request: Request,
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Server-Sent Events with the current user's timer, task and reminder changes."""
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    body = live_events.broker.stream(
+        current_user.telegram_id, is_disconnected=request.is_disconnected
+    )
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,32 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from core.models import TgUser
+from core.services.export_service import EXPORTS, MEDIA_TYPES, ExportService
+from ...dependencies import get_current_tg_user
+
+
+router = APIRouter(tags=["export"])
+
+
+@router.get("/{kind}", name="api:export")
+async def export_records(
+    kind: str,
+    format: Literal["csv", "ndjson"] = Query("ndjson"),
+    gzip: bool = Query(False),
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Stream all records of ``kind`` owned by the current user."""
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="unknown export")
+    body = ExportService().stream(kind, current_user.telegram_id, format, gzip=gzip)
+    filename = f"{kind}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        body,
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse, Response
 
 from core.logger import logger
+from core.services.gcal_scheduler import gcal_scheduler
 from core.models import WebUser
 from core.services import (
     generate_auth_url,
@@ -64,6 +65,11 @@ async def disconnect(current_user: WebUser | None = Depends(get_current_web_user
 
 @router.post("/webhook")
 async def webhook(request: Request):
+    channel_id = request.headers.get("X-Goog-Channel-ID")
+    # Channel ping is only a signal: the scheduler coalesces bursts into one sync
+    if gcal_scheduler.running and channel_id:
+        await gcal_scheduler.notify_channel(channel_id)
+        return Response(status_code=200)
     token = request.headers.get("X-Goog-Channel-Token")
     # In this simple implementation, we expect token to be user_id
     if not token:
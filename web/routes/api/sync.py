@@ -0,0 +1,51 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+
+from core.models import TgUser
+from core.services.sync_service import SyncService
+from ...dependencies import get_current_tg_user
+
+
+router = APIRouter(tags=["sync"])
+
+
+class SyncResponse(BaseModel):
+    """Changed rows per entity and ids of deleted ones."""
+
+    cursor: str
+    reset: bool
+    more: bool
+    page: Optional[str] = None
+    changed: Dict[str, List[Dict[str, Any]]]
+    deleted: Dict[str, List[int]]
+
+
+@router.get("", response_model=SyncResponse, name="api:sync")
+async def sync_changes(
+    since: str | None = Query(None, description="cursor of the previous sync"),
+    page: str | None = Query(None, description="page token of the previous response"),
+    entities: str | None = Query(None, description="comma-separated subset, e.g. tasks,notes"),
+    limit: int = Query(1000, ge=1, le=5000),
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Rows created, updated or deleted since ``since`` (all rows without it)."""
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    kinds = [e.strip() for e in entities.split(",") if e.strip()] if entities else None
+    async with SyncService() as service:
+        try:
+            result = await service.changes(
+                current_user.telegram_id, since, page=page, entities=kinds, limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return SyncResponse(
+        cursor=result.cursor,
+        reset=result.reset,
+        more=result.more,
+        page=result.page,
+        changed=result.changed,
+        deleted=result.deleted,
+    )
@@ -1,15 +1,43 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import List, Optional
 import hashlib
 import os
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Query, Response
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Request,
+    status,
+    Query,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, model_validator
+from sqlalchemy import select
 
+from core import db
 from core.models import CalendarEvent, TgUser, WebUser, CalendarItem
+from core.services.agenda_service import AgendaService
 from core.services.calendar_service import CalendarService
+from core.services.freebusy_service import FreeBusyService, IntervalTree
+from core.services.ics_import import IcsImportService
+from core.services.planner_service import PlannerService
+from core.services.ics_feed import (
+    ICS_FOOTER,
+    ICS_HEADER,
+    FeedVersion,
+    feed_cache,
+    feed_version,
+    iter_ics,
+    render_component,
+    scope_filters,
+)
 from core.services.para_repository import CalendarItemRepository
 from core.services.telegram_user_service import TelegramUserService
 from web.dependencies import get_current_tg_user, get_current_web_user
@@ -203,16 +231,36 @@ class CalendarItemResponse(CalendarItemBase):
             title=item.title,
             start_at=item.start_at,
             end_at=item.end_at,
-            description=item.description,
+            description=getattr(item, "description", None),
             tzid=tzid,
             project_id=item.project_id,
             area_id=item.area_id,
         )
 
 
+class BusyInterval(BaseModel):
+    """Busy range with its source object."""
+
+    kind: str
+    id: int
+    title: str
+    start_at: datetime
+    end_at: datetime
+
+
+class CalendarItemCreated(CalendarItemResponse):
+    """Created calendar item plus overlapping busy ranges."""
+
+    conflicts: List[BusyInterval] = []
+
+
+def _busy(i) -> BusyInterval:
+    return BusyInterval(kind=i.kind, id=i.id, title=i.title, start_at=i.start, end_at=i.end)
+
+
 @router.post(
     "/items",
-    response_model=CalendarItemResponse,
+    response_model=CalendarItemCreated,
     status_code=status.HTTP_201_CREATED,
 )
 async def create_item(
@@ -232,7 +280,10 @@ async def create_item(
             project_id=payload.project_id,
             area_id=payload.area_id,
         )
-    return CalendarItemResponse.from_model(item, tzid=payload.tzid)
+    resp = CalendarItemResponse.from_model(item, tzid=payload.tzid)
+    return CalendarItemCreated(
+        **resp.model_dump(), conflicts=[_busy(i) for i in item.conflicts]
+    )
 
 
 @router.get("/items/{item_id}", response_model=CalendarItemResponse)
@@ -288,6 +339,56 @@ async def delete_item(
     return None
 
 
+class IcsImportResponse(BaseModel):
+    """Counters of an .ics import."""
+
+    parsed: int
+    created: int
+    updated: int
+    skipped: int
+    batches: int
+
+
+ICS_IMPORT_CHUNK = 64 * 1024
+
+
+@router.post("/items/import", response_model=IcsImportResponse)
+async def import_items(
+    file: UploadFile = File(...),
+    area_id: int | None = Query(None),
+    project_id: int | None = Query(None),
+    tzid: str = Query("UTC", description="Zone for floating times"),
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Import VEVENTs of an uploaded .ics file as calendar items.
+
+    The upload is read in chunks; items are upserted by UID, so
+    re-importing a file updates what was imported before.
+    """
+
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if (area_id is None) == (project_id is None):
+        raise HTTPException(status_code=400, detail="provide exactly one of project_id or area_id")
+
+    async def chunks():
+        while chunk := await file.read(ICS_IMPORT_CHUNK):
+            yield chunk
+
+    try:
+        async with IcsImportService() as svc:
+            result = await svc.import_stream(
+                chunks(),
+                owner_id=current_user.telegram_id,
+                area_id=area_id,
+                project_id=project_id,
+                default_tz=tzid,
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return IcsImportResponse(**vars(result))
+
+
 @router.post("/items/{item_id}/alarms", status_code=status.HTTP_201_CREATED)
 async def create_alarm_placeholder(
     item_id: int, current_user: TgUser | None = Depends(get_current_tg_user)
@@ -341,68 +442,278 @@ async def agenda(
     return [CalendarItemResponse.from_model(i) for i in items]
 
 
+class AgendaEntryResponse(BaseModel):
+    """Row of the merged agenda (event, item, task or reminder)."""
+
+    kind: str
+    id: int
+    title: str
+    start_at: datetime
+    end_at: Optional[datetime] = None
+    area_id: int | None = None
+    project_id: int | None = None
+
+
+class AgendaPage(BaseModel):
+    """Page of merged agenda entries with keyset cursor."""
+
+    items: List[AgendaEntryResponse]
+    next_cursor: str | None = None
+
+
+@router.get("/agenda/merged", response_model=AgendaPage)
+async def agenda_merged(
+    from_dt: datetime | None = Query(default=None, alias="from"),
+    to_dt: datetime | None = Query(default=None, alias="to"),
+    area_id: int | None = None,
+    project_id: int | None = None,
+    include_sub: int | None = Query(default=0),
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Return events, calendar items, tasks and reminders as one timeline."""
+
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    async with AgendaService() as service:
+        try:
+            entries, next_cursor = await service.page(
+                current_user.telegram_id,
+                limit=limit,
+                cursor=cursor,
+                time_from=from_dt,
+                time_to=to_dt,
+                area_id=area_id,
+                project_id=project_id,
+                include_sub=bool(include_sub),
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return AgendaPage(
+        items=[AgendaEntryResponse(**vars(e)) for e in entries],
+        next_cursor=next_cursor,
+    )
+
+
+class FreeRange(BaseModel):
+    start_at: datetime
+    end_at: datetime
+
+
+class FreeBusyResponse(BaseModel):
+    """Busy blocks, free gaps and overlapping pairs within a window."""
+
+    busy: List[FreeRange]
+    free: List[FreeRange]
+    conflicts: List[List[BusyInterval]]
+
+
+FREEBUSY_MAX_WINDOW = timedelta(days=62)
+
+
+@router.get("/freebusy", response_model=FreeBusyResponse)
+async def freebusy(
+    from_dt: datetime = Query(alias="from"),
+    to_dt: datetime = Query(alias="to"),
+    min_gap: int = Query(default=0, ge=0, description="Minimum free gap, minutes"),
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Return merged busy time, free slots and conflicts between ``from`` and ``to``."""
+
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if to_dt <= from_dt or to_dt - from_dt > FREEBUSY_MAX_WINDOW:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid window")
+    async with FreeBusyService() as service:
+        busy = await service.busy(current_user.telegram_id, from_dt, to_dt)
+    tree = IntervalTree(busy)
+    return FreeBusyResponse(
+        busy=[FreeRange(start_at=s, end_at=e) for s, e in tree.merged()],
+        free=[
+            FreeRange(start_at=s, end_at=e)
+            for s, e in tree.gaps(from_dt, to_dt, timedelta(minutes=min_gap))
+        ],
+        conflicts=[[_busy(a), _busy(b)] for a, b in tree.conflicts()],
+    )
+
+
+class PlanRequest(BaseModel):
+    """Parameters of the time-blocking planner."""
+
+    days: int = 7
+    work_start: time = time(9, 0)
+    work_end: time = time(18, 0)
+    daily_budget: int = 20
+    apply: bool = False
+
+
+class PlannedBlock(BaseModel):
+    task_id: int
+    title: str
+    start_at: datetime
+    end_at: datetime
+    area_id: int | None = None
+    project_id: int | None = None
+
+
+class PlanResponse(BaseModel):
+    """Proposed blocks and tasks that did not fit (task id -> reason)."""
+
+    blocks: List[PlannedBlock]
+    unplaced: dict[int, str]
+    created: int = 0
+
+
+@router.post("/plan", response_model=PlanResponse)
+async def plan_time_blocks(
+    payload: PlanRequest,
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Fit open tasks into free slots; with ``apply`` create calendar items."""
+
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if not 1 <= payload.days <= 31 or payload.work_end <= payload.work_start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid plan window")
+    async with PlannerService() as service:
+        result = await service.propose(
+            current_user.telegram_id,
+            days=payload.days,
+            work_start=payload.work_start,
+            work_end=payload.work_end,
+            daily_budget=payload.daily_budget,
+        )
+        created = 0
+        if payload.apply:
+            created = await service.apply(current_user.telegram_id, result)
+    return PlanResponse(
+        blocks=[
+            PlannedBlock(
+                task_id=p.task_id,
+                title=p.title,
+                start_at=p.start,
+                end_at=p.end,
+                area_id=p.area_id,
+                project_id=p.project_id,
+            )
+            for p in result.placements
+        ],
+        unplaced=result.unplaced,
+        created=created,
+    )
+
+
 def _generate_ics(items: list[CalendarItem]) -> str:
     """Create a minimal iCalendar feed for events and tasks."""
 
     from core.utils import utcnow
 
-    now = utcnow().strftime("%Y%m%dT%H%M%SZ")
-    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//LeonidPro//EN"]
-    for e in items:
-        if e.end_at:
-            lines.append("BEGIN:VEVENT")
-            lines.append(f"UID:{e.id}@leonidpro")
-            lines.append(f"DTSTAMP:{now}")
-            lines.append(f"DTSTART:{e.start_at.strftime('%Y%m%dT%H%M%SZ')}")
-            lines.append(f"DTEND:{e.end_at.strftime('%Y%m%dT%H%M%SZ')}")
-            lines.append(f"SUMMARY:{e.title}")
-            lines.append("END:VEVENT")
-        else:
-            lines.append("BEGIN:VTODO")
-            lines.append(f"UID:{e.id}@leonidpro")
-            lines.append(f"DTSTAMP:{now}")
-            lines.append(f"DUE:{e.start_at.strftime('%Y%m%dT%H%M%SZ')}")
-            lines.append(f"SUMMARY:{e.title}")
-            lines.append(f"STATUS:{e.status.value.upper()}")
-            lines.append("END:VTODO")
-    lines.append("END:VCALENDAR")
-    return "\r\n".join(lines)
+    return "".join(iter_ics(items, utcnow()))
+
+
+# Feeds with more items than this are rendered straight from a DB cursor
+# instead of being kept in the in-process body cache.
+FEED_STREAM_THRESHOLD = 2000
+
+
+def _not_modified(request: Request, version: FeedVersion) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = {t.strip() for t in inm.split(",")}
+        return version.etag in tags or "*" in tags
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        return version.http_last_modified <= since
+    return False
+
+
+async def _resolve_feed_owner(token: str) -> int:
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    owner_id = feed_cache.owner_for_token(token_hash)
+    if owner_id is not None:
+        return owner_id
+    async with TelegramUserService() as users:
+        user = await users.get_user_by_ics_token_hash(token_hash)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    feed_cache.remember_token(token_hash, user.telegram_id)
+    return user.telegram_id
+
+
+async def _stream_feed(owner_id: int, scope: str, scope_id: int | None, version: FeedVersion):
+    async with db.async_session() as session:
+        yield ICS_HEADER
+        result = await session.stream_scalars(
+            select(CalendarItem)
+            .where(*scope_filters(owner_id, scope, scope_id))
+            .order_by(CalendarItem.start_at)
+        )
+        async for item in result:
+            yield render_component(item, version.last_modified)
+        yield ICS_FOOTER
 
 
 @router.get("/feed.ics")
 async def feed(
+    request: Request,
     scope: str = "all",
     id: int | None = None,
     token: str | None = None,
 ):
-    """Return iCalendar feed using token-based access."""
+    """Return iCalendar feed using token-based access.
+
+    Responses carry ``ETag``/``Last-Modified`` and conditional requests
+    are answered with ``304`` without rendering the feed.
+    """
 
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
-    async with TelegramUserService() as users:
-        user = await users.get_user_by_ics_token_hash(token_hash)
-        if not user:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    async with CalendarItemRepository() as repo:
-        if scope == "project" and id:
-            events = await repo.list(owner_id=user.telegram_id, project_id=id)
-        elif scope == "area" and id:
-            events = await repo.list(owner_id=user.telegram_id, area_id=id)
-        else:
-            events = await repo.list(owner_id=user.telegram_id)
-    ics = _generate_ics(events)
-    return Response(content=ics, media_type="text/calendar")
+    owner_id = await _resolve_feed_owner(token)
+    async with db.async_session() as session:
+        version = await feed_version(session, owner_id, scope, id)
+    headers = {
+        "ETag": version.etag,
+        "Last-Modified": format_datetime(version.http_last_modified, usegmt=True),
+        "Cache-Control": "private, max-age=0, must-revalidate",
+    }
+    if _not_modified(request, version):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if version.count > FEED_STREAM_THRESHOLD:
+        return StreamingResponse(
+            _stream_feed(owner_id, scope, id, version),
+            media_type="text/calendar",
+            headers=headers,
+        )
+
+    async def build() -> bytes:
+        async with CalendarItemRepository() as repo:
+            if scope == "project" and id:
+                events = await repo.list(owner_id=owner_id, project_id=id)
+            elif scope == "area" and id:
+                events = await repo.list(owner_id=owner_id, area_id=id)
+            else:
+                events = await repo.list(owner_id=owner_id)
+        return "".join(iter_ics(events, version.last_modified)).encode()
+
+    body = await feed_cache.get_or_build((owner_id, scope, id), version, build)
+    return Response(content=body, media_type="text/calendar", headers=headers)
 
 
 @ui_router.get("/feed.ics")
 async def feed_ui(
+    request: Request,
     scope: str = "all",
     id: int | None = None,
     token: str | None = None,
 ):
     """Proxy to API feed for user-facing ICS URL."""
-    return await feed(scope=scope, id=id, token=token)
+    return await feed(request, scope=scope, id=id, token=token)
 
 
 @ui_router.get("")
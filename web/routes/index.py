@@ -91,7 +91,7 @@ async def index(
             tasks = []
             reminders = []
             events = []
-            entries = []
+            focus_seconds = 0.0
             if tg_user:
                 async with TaskService() as ts:
                     tasks = await ts.list_tasks(owner_id=tg_user.telegram_id)
@@ -102,19 +102,12 @@ async def index(
                 async with CalendarService() as cs:
                     events = await cs.list_events(owner_id=tg_user.telegram_id)
                 async with TimeService() as time_svc:
-                    entries = await time_svc.list_entries(
-                        owner_id=tg_user.telegram_id
+                    focus_seconds = await time_svc.focus_seconds(
+                        tg_user.telegram_id, week_ago
                     )
 
             kpi_goals = sum(1 for t in tasks if t.status == TaskStatus.done)
-            kpi_focus_week = (
-                sum(
-                    ((_aware(e.end_time) or now) - _aware(e.start_time)).total_seconds()
-                    for e in entries
-                    if (_aware(e.end_time) or now) >= week_ago
-                )
-                / 3600
-            )
+            kpi_focus_week = focus_seconds / 3600
             kpi_focus_week_delta = 0
             kpi_goals_delta = 0
             kpi_focused_hours = kpi_focus_week
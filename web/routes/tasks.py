@@ -127,11 +127,14 @@ async def list_tasks(
         # Enrich with time tracking info
         from core.services.time_service import TimeService
         time_svc = TimeService(service.session)
+        running_by_task: dict[int, int] = {}
+        for timer in reversed(await time_svc.running_timers(current_user.telegram_id)):
+            if timer.task_id is not None:
+                running_by_task[timer.task_id] = timer.id  # newest wins
         enriched: list[TaskResponse] = []
         for t in tasks:
             mins = await service.total_tracked_minutes(t.id)
-            running = await time_svc.get_running_entry(owner_id=current_user.telegram_id, task_id=t.id)
-            enriched.append(TaskResponse.from_model(t, tracked_minutes=mins, running_entry_id=getattr(running, 'id', None)))
+            enriched.append(TaskResponse.from_model(t, tracked_minutes=mins, running_entry_id=running_by_task.get(t.id)))
     return enriched
 
 
@@ -176,7 +179,7 @@ async def mark_task_done(
     # on done we still may return time aggregates
     mins = await TaskService(service.session).total_tracked_minutes(task.id)
     from core.services.time_service import TimeService
-    running = await TimeService(service.session).get_running_entry(owner_id=current_user.telegram_id, task_id=task.id)
+    running = await TimeService(service.session).running_timer(owner_id=current_user.telegram_id, task_id=task.id)
     return TaskResponse.from_model(task, tracked_minutes=mins, running_entry_id=getattr(running, 'id', None))
 
 
@@ -196,7 +199,7 @@ async def start_timer_for_task(task_id: int, current_user: TgUser | None = Depen
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
         mins = await service.total_tracked_minutes(task_id)
-        running = await time_svc.get_running_entry(owner_id=current_user.telegram_id, task_id=task_id)
+        running = await time_svc.running_timer(owner_id=current_user.telegram_id, task_id=task_id)
         return TaskResponse.from_model(task, tracked_minutes=mins, running_entry_id=getattr(running, 'id', None))
 
 
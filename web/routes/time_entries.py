@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import date, timedelta
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status, Query
 from pydantic import BaseModel
 
 from core.models import TimeEntry, TgUser
+from core.services.time_import import TimeImportService
+from core.services.time_report import TimeReportService
 from core.services.time_service import TimeService
+from core.utils import utcnow
 from web.dependencies import get_current_tg_user, get_current_web_user
 from core.models import WebUser
 from ..template_env import templates
@@ -15,6 +19,9 @@ from ..template_env import templates
 router = APIRouter(tags=["time"])
 ui_router = APIRouter(prefix="/time", tags=["time"], include_in_schema=False)
 
+MAX_REPORT_DAYS = 3 * 366
+IMPORT_CHUNK = 64 * 1024
+
 
 class StartPayload(BaseModel):
     """Payload to start a timer."""
@@ -109,12 +116,103 @@ async def list_entries(
     return [TimeEntryResponse.from_model(e) for e in entries]
 
 
+class TimeReportResponse(BaseModel):
+    """Columnar report: ``columns[name][i]`` is row ``i``; ``seconds`` is always present."""
+
+    group_by: List[str]
+    date_from: date
+    date_to: date
+    rollup: bool
+    rows: int
+    total_seconds: int
+    columns: Dict[str, List[Any]]
+    labels: Dict[str, Dict[int, str]]
+
+
+@router.get("/report", response_model=TimeReportResponse, name="api:time_report")
+async def time_report(
+    current_user: TgUser | None = Depends(get_current_tg_user),
+    group_by: str = Query(default="area", description="comma list of day, week, area, project, task, activity"),
+    area_id: int | None = Query(default=None, description="limit to this area and its subareas"),
+    date_from: date | None = Query(default=None),
+    date_to: date | None = Query(default=None),
+    rollup: bool = Query(default=True, description="area totals include subareas"),
+):
+    """Tracked time totals from daily rollups (running timers are not included)."""
+
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    date_to = date_to or utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to or (date_to - date_from).days > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid date range")
+    dims = [d.strip() for d in group_by.split(",") if d.strip()]
+    async with TimeReportService() as service:
+        try:
+            report = await service.report(
+                current_user.telegram_id,
+                group_by=dims,
+                day_from=date_from,
+                day_to=date_to,
+                area_id=area_id,
+                rollup=rollup,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except LookupError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return TimeReportResponse(
+        group_by=report.group_by,
+        date_from=date_from,
+        date_to=date_to,
+        rollup=rollup,
+        rows=report.rows,
+        total_seconds=report.total_seconds,
+        columns=report.columns,
+        labels=report.labels,
+    )
+
+
+class TimeImportResponse(BaseModel):
+    """Counters of a time-entry import; ``errors`` are ``(line, reason)``."""
+
+    rows: int
+    created: int
+    invalid: int
+    overlaps: int
+    batches: int
+    errors: List[Tuple[int, str]]
+
+
+@router.post("/import", response_model=TimeImportResponse, name="api:time_import")
+async def import_entries(
+    file: UploadFile = File(...),
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    current_user: TgUser | None = Depends(get_current_tg_user),
+):
+    """Import finished entries from a CSV or NDJSON upload.
+
+    Invalid and overlapping rows are skipped and listed in ``errors``.
+    """
+
+    if not current_user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+    async def chunks():
+        while chunk := await file.read(IMPORT_CHUNK):
+            yield chunk
+
+    async with TimeImportService() as svc:
+        result = await svc.import_stream(chunks(), owner_id=current_user.telegram_id, fmt=format)
+    return TimeImportResponse(**vars(result))
+
+
 @router.get("/running", response_model=TimeEntryResponse | None, name="api:time_running")
 async def get_running_entry(current_user: TgUser | None = Depends(get_current_tg_user)):
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
     async with TimeService() as service:
-        entry = await service.get_running_entry(owner_id=current_user.telegram_id)
+        entry = await service.running_timer(owner_id=current_user.telegram_id)
     return TimeEntryResponse.from_model(entry) if entry else None
 
 
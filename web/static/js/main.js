@@ -11,6 +11,38 @@ window.fetch = async (input, init = {}) => {
     }
     return resp;
 };
+// Telegram WebApp: tg_webapp_boot.js loads the start data of all widgets
+// with one GET /api/v1/bootstrap and announces it with `lp:bootstrap`.
+// A widget takes its first state from there and calls its own endpoint
+// only when the section is missing (not in the WebApp, or it failed).
+const bootUsed = new Set();
+function bootstrapSection(name) {
+    const take = (data) => {
+        if (!data || !(name in data) || bootUsed.has(name)) return undefined;
+        bootUsed.add(name);
+        return data[name];
+    };
+    if (window.__LP_BOOTSTRAP) return Promise.resolve(take(window.__LP_BOOTSTRAP));
+    const expected = window.__LP_AUTH && window.Telegram && window.Telegram.WebApp;
+    if (!expected) return Promise.resolve(undefined);
+    return new Promise((resolve) => document.addEventListener(
+        'lp:bootstrap', (e) => resolve(take(e.detail)), { once: true }
+    ));
+}
+// Server push (GET /api/v1/events): one EventSource per page shared by
+// every widget. `ready` comes on every (re)connect; missed events are not
+// replayed, so subscribers reload on reconnects.
+let liveSource = null;
+function onLive(types, handler) {
+    if (!window.EventSource) return false;
+    if (!liveSource) liveSource = new EventSource('/api/v1/events');
+    types.forEach((type) => liveSource.addEventListener(type, handler));
+    return true;
+}
+// today items of the bootstrap carry the UTC date and HH:MM separately
+const bootItems = (items, field) => items.map(
+    (x) => ({ ...x, [field]: x.date && x.time ? `${x.date}T${x.time}:00Z` : x.date })
+);
 export function enableAccessibility() {
     const btn = document.getElementById('accessibility-toggle');
     if (!btn)
@@ -116,17 +148,16 @@ document.addEventListener('DOMContentLoaded', () => {
   function fmt(dt){ try { return new Date(dt).toLocaleString(); } catch { return dt || ''; } }
 
   async function refresh(){
-    try{
-      const data = await getJSON(window.TIMER_ENDPOINTS.status);
-      let current = null;
-      if (Array.isArray(data)) current = data.find(e=>!e.end_time);
+    try{ render(await getJSON(window.TIMER_ENDPOINTS.running)); }catch(e){ /* no-op */ }
+  }
+  function render(data){
+      const current = data && data.id ? data : null;
       runningId = current ? current.id : null;
       const running = Boolean(runningId);
       if (startBtn) startBtn.hidden = running;
       if (stopBtn) stopBtn.hidden  = !running;
       if (dot) dot.hidden = !running;
       if (info) info.textContent = running ? `Идёт с ${fmt(current.start_time)}` : 'Таймер не запущен';
-    }catch(e){ /* no-op */ }
   }
 
   btn.addEventListener('click', ()=>{ try { modal.showModal(); } catch { /* fallback for <dialog> unsupported */ modal.setAttribute('open',''); } refresh(); });
@@ -145,8 +176,29 @@ document.addEventListener('DOMContentLoaded', () => {
     refresh();
   });
 
-  setInterval(refresh, 60000);
-  refresh();
+  // server push instead of polling (the first state is loaded below, from
+  // the bootstrap if any). Unless the server shares events between
+  // processes (LIVE_EVENTS=redis), changes made by the bot never arrive
+  // here - keep a slow poll for them.
+  let poll = null;
+  const slowPoll = (on) => {
+    if (on && !poll) poll = setInterval(refresh, 60000);
+    if (!on && poll) { clearInterval(poll); poll = null; }
+  };
+  let connected = false;
+  const live = onLive(['timer.started', 'timer.stopped', 'time_entry.updated', 'lagged'], refresh);
+  if (live) {
+    onLive(['ready'], (e) => {
+      let shared = false;
+      try { shared = Boolean(JSON.parse(e.data).shared); } catch { /* old server */ }
+      slowPoll(!shared);
+      if (connected) refresh();
+      connected = true;
+    });
+  } else {
+    slowPoll(true);
+  }
+  bootstrapSection('timer').then((timer)=> timer === undefined ? refresh() : render(timer));
 })();
 
 // auth: toggle password
@@ -331,7 +383,9 @@ if (hash && forms[hash]) activate(hash); else activate('login');
     if (key==='tasks'){
       const ul = q('#wTasksList'); if (!ul) return; ul.innerHTML='…';
       let items = [];
-      try{
+      const boot = await bootstrapSection('tasks');
+      if (boot) items = bootItems(boot, 'due_date');
+      else try{
         const r = await fetch('/api/v1/tasks', {credentials:'same-origin'});
         const data = await r.json();
         items = Array.isArray(data) ? data.filter(t=> (t.due_date||'').startsWith(todayISO())) : [];
@@ -348,8 +402,11 @@ if (hash && forms[hash]) activate(hash); else activate('login');
       const rem = q('#wReminders'); const ev = q('#wEvents'); if (!rem || !ev) return;
       rem.innerHTML = ev.innerHTML = '…';
       let R=[], C=[];
-      try{ const r=await fetch('/api/v1/reminders', {credentials:'same-origin'}); const data=await r.json(); R = Array.isArray(data)? data.filter(x=> (x.remind_at||'').startsWith(todayISO())):[]; }catch{}
-      try{ const r=await fetch('/api/v1/calendar',  {credentials:'same-origin'}); const data=await r.json(); C = Array.isArray(data)? data.filter(x=> (x.start_at||'').startsWith(todayISO())):[]; }catch{}
+      const bootR = await bootstrapSection('reminders'), bootC = await bootstrapSection('events');
+      if (bootR) R = bootItems(bootR, 'remind_at');
+      else try{ const r=await fetch('/api/v1/reminders', {credentials:'same-origin'}); const data=await r.json(); R = Array.isArray(data)? data.filter(x=> (x.remind_at||'').startsWith(todayISO())):[]; }catch{}
+      if (bootC) C = bootItems(bootC, 'start_at');
+      else try{ const r=await fetch('/api/v1/calendar',  {credentials:'same-origin'}); const data=await r.json(); C = Array.isArray(data)? data.filter(x=> (x.start_at||'').startsWith(todayISO())):[]; }catch{}
       const fill = (ul, arr, empty)=>{ ul.innerHTML = arr.length? '' : `<li class="muted">${empty}</li>`;
         arr.slice(0,6).forEach(x=>{
           const li=document.createElement('li');
@@ -366,6 +423,23 @@ if (hash && forms[hash]) activate(hash); else activate('login');
     }
   }
 
+  // push: an open widget reloads at once, a closed one when opened; the
+  // bootstrap copy of its sections is stale from then on. Calendar events
+  // have no push yet, the reminders widget reloads them along.
+  function reloadOn(key, sections, types){
+    const dlg = widgets[key].dlg;
+    if (!dlg) return;
+    const reload = () => {
+      sections.forEach((name) => bootUsed.add(name));
+      if (dlg.open) loadWidget(key);
+    };
+    let connected = false;
+    if (!onLive(['lagged', ...types], reload)) return;
+    onLive(['ready'], () => { if (connected) reload(); connected = true; });
+  }
+  reloadOn('tasks', ['tasks'], ['task.created', 'task.updated', 'task.deleted']);
+  reloadOn('rc', ['reminders', 'events'], ['reminder.created', 'reminder.updated', 'reminder.deleted', 'reminder.fired']);
+
   // Quick note save
   const saveBtn = q('#wNoteSave');
   if (saveBtn){
@@ -4,8 +4,8 @@
     if (!window.Telegram || !Telegram.WebApp) return; // не в WebApp
   } catch (e) { return; }
 
-  // Если уже авторизованы — ничего не делаем
-  if (window.__LP_AUTH) return;
+  // Если уже авторизованы — загружаем стартовые данные одним запросом
+  if (window.__LP_AUTH) { bootstrap(); return; }
 
   var initData = (Telegram.WebApp && Telegram.WebApp.initData) || '';
   if (!initData) return;
@@ -25,5 +25,30 @@
     }
   })
   .catch(function(e){ console.warn('TG WebApp SSO error', e); });
-})();
 
+  // Разделы, версия которых совпала с кэшем, сервер не присылает
+  function bootstrap(){
+    var KEY = 'lp:bootstrap';
+    var cache = {};
+    try { cache = JSON.parse(localStorage.getItem(KEY) || '{}'); } catch (e) {}
+    var known = Object.keys(cache).map(function(k){ return k + ':' + cache[k].v; }).join(',');
+    // виджеты в main.js ждут это событие; без данных они грузят разделы сами
+    function announce(data){
+      window.__LP_BOOTSTRAP = data;
+      document.dispatchEvent(new CustomEvent('lp:bootstrap', { detail: data }));
+    }
+    fetch('/api/v1/bootstrap?known=' + encodeURIComponent(known), { credentials: 'include' })
+    .then(function(r){ return r.ok ? r.json() : null; })
+    .then(function(res){
+      if (!res) { announce({}); return; }
+      var data = {};
+      Object.keys(res.versions).forEach(function(k){
+        if (k in res.data) cache[k] = { v: res.versions[k], d: res.data[k] };
+        if (cache[k]) data[k] = cache[k].d;
+      });
+      try { localStorage.setItem(KEY, JSON.stringify(cache)); } catch (e) {}
+      announce(data);
+    })
+    .catch(function(e){ console.warn('TG WebApp bootstrap error', e); announce({}); });
+  }
+})();